@@ -1,20 +1,59 @@
 # 导入必要的库
 import numpy as np
 import sys
+import collections
+import contextlib
+import itertools
+import multiprocessing
 import threading
-import networkx as nx
-import matplotlib.pyplot as plt
-import re
 import warnings
 import os
 
 warnings.filterwarnings("ignore", category=UserWarning)
 
 # 导入PySide2库中的相关模块
-from PySide2.QtWidgets import QApplication, QMainWindow, QFileDialog, QMessageBox, QTextEdit
-from PySide2.QtUiTools import loadUiType  # 用于加载UI文件的函数
-from PySide2.QtCore import QFile, QTextStream, QSize
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from PySide2.QtWidgets import QApplication, QMainWindow, QFileDialog, QMessageBox, QTextEdit, QInputDialog, \
+    QProgressDialog, QDockWidget, QPlainTextEdit
+from PySide2.QtCore import QFile, QTextStream, QSize, Qt, QTimer
+
+from tuopu_core import TopoOrderPager, count_topological_sorts, iter_parse_lines, topological_order, \
+    iter_edge_file, iter_file_lines, format_parse_errors, TOPO_ORDER_LIMIT, TOPO_PAGE_SIZE
+from tuopu_cycles import find_cycles, condensation, format_cycle_report, strongly_connected_components
+from tuopu_export import export_orders, replacing_export_file, PARALLEL_EXPORT_MIN_ORDERS
+from tuopu_graph import CSRGraph
+from tuopu_incremental import IncrementalDag, changed_nodes
+from tuopu_layout import LayoutCache, cached_layout, layered_layout
+from tuopu_levels import topological_levels, level_numbers, format_levels
+from tuopu_reach import ReachabilityIndex, format_reachability, format_reach_query, transitive_reduction, \
+    format_reduction
+from tuopu_paths import DistanceCache, SourcePaths, format_routes, DENSE_MAX_NODES, ROUTE_DISPLAY_ROWS
+from tuopu_routes import parse_route_queries, group_route_queries, count_routes, iter_routes, export_routes, \
+    format_route_table
+from tuopu_profile import StageTimer, ProfileCapture, profile_path, profiled, format_diagnostics, \
+    DIAGNOSTICS_HISTORY
+from tuopu_schedule import critical_path_analysis, format_schedule, write_schedule
+from tuopu_snapshot import Snapshot, read_snapshot, write_snapshot, SNAPSHOT_SUFFIX
+from tuopu_store import EdgeStore, in_degrees, streaming_levels, reachable_mask, sample_subgraph, \
+    format_store_summary, LARGE_GRAPH_FILE_BYTES
+from tuopu_worker import JobScheduler
+# 由tuopu.ui预先生成的界面类，修改tuopu.ui后需要重新生成：pyside2-uic tuopu.ui -o tuopu_ui.py
+# 启动时不再调用uic编译界面文件，打包后也不需要附带tuopu.ui
+from tuopu_ui import Ui_MainWindow
+
+# 超过该大小的数据文件不再整体载入编辑框，生成图时直接从磁盘流式解析
+LARGE_FILE_BYTES = 1 << 20
+# 大文件在编辑框中预览的行数
+PREVIEW_LINES = 1000
+# 导出结果时可选的文件类型，以及未输入扩展名时按所选类型补上的扩展名
+EXPORT_FILTERS = "Text Files (*.txt);;CSV Files (*.csv);;JSON Lines (*.jsonl);;Compressed Text Files (*.txt.gz);;" \
+                 "All Files (*)"
+EXPORT_SUFFIXES = {"Text Files": ".txt", "CSV Files": ".csv", "JSON Lines": ".jsonl",
+                   "Compressed Text Files": ".txt.gz"}
+# 导出关键路径分析中各顶点时间时可选的文件类型
+SCHEDULE_FILTERS = "CSV Files (*.csv);;Compressed CSV Files (*.csv.gz);;All Files (*)"
+SCHEDULE_SUFFIXES = {"CSV Files": ".csv", "Compressed CSV Files": ".csv.gz"}
+# 快照文件的类型
+SNAPSHOT_FILTERS = "Graph Snapshots (*{});;All Files (*)".format(SNAPSHOT_SUFFIX)
 
 
 # 创建一个Qt应用程序
@@ -28,22 +67,60 @@ class GraphVisualizationApp(QMainWindow):
     def __init__(self):
         super().__init__()
 
-        # 加载UI文件
-        self.ui = loadUiType("tuopu.ui")[0]()  # 这里加载了一个UI文件
+        # 加载界面
+        self.ui = Ui_MainWindow()
         self.ui.setupUi(self)
         self.setWindow()
         # 初始化图像生成状态变量
         self.graphGenerated = False
 
         self.G = None  # 用于存储图的变量
+        self.distanceCache = None  # 带权图的全源最短路径缓存
+        self.importedFile = None  # 导入的大文件路径，编辑框中只显示其预览
+        self.importedSnapshot = None  # 打开的快照，编辑框中只显示其中的边的预览
+        self.topoGraph = None  # 用于存储无权图（DAG）的变量，输入有环时为缩点后的图
+        self.topoDrawnGraph = None  # 最近一次绘制的无权图
+        self.topoDrawnPos = None  # 以及它的布局
+        self.reachIndex = None  # 最近一次绘制的无权图的可达性索引，第一次查询时建立
+        self.reachQuery = ""  # 最近一次可达性查询的输入
+        self.cycleReport = None  # 输入有环时的诊断结果
+        self.reductionReport = None  # 传递约简删除的边的说明，没有约简时为None
+        self.topoPager = None  # 拓扑排序分页器
+        self.topoCount = None  # 拓扑排序总数，None表示数量过多无法精确计算
+        self.schedule = None  # 最近一次关键路径分析的结果
+        self.routeQueries = ""  # 最近一次批量最短路径查询的输入
+        # 大图模式下边保存在磁盘上（EdgeStore），largeStores为尚未关闭的全部存储（包括被取消的任务建立的）
+        self.largeStore = None
+        self.largeStores = []
+        self.storeLock = threading.Lock()
+        # 编辑数据后重新生成无权图时，只处理与上一次相比增加和删除的边
+        self.incrementalDag = IncrementalDag()
+        self.topoLayout = None  # 上一次无权图的(布局选项, 布局)
+        self.dagLock = threading.Lock()
 
-        plt.rcParams['font.sans-serif'] = ['Microsoft YaHei']  # 使用微软雅黑或其他中文字体
-        # 创建matplotlib视图和图形canvas
-        self.graphView = plt.figure()  # 创建Matplotlib视图
-        self.graphCanvas = FigureCanvas(self.graphView)  # 创建Matplotlib图形的Canvas
+        # 后台任务调度器，耗时计算都在线程池中执行
+        self.scheduler = JobScheduler(self)
+        self.cacheLock = threading.Lock()  # 最短路径缓存可能被多个后台任务访问
 
-        # 将canvas添加到ui布局中
-        self.ui.horizontalLayout_2.addWidget(self.graphCanvas)
+        # 布局缓存：图和布局选项都没有变化时直接使用上次的布局，缓存在退出时保存到磁盘
+        self.layoutCache = LayoutCache()
+
+        # matplotlib视图和画布在窗口显示之后才创建（见finishStartup）
+        self.graphView = None
+        self.graphCanvas = None
+        self.renderer = None
+
+        # 各次运行的分阶段计时，摘要显示在状态栏，最近几次的详细信息显示在诊断面板中；
+        # 勾选采样菜单项后对下一次运行的后台计算做cProfile或tracemalloc采样
+        self.diagnostics = collections.deque(maxlen=DIAGNOSTICS_HISTORY)
+        self.pendingDraw = None  # 等待画布重绘完成后结束计时的运行
+        self.diagnosticsText = QPlainTextEdit()
+        self.diagnosticsText.setReadOnly(True)
+        self.diagnosticsText.setPlainText(format_diagnostics(self.diagnostics))
+        self.diagnosticsDock = QDockWidget("诊断", self)
+        self.diagnosticsDock.setWidget(self.diagnosticsText)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.diagnosticsDock)
+        self.diagnosticsDock.hide()
 
         # 创建QPlainTextEdit对象，用于文本输入和显示
         self.textEdit = QTextEdit()
@@ -51,6 +128,8 @@ class GraphVisualizationApp(QMainWindow):
 
         # 链接ui菜单栏中的各个操作到相应的方法
         self.ui.actionOpen.triggered.connect(self.importData)  # 导入数据
+        self.ui.actionOpen_Snapshot.triggered.connect(self.openSnapshot)  # 打开快照
+        self.ui.actionSave_Snapshot.triggered.connect(self.saveSnapshot)  # 保存快照
         self.ui.actionGraph.triggered.connect(self.saveGraph)  # 保存图像
         self.ui.actionUnauthorized_Graph.triggered.connect(self.generateGraph)  # 生成图
         self.ui.actionReadme.triggered.connect(self.help)  # 显示帮助窗口
@@ -58,177 +137,738 @@ class GraphVisualizationApp(QMainWindow):
         self.ui.actionfile.triggered.connect(self.exportResults)  # 导出排序结果
         self.ui.actionAuthorized_Graph.triggered.connect(self.weightedGraph)  # 生成带权图数据
         self.ui.pushButton.clicked.connect(self.weightedGraph)  # 生成有权图
+        self.ui.actionBatch_Routes.triggered.connect(self.batchRoutes)  # 批量最短路径查询
+        self.ui.actionCritical_Path.triggered.connect(self.criticalPath)  # 关键路径分析
+        self.ui.actionSchedule.triggered.connect(self.exportSchedule)  # 导出各顶点的时间
+        self.ui.actionLevels.triggered.connect(self.generateLevels)  # 拓扑排序分批
+        self.ui.actionReachability.triggered.connect(self.showReachability)  # 可达性查询
+        self.ui.actionTransitive_Reduction.toggled.connect(self.toggleReduction)  # 传递约简
         self.ui.pushButton_2.clicked.connect(self.generateGraph)  # 生成无权图
+        self.ui.pushButton_3.clicked.connect(self.showNextOrders)  # 显示下一批拓扑排序
+        self.ui.actionDiagnostics.toggled.connect(self.diagnosticsDock.setVisible)  # 显示诊断面板
+        self.diagnosticsDock.visibilityChanged.connect(self.ui.actionDiagnostics.setChecked)
+        # 对下一次运行采样，两种采样方式只能选择一种
+        self.ui.actionProfile.toggled.connect(lambda checked: checked and self.ui.actionTrace_Memory.setChecked(False))
+        self.ui.actionTrace_Memory.toggled.connect(lambda checked: checked and self.ui.actionProfile.setChecked(False))
+
+        # 导入matplotlib和读取布局缓存需要较长的时间，放到窗口显示后的第一次事件循环中进行
+        QTimer.singleShot(0, self.finishStartup)
+
+    # 启动的后半部分：创建matplotlib视图和画布，读取布局缓存
+    # 使用独立的Figure对象而不是pyplot，不经过pyplot的全局图形管理
+    def finishStartup(self):
+        if self.renderer is not None:
+            return
+        # 先完成窗口的第一次绘制，再开始耗时的导入
+        if self.isVisible():
+            self.repaint()
+        import matplotlib
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from tuopu_render import GraphRenderer
+
+        self.layoutCache.load()
+
+        matplotlib.rcParams['font.sans-serif'] = ['Microsoft YaHei']  # 使用微软雅黑或其他中文字体
+        # 创建matplotlib视图和图形canvas
+        self.graphView = Figure()  # 创建Matplotlib视图
+        self.graphCanvas = FigureCanvas(self.graphView)  # 创建Matplotlib图形的Canvas
+        # 用批量集合对象绘图，支持滚轮缩放和拖动平移
+        self.renderer = GraphRenderer(self.graphView)
+        self.renderer.node_activated = self.onNodeActivated  # 双击顶点查询其上游和下游
+        self.graphCanvas.mpl_connect('draw_event', self.onCanvasDrawn)
+
+        # 将canvas添加到ui布局中
+        self.ui.horizontalLayout_2.addWidget(self.graphCanvas)
 
     def generateGraph(self):
-        # 获取文本框中的输入，每行定义一个关系，格式为 "<a,b>"
-        input_text = self.ui.plainTextEdit.toPlainText()
+        if self.ui.actionLarge_Graph_Mode.isChecked():
+            self.generateLargeGraph(False)
+            return
+
+        # 读取输入数据，每行定义一个关系，格式为 "<a,b>"
+        # 编辑框中的文本和布局选项在主线程中读取，解析、检查、布局和计数都在后台线程中完成
+        errors = []
+        edges = self.iterInputEdges(False, errors)
+        layout_option = self.ui.comboBox.currentText()
+        reduce = self.ui.actionTransitive_Reduction.isChecked()
+        timer, capture = self.startRun("生成无权图", "graph")
+
+        def compute(job):
+            # 边解析边加入有向图（CSR格式）
+            job.progress("正在解析数据……")
+            timer.begin("解析")
+            edge_list = list(edges)
+            G = CSRGraph.from_edges(edge_list)
+            if G.number_of_edges() == 0:
+                raise ValueError("请添加正确格式的数据，例如：<a,b>")
+            timer.count("顶点数", G.number_of_nodes())
+            timer.count("边数", G.number_of_edges())
+            timer.count("格式错误的行数", len(errors))
+
+            # 传递约简：删除可以由其他路径代替的边，拓扑排序不变；之后的布局、绘图和枚举都使用约简后的图
+            # 检查依赖关系仍然使用全部的边，切换约简前后边集合没有变化，布局只做增量调整
+            reduction = None
+            if reduce:
+                job.progress("正在计算传递约简……")
+                timer.begin("传递约简")
+                try:
+                    keep = transitive_reduction(G)
+                except ValueError as e:
+                    reduction = str(e) + "\n"
+                else:
+                    reduction = format_reduction(G, keep)
+                    G = G.edge_subgraph(keep)
+                    timer.count("约简后的边数", G.number_of_edges())
+
+            # 与上一次的边集合比较，在线维护拓扑序来检查新加入的边是否形成环；
+            # 布局只调整变化的顶点附近。两步之间不检查取消，保证边集合和布局一致
+            job.progress("正在检查依赖关系……")
+            timer.begin("检查依赖关系")
+            with self.dagLock:
+                try:
+                    added, removed = self.incrementalDag.update(edge_list)
+                except ValueError:
+                    added = removed = None  # 有环，边集合保持上一次的状态
+                previous = self.topoLayout
+                incremental = added is not None and self.incrementalDag.incremental and previous is not None and \
+                    previous[0] == layout_option
+                if added is not None:
+                    self.topoLayout = None  # 布局计算出错时下一次整体重新布局
+                timer.begin("布局")
+                if incremental:
+                    pos = cached_layout(self.layoutCache, G, layout_option, previous_pos=previous[1],
+                                        changed=changed_nodes(added, removed))
+                else:
+                    pos = cached_layout(self.layoutCache, G, layout_option)
+                if added is not None:
+                    self.topoLayout = (layout_option, pos)
+
+            # 有环时找出全部含环的强连通分量，把每个分量缩成一个顶点后仍然可以排序
+            report = None
+            sort_graph = G
+            if added is None:
+                job.progress("正在分析环……")
+                timer.begin("分析环")
+                components = strongly_connected_components(G)
+                report = find_cycles(G, components)
+                sort_graph = condensation(G, components)
+
+            job.progress("正在统计拓扑排序数量……")
+            timer.begin("统计排序数量")
+            count = count_topological_sorts(sort_graph)
+            timer.end()
+            return G, pos, count, incremental, report, sort_graph, reduction
+
+        # 重新生成时取消尚未完成的旧任务
+        self.scheduler.submit("graph", profiled(compute, capture),
+                              lambda result: self.showTopoGraph(result, errors, timer, capture),
+                              lambda message: self.failRun(timer, capture, message), self.showJobProgress)
+
+    # 后台计算完成后绘制无权图（主线程）
+    def showTopoGraph(self, result, errors, timer, capture):
+        G, pos, count, incremental, report, sort_graph, reduction = result
+        if errors:
+            QMessageBox.warning(self, "警告", format_parse_errors(errors), QMessageBox.Ok)
+
+        # 绘制拓扑排序关系图（先绘图，拓扑排序按需枚举），增量更新时保持当前的缩放和平移
+        # 有环时突出显示环上的顶点和建议删除的边
+        from tuopu_render import NODE_COLOR, EDGE_COLOR, HIGHLIGHT_NODE_COLOR, HIGHLIGHT_EDGE_COLOR
+
+        timer.begin("绘图")
+        node_colors = edge_colors = None
+        if report is not None:
+            node_colors = np.where(report.cyclic_node_mask(), HIGHLIGHT_NODE_COLOR, NODE_COLOR)
+            edge_colors = np.where(report.break_edge_mask(), HIGHLIGHT_EDGE_COLOR, EDGE_COLOR)
+        self.renderer.draw(G, pos, "拓扑排序", node_colors=node_colors, edge_colors=edge_colors,
+                           keep_view=incremental and self.renderer.graph is self.topoDrawnGraph)
+        self.graphGenerated = True  # 标记图像已生成
+        self.statusBar().clearMessage()
+        self.finishRunAfterDraw(timer, capture)
+
+        if report is not None:
+            QMessageBox.warning(self, "警告", "输入的数据存在依赖关系，已把每个环缩成一个顶点后排序。\n"
+                                "图中红色的边为建议删除的边，环的详细信息见结果框。", QMessageBox.Ok)
+
+        # 创建拓扑排序分页器，在后台枚举第一页结果
+        self.topoDrawnGraph = G
+        self.topoDrawnPos = pos
+        self.reachIndex = None
+        self.cycleReport = report
+        self.reductionReport = reduction
+        self.topoGraph = sort_graph
+        self.topoCount = count
+        self.topoPager = TopoOrderPager(sort_graph, TOPO_ORDER_LIMIT)
+        self.requestOrders()
 
-        # 使用正则表达式匹配输入格式
-        pattern = r'<(\w+),(\w+)>|《(\w+),(\w+)》'
-        matches = re.findall(pattern, input_text)
+    # 大图模式：边在后台流式写入磁盘上的列式文件（内存映射），拓扑排序、可达性和最短路径都按块读取边计算，
+    # 不建立networkx图，也不计算全源最短路径；图中只抽样显示一部分顶点，结果框中显示摘要
+    # 结果框中的文字是图中的顶点时，统计从该顶点可达的顶点（带权图为从该顶点出发的最短路径），抽样也从该顶点开始
+    def generateLargeGraph(self, weighted):
+        errors = []
+        edges = self.iterInputEdges(weighted, errors)
+        start_vertex = self.ui.textEdit.toPlainText().strip()
+        timer, capture = self.startRun("生成大图", "large")
 
-        edges = []
+        def compute(job):
+            job.progress("正在把边写入磁盘……")
+            timer.begin("写入磁盘")
+            store = EdgeStore.build(edges, weighted=weighted,
+                                    progress=lambda count: job.progress("已读入{}条边……".format(count)))
+            with self.storeLock:
+                self.largeStores.append(store)
+            if store.number_of_edges() == 0:
+                raise ValueError("请添加正确格式的数据，例如：<a,b,1>" if weighted else "请添加正确格式的数据，例如：<a,b>")
+            graph = store.graph()
+            timer.count("顶点数", store.number_of_nodes())
+            timer.count("边数", store.number_of_edges())
+            timer.count("磁盘占用（字节）", store.disk_bytes())
+
+            job.progress("正在计算拓扑排序……")
+            timer.begin("拓扑排序")
+            in_degree = in_degrees(graph)
+            order, layers = streaming_levels(graph)
+            starts = reached = None
+            if start_vertex in store.index:
+                job.progress("正在计算可达的顶点……")
+                timer.begin("可达性")
+                starts = [store.index[start_vertex]]
+                reached = reachable_mask(graph, starts)
+            text = format_store_summary(store, order, layers, in_degree, start_vertex, reached)
+
+            job.progress("正在抽样……")
+            timer.begin("抽样")
+            sample, chosen = sample_subgraph(graph, starts=starts, in_degree=in_degree)
+            # 抽样的顶点保持在原图中的层次，环上的顶点（层号为-1）放在最后一层
+            sample_layers = layers[chosen]
+            sample_layers[sample_layers < 0] = sample_layers.max() + 1
+            timer.begin("布局")
+            pos = layered_layout(sample, layers=np.unique(sample_layers, return_inverse=True)[1])
+            paths = SourcePaths(graph, (order, layers)) if weighted else None
+            timer.end()
+            return store, sample, pos, text, paths
+
+        self.scheduler.cancel("route")
+        self.scheduler.submit("graph", profiled(compute, capture),
+                              lambda result: self.showLargeGraph(result, errors, start_vertex, timer, capture),
+                              lambda message: self.failRun(timer, capture, message), self.showJobProgress)
+
+    # 后台计算完成后绘制抽样的图并显示摘要（主线程），关闭以前的存储
+    def showLargeGraph(self, result, errors, start_vertex, timer, capture):
+        store, sample, pos, text, paths = result
+        self.closeLargeStores(keep=store)
+        self.largeStore = store
+        if errors:
+            QMessageBox.warning(self, "警告", format_parse_errors(errors), QMessageBox.Ok)
+
+        timer.begin("绘图")
+        self.renderer.draw(sample, pos, "抽样显示（{}/{}个顶点）".format(sample.number_of_nodes(),
+                                                                 store.number_of_nodes()))
+        self.graphGenerated = True
+        self.statusBar().clearMessage()
+        self.finishRunAfterDraw(timer, capture)
+        self.ui.textEdit.setText(text)
+
+        # 大图模式下不枚举拓扑排序
+        self.topoGraph = self.topoDrawnGraph = self.topoPager = self.topoCount = self.cycleReport = None
+        self.topoDrawnPos = self.reachIndex = None
+        self.topoLayout = None
+        if paths is not None:
+            with self.cacheLock:
+                self.G = store.graph()
+                self.distanceCache = paths
+            if start_vertex in self.G:
+                self.floyd_shortest_paths(start_vertex)
+
+    # 关闭大图模式的存储（删除临时文件），keep为仍在使用的存储
+    def closeLargeStores(self, keep=None):
+        with self.storeLock:
+            stores = [store for store in self.largeStores if store is not keep]
+            self.largeStores = [] if keep is None else [keep]
+        for store in stores:
+            # 带权图和最短路径缓存仍在使用这个存储时一并清除
+            with self.cacheLock:
+                if self.G is not None and self.G.targets is store.targets:
+                    self.G = None
+                    self.distanceCache = None
+            store.close()
+        if keep is None:
+            self.largeStore = None
+
+    # 勾选或取消传递约简时，已经生成了无权图则重新生成，在约简后的图和完整的图之间切换
+    def toggleReduction(self, checked):
+        if self.topoDrawnGraph is not None and not self.ui.actionLarge_Graph_Mode.isChecked():
+            self.generateGraph()
+
+    # 拓扑排序分批：把最近一次生成的无权图（有环时为缩点后的图）分为可以同时执行的若干批，
+    # 可以限制每批的顶点数；按批号分层布局，每批画在同一行，结果框中列出各批的顶点
+    def generateLevels(self):
+        if self.topoGraph is None:
+            QMessageBox.warning(self, "错误", "请先生成无权图", QMessageBox.Ok)
+            return
 
-        # 判断是否匹配到任何数据
-        if not matches:
-            QMessageBox.warning(self, "错误", "请添加正确格式的数据，例如：<a,b>", QMessageBox.Ok)
+        workers, ok = QInputDialog.getInt(self, "拓扑排序分批", "每批最多的顶点数（0表示不限制）：", 0, 0, 2 ** 31 - 1)
+        if not ok:
             return
+        graph = self.topoGraph
 
-        # 遍历匹配结果
-        for match in matches:
-            a, b, c, d = match
-            if a:  # 使用尖括号的情况
-                edges.append((a.strip(), b.strip()))
-            elif c:  # 使用双尖括号的情况
-                edges.append((c.strip(), d.strip()))
+        def compute(job):
+            job.progress("正在分批……")
+            levels = topological_levels(graph, workers or None)
+            layers = np.array(level_numbers(levels, graph.number_of_nodes()), dtype=np.int64)
+            job.progress("正在计算布局……")
+            return levels, layered_layout(graph, layers=layers)
+
+        def finished(result):
+            levels, pos = result
+            self.renderer.draw(graph, pos, "拓扑排序分批")
+            self.statusBar().clearMessage()
+            self.ui.textEdit.setText(format_levels(levels, graph.names))
+
+        self.scheduler.submit("graph", compute, finished, self.showJobError, self.showJobProgress)
+
+    # 可达性查询：输入一个顶点时突出显示它的上游（它依赖的顶点）和下游（依赖它的顶点），结果框中列出这些顶点；
+    # 输入"上游顶点,下游顶点"时判断前者是否在后者的上游，并突出显示两者之间路径上的顶点
+    def showReachability(self):
+        if self.topoDrawnGraph is None:
+            QMessageBox.warning(self, "错误", "请先生成无权图", QMessageBox.Ok)
+            return
+        text, ok = QInputDialog.getText(self, "可达性", "顶点，或“上游顶点,下游顶点”：", text=self.reachQuery)
+        if not ok:
+            return
+        queries = parse_route_queries([text])
+        if not queries:
+            QMessageBox.warning(self, "错误", "请输入顶点", QMessageBox.Ok)
+            return
+        self.reachQuery = text.strip()
+        self.queryReachability(*queries[0])
+
+    # 在图中双击顶点：图中显示的是最近一次生成的无权图时查询该顶点的上游和下游
+    def onNodeActivated(self, i):
+        graph = self.renderer.graph
+        if graph is not None and graph is self.topoDrawnGraph:
+            self.reachQuery = graph.names[i]
+            self.queryReachability(graph.names[i])
+
+    # 在后台查询可达性，b为None时查询a的上游和下游，否则查询a是否在b的上游
+    # 可达性索引对每个图只建立一次，之后的查询只读取索引
+    def queryReachability(self, a, b=None):
+        graph = self.topoDrawnGraph
+        pos = self.topoDrawnPos
+        index = self.reachIndex
+        timer, capture = self.startRun("可达性查询", "reach")
+
+        def compute(job):
+            reach = index
+            if reach is None or reach.graph is not graph:
+                job.progress("正在建立可达性索引……")
+                timer.begin("建立索引")
+                reach = ReachabilityIndex(graph)
+                timer.count("索引模式", reach.mode)
+                timer.count("索引大小（字节）", reach.nbytes)
+            timer.begin("查询")
+            selected = [graph.index[name] for name in (a, b) if name in graph.index]
+            if b is None:
+                upstream, downstream = reach.ancestor_mask(a), reach.descendant_mask(a)
+                text = format_reachability(reach, a, upstream, downstream)
             else:
-                # 输入不符合规范，显示错误提示
-                QMessageBox.warning(self, "错误", "请添加正确格式的数据，例如：<a,b>", QMessageBox.Ok)
+                # 两者之间路径上的顶点：a的下游与b的上游的交集
+                upstream = reach.descendant_mask(a) & reach.ancestor_mask(b)
+                downstream = np.zeros_like(upstream)
+                text = format_reach_query(reach, a, b, upstream)
+            timer.count("上游顶点数", int(upstream.sum()))
+            timer.count("下游顶点数", int(downstream.sum()))
+            timer.end()
+            return reach, selected, upstream, downstream, text
+
+        # 选中的顶点为红色，上游为黄色，下游为绿色；上游之间、下游之间以及与选中顶点相连的边为红色
+        def finished(result):
+            reach, selected, upstream, downstream, text = result
+            if graph is not self.topoDrawnGraph:  # 查询期间重新生成了图
+                self.finishRun(timer, capture)
                 return
+            from tuopu_render import NODE_COLOR, EDGE_COLOR, HIGHLIGHT_NODE_COLOR, HIGHLIGHT_EDGE_COLOR, \
+                ANCESTOR_NODE_COLOR, DESCENDANT_NODE_COLOR
+
+            self.reachIndex = reach
+            timer.begin("绘图")
+            node_colors = np.where(upstream, ANCESTOR_NODE_COLOR,
+                                   np.where(downstream, DESCENDANT_NODE_COLOR, NODE_COLOR))
+            node_colors[selected] = HIGHLIGHT_NODE_COLOR
+            upstream[selected] = downstream[selected] = True
+            edge_colors = np.where(reach.edge_mask(upstream) | reach.edge_mask(downstream), HIGHLIGHT_EDGE_COLOR,
+                                   EDGE_COLOR)
+            if self.renderer.graph is graph:
+                self.renderer.recolor(node_colors, edge_colors)
+            else:
+                self.renderer.draw(graph, pos, "拓扑排序", node_colors=node_colors, edge_colors=edge_colors)
+            self.ui.textEdit.setText(text)
+            self.statusBar().clearMessage()
+            self.finishRunAfterDraw(timer, capture)
 
-        # 创建有向图
-        G = nx.DiGraph()
-        G.add_edges_from(edges)
+        self.scheduler.submit("reach", profiled(compute, capture), finished,
+                              lambda message: self.failRun(timer, capture, message), self.showJobProgress)
 
-        # 检查是否存在依赖关系
-        if not nx.is_directed_acyclic_graph(G):
-            # 存在依赖关系，显示错误提示
-            QMessageBox.warning(self, "错误", "输入的数据存在依赖关系", QMessageBox.Ok)
+    # 显示下一批拓扑排序结果
+    def showNextOrders(self):
+        if self.topoPager is None:
+            QMessageBox.warning(self, "错误", "请先生成无权图", QMessageBox.Ok)
             return
+        if self.topoPager.exhausted:
+            QMessageBox.information(self, "提示", "没有更多的拓扑排序结果", QMessageBox.Ok)
+            return
+        # 上一批还在枚举时忽略本次点击，避免两个线程同时读取同一个分页器
+        if not self.scheduler.is_running("orders"):
+            self.requestOrders()
 
-        # 根据用户选择的布局来计算节点的位置
-        layout_option = self.ui.comboBox.currentText()
-        if layout_option == "Spectral Layout":
-            pos = nx.spectral_layout(G)
-        elif layout_option == "Shell Layout":
-            pos = nx.shell_layout(G)
-        elif layout_option == "Circular Layout":
-            pos = nx.circular_layout(G)
-        else:
-            pos = nx.spring_layout(G, seed=10)  # 默认使用spring_layout布局
-
-        # 计算所有拓扑排序
-        all_topo_orders = list(nx.all_topological_sorts(G))
-        if not all_topo_orders:
-            print("无法进行拓扑排序，图中存在循环依赖。")
-            return []
-
-        # 清空Matplotlib视图并绘制拓扑排序关系图
-        plt.clf()
-        first_topo_order = all_topo_orders[0]
-        nx.draw(G, pos, with_labels=True, node_size=500, node_color="skyblue", font_size=10)
-        plt.title("拓扑排序")
-        self.graphCanvas.draw()
-        self.graphGenerated = True  # 标记图像已生成
+    # 在后台枚举下一页拓扑排序
+    def requestOrders(self):
+        pager = self.topoPager
+        timer, capture = self.startRun("枚举拓扑排序", "orders")
+
+        def compute(job):
+            timer.begin("枚举")
+            start = pager.count
+            page = pager.next_page(TOPO_PAGE_SIZE)
+            timer.count("本页排序数", len(page))
+            timer.end()
+            return start, page
+
+        self.ui.pushButton_3.setEnabled(False)
+        self.scheduler.submit("orders", profiled(compute, capture),
+                              lambda result: self.showOrders(pager, *result, timer, capture),
+                              lambda message: self.failRun(timer, capture, message), self.showJobProgress)
+
+    # 显示一页拓扑排序结果（主线程）
+    def showOrders(self, pager, start, page, timer, capture):
+        self.ui.pushButton_3.setEnabled(True)
+        if not page:
+            self.finishRun(timer, capture)
+            QMessageBox.information(self, "提示", "没有更多的拓扑排序结果", QMessageBox.Ok)
+            return
+
+        timer.begin("显示")
+
+        result_text = self.topoCountText()
+        if self.cycleReport is not None:
+            result_text = format_cycle_report(self.cycleReport) + result_text
+        if self.reductionReport is not None:
+            result_text = self.reductionReport + result_text
+        result_text += "拓扑排序结果（第{}-{}个）：\n".format(start + 1, start + len(page))
+        result_text += "\n".join(["->".join(order) for order in page])
+        if pager.reached_limit():
+            result_text += "\n已达到显示上限{}个，其余排序未枚举。".format(TOPO_ORDER_LIMIT)
+        elif pager.exhausted:
+            result_text += "\n所有拓扑排序已显示完毕。"
+        self.ui.textEdit.setText(result_text)
+
+        # 打印本批拓扑排序结果
+        print(result_text)
+        self.finishRun(timer, capture)
 
-        # 打印所有拓扑排序结果
-        print("所有拓扑排序结果:")
-        for topo_order in all_topo_orders:
-            print(topo_order)
-        return all_topo_orders
+    # 拓扑排序总数的说明文字
+    def topoCountText(self):
+        if self.topoCount is None:
+            return "拓扑排序数量过多，无法精确计算。\n"
+        return "共有{}种拓扑排序。\n".format(self.topoCount)
 
-    # Floyd最短路径算法
+    # 后台任务出错时显示错误信息
+    def showJobError(self, message):
+        self.ui.pushButton_3.setEnabled(True)
+        self.statusBar().clearMessage()
+        QMessageBox.warning(self, "错误", message, QMessageBox.Ok)
+
+    # 在状态栏中显示后台任务的进度
+    def showJobProgress(self, text):
+        self.statusBar().showMessage(text)
+
+    # 开始一次计时的运行，返回(计时器, 采样)；勾选了采样菜单项时为这次运行创建采样并取消勾选，否则采样为None
+    # label为采样结果文件名的前缀
+    def startRun(self, title, label):
+        timer = StageTimer(title)
+        capture = None
+        for action, kind in ((self.ui.actionProfile, "cprofile"), (self.ui.actionTrace_Memory, "tracemalloc")):
+            if action.isChecked():
+                action.setChecked(False)
+                capture = ProfileCapture(kind, profile_path(kind, label))
+                timer.profile_path = capture.path
+        return timer, capture
+
+    # 结束一次运行的计时，在状态栏显示摘要并更新诊断面板
+    def finishRun(self, timer, capture=None, error=None):
+        timer.end()
+        timer.status = error
+        if capture is not None and capture.error is not None:
+            timer.profile_path = None
+            timer.count("采样结果保存失败", capture.error)
+        self.diagnostics.append(timer)
+        self.diagnosticsText.setPlainText(format_diagnostics(self.diagnostics))
+        self.statusBar().showMessage(timer.summary())
+
+    # 后台计算出错的运行：显示错误信息并记录
+    def failRun(self, timer, capture, message):
+        self.showJobError(message)
+        self.finishRun(timer, capture, message)
+
+    # 绘图在draw_idle安排的下一次重绘中才真正完成，等到画布的draw_event再结束"绘图"阶段的计时
+    def finishRunAfterDraw(self, timer, capture):
+        if self.pendingDraw is not None:
+            self.finishRun(*self.pendingDraw)
+        self.pendingDraw = (timer, capture)
+
+    def onCanvasDrawn(self, event):
+        if self.pendingDraw is not None:
+            run = self.pendingDraw
+            self.pendingDraw = None
+            self.finishRun(*run)
+
+    # 最短路径查询
+    # 距离和前驱矩阵缓存在self.distanceCache中，任意起始点的查询都直接读取缓存（在后台线程中整理结果）
     def floyd_shortest_paths(self, start_vertex):
         if not self.graphGenerated:
             QMessageBox.warning(self, "错误", "您未生成任何图像", QMessageBox.Ok)
             return
 
-        if self.G is None:
+        if self.G is None or self.distanceCache is None:
             QMessageBox.warning(self, "错误", "带权图为空，请先导入带权图数据", QMessageBox.Ok)
             return
 
-        # 获取所有顶点列表
-        nodes = list(self.G.nodes())
-
-        # 创建节点到索引的映射和反向映射
-        node_to_index = {node: i for i, node in enumerate(nodes)}
-        index_to_node = {i: node for i, node in enumerate(nodes)}
-
-        # 初始化距离矩阵，用inf表示不可达
-        num_nodes = len(nodes)
-        distance_matrix = np.inf * np.ones((num_nodes, num_nodes))
-
-        # 将直接可达的顶点间距离填入距离矩阵
-        for edge in self.G.edges(data=True):
-            a, b, weight = edge[0], edge[1], edge[2]["weight"]
-            distance_matrix[node_to_index[a]][node_to_index[b]] = weight
-
-        # Floyd算法求最短路径
-        for k in range(num_nodes):
-            for i in range(num_nodes):
-                for j in range(num_nodes):
-                    if distance_matrix[i][k] + distance_matrix[k][j] < distance_matrix[i][j]:
-                        distance_matrix[i][j] = distance_matrix[i][k] + distance_matrix[k][j]
-
-        # 构建最短路径结果字符串
-        result_text = "从顶点 '{}' 出发的最短路径：\n".format(start_vertex)
-        for i in range(num_nodes):
-            if index_to_node[i] != start_vertex:
-                shortest_path = distance_matrix[node_to_index[start_vertex]][i]
-                if shortest_path == np.inf:
-                    result_text += "顶点 '{}' 不可达到顶点 '{}'。\n".format(start_vertex, index_to_node[i])
-                else:
-                    result_text += "到顶点 '{}' 的最短路径为：{}\n".format(index_to_node[i], shortest_path)
+        if start_vertex not in self.G:
+            QMessageBox.warning(self, "错误", "起始点 '{}' 不在图中".format(start_vertex), QMessageBox.Ok)
+            return
+        timer, capture = self.startRun("最短路径查询", "route")
 
-        self.ui.textEdit.setText(result_text)  # 打印最短路径到textEdit框中
+        def compute(job):
+            timer.begin("查询")
+            with self.cacheLock:
+                # 构建最短路径结果字符串，终点较多时只列出前ROUTE_DISPLAY_ROWS个
+                result_text = format_routes(self.distanceCache, start_vertex)
+                distances = self.distanceCache.distance_row(start_vertex)
+            timer.count("顶点数", len(distances))
+            timer.count("可达顶点数", int(np.isfinite(distances).sum()))
+            timer.end()
+            return result_text
 
-    def weightedGraph(self):
-        # 获取文本框中的输入，每行定义一个带权边，格式为 "<a,b,1>"
-        # a和b为顶点，c为ab边的权重
-        input_text = self.ui.plainTextEdit.toPlainText()
-        weighted_edges = []
-
-        # 使用正则表达式匹配输入格式
-        pattern = r'<(\w+),(\w+),(\d+)>|《(\w+),(\w+),(\d+)》'
-        matches = re.findall(pattern, input_text)
-
-        # 判断是否匹配到任何数据
-        if not matches:
-            QMessageBox.warning(self, "错误", "请添加正确格式的数据，例如：<a,b,1>", QMessageBox.Ok)
-            return
-
-        # 遍历匹配结果
-        for match in matches:
-            a, b, c, d, e, f = match
-            if a:  # 使用尖括号的情况
-                weighted_edges.append((a.strip(), b.strip(), int(c)))
-            elif d:  # 使用双尖括号的情况
-                weighted_edges.append((d.strip(), e.strip(), int(f)))
-            else:
-                # 输入不符合规范，显示错误提示
-                QMessageBox.warning(self, "错误", "请添加正确格式的数据，例如：<a,b,1>", QMessageBox.Ok)
-                return
+        # 打印最短路径到textEdit框中
+        def finished(result_text):
+            timer.begin("显示")
+            self.ui.textEdit.setText(result_text)
+            self.finishRun(timer, capture)
+
+        self.scheduler.submit("route", profiled(compute, capture), finished,
+                              lambda message: self.failRun(timer, capture, message), self.showJobProgress)
+
+    # 批量最短路径查询：每行一个起点（查询到全部顶点的最短路径），或"起点,终点"
+    # 查询按起点分组后在后台一次计算，按起点查询的起点较多时使用多个进程；结果框中显示前ROUTE_DISPLAY_ROWS行，
+    # 结果更多时可以把全部结果逐块保存到文件（格式按扩展名决定）
+    def batchRoutes(self):
+        if not self.graphGenerated:
+            QMessageBox.warning(self, "错误", "您未生成任何图像", QMessageBox.Ok)
+            return
+
+        if self.G is None or self.distanceCache is None:
+            QMessageBox.warning(self, "错误", "带权图为空，请先导入带权图数据", QMessageBox.Ok)
+            return
+
+        text, ok = QInputDialog.getMultiLineText(self, "批量最短路径", "每行一个起点（到全部顶点），或“起点,终点”：",
+                                                 self.routeQueries)
+        if not ok:
+            return
+        self.routeQueries = text
+        errors = []
+        queries = parse_route_queries(text.splitlines(), errors)
+        if errors:
+            QMessageBox.warning(self, "警告", format_parse_errors(errors), QMessageBox.Ok)
+        if not queries:
+            QMessageBox.warning(self, "错误", "请输入起点", QMessageBox.Ok)
+            return
+        try:
+            groups = group_route_queries(queries, self.G.index)
+        except ValueError as e:
+            QMessageBox.warning(self, "错误", str(e), QMessageBox.Ok)
+            return
+
+        total = count_routes(groups, self.G.number_of_nodes())
+        file_path = None
+        if total > ROUTE_DISPLAY_ROWS:
+            reply = QMessageBox.question(self, "批量最短路径", "共{}条结果，结果框中只显示前{}条。\n是否把全部结果保存到文件？"
+                                         .format(total, ROUTE_DISPLAY_ROWS), QMessageBox.Yes | QMessageBox.No,
+                                         QMessageBox.Yes)
+            if reply == QMessageBox.Yes:
+                file_dialog = QFileDialog()
+                file_path, selected_filter = file_dialog.getSaveFileName(self, "保存结果", "", EXPORT_FILTERS)
+                if not file_path:
+                    return
+                if not os.path.splitext(file_path)[1]:
+                    file_path += EXPORT_SUFFIXES.get(selected_filter.split(" (")[0], ".txt")
+        cache = self.distanceCache
+        # 图来自大图模式的存储或快照时，进程池中的子进程由文件重新映射图，不复制边数组
+        graph_path = None
+        if isinstance(cache, SourcePaths):
+            if self.largeStore is not None and cache.graph.targets is self.largeStore.targets:
+                graph_path = self.largeStore.directory
+            elif self.importedSnapshot is not None and cache.graph is self.importedSnapshot.graph:
+                graph_path = self.importedSnapshot.path
+        timer, capture = self.startRun("批量最短路径", "routes")
+
+        def compute(job):
+            timer.count("起点数", len(groups))
+            timer.count("结果行数", total)
+            shown = []
+
+            # 写入文件的同时留下结果框中显示的行
+            def remember(rows):
+                for row in rows:
+                    if len(shown) < ROUTE_DISPLAY_ROWS:
+                        shown.append(row)
+                    yield row
 
-        # 创建带权有向图
-        self.G = nx.DiGraph()
-        for edge in weighted_edges:
-            a, b, weight = edge
-            self.G.add_edge(a, b, weight=weight)
+            # 只在复制缓存时持有锁，查询期间其他最短路径查询和缓存更新不需要等待
+            with self.cacheLock:
+                paths = cache.copy()
+            timer.begin("查询")
+            rows = iter_routes(paths, groups, workers=None, graph_path=graph_path,
+                               progress=lambda done: job.progress("已完成{}/{}个起点……".format(done, len(groups))))
+            with contextlib.closing(rows):
+                if file_path is None:
+                    return format_route_table(rows, total)
+                try:
+                    export_routes(remember(rows), file_path)
+                except OSError as e:
+                    raise ValueError("保存结果时出现错误：" + str(e))
+            timer.count("文件大小（字节）", os.path.getsize(file_path))
+            timer.end()
+            return format_route_table(iter(shown), total)
 
+        def finished(table):
+            timer.begin("显示")
+            self.ui.textEdit.setText(table)
+            self.finishRun(timer, capture)
+            if file_path is not None:
+                QMessageBox.information(self, "提示", "已保存{}条结果到文件：{}".format(total, file_path), QMessageBox.Ok)
+
+        self.scheduler.submit("route", profiled(compute, capture), finished,
+                              lambda message: self.failRun(timer, capture, message), self.showJobProgress)
+
+    def weightedGraph(self):
+        if self.ui.actionLarge_Graph_Mode.isChecked():
+            self.generateLargeGraph(True)
+            return
+
+        # 读取输入数据，每行定义一个带权边，格式为 "<a,b,1>"，a和b为顶点，c为ab边的权重
+        # 解析、更新最短路径缓存和布局都在后台线程中完成
+        errors = []
+        edges = self.iterInputEdges(True, errors)
         layout_option = self.ui.comboBox.currentText()
-        if layout_option == "Spectral Layout":
-            pos = nx.spectral_layout(self.G)
-        elif layout_option == "Kamada-Kawai Layout":
-            pos = nx.kamada_kawai_layout(self.G)
-        elif layout_option == "Circular Layout":
-            pos = nx.circular_layout(self.G)
-        else:
-            pos = nx.spring_layout(self.G, seed=10)  # 默认使用spring_layout布局
+        timer, capture = self.startRun("生成带权图", "weighted")
 
-        plt.clf()
-        labels = {(a, b): weight for a, b, weight in self.G.edges(data="weight")}
-        edge_weights = [weight for a, b, weight in self.G.edges(data="weight")]
+        def compute(job):
+            # 边解析边加入带权有向图（CSR格式）
+            job.progress("正在解析数据……")
+            timer.begin("解析")
+            G = CSRGraph.from_edges(edges, weighted=True)
+            if G.number_of_edges() == 0:
+                raise ValueError("请添加正确格式的数据，例如：<a,b,1>")
+            timer.count("顶点数", G.number_of_nodes())
+            timer.count("边数", G.number_of_edges())
+            timer.count("格式错误的行数", len(errors))
 
-        nx.draw(self.G, pos, with_labels=True, node_size=500, node_color="skyblue", font_size=10)
-        nx.draw_networkx_edge_labels(self.G, pos, edge_labels=labels, font_size=8, rotate=False)
+            # 建立新的最短路径缓存：已有缓存时复制后只对变化的边做增量更新；
+            # 顶点数超过DENSE_MAX_NODES时不计算全源最短路径，改为按起点查询
+            # 不修改self.distanceCache，任务被取消或出错时图和缓存都保持上一次的状态，绘图时再一起替换
+            job.progress("正在计算最短路径……")
+            timer.begin("最短路径")
+            if G.number_of_nodes() > DENSE_MAX_NODES:
+                cache = SourcePaths(G)
+            else:
+                with self.cacheLock:
+                    previous = self.distanceCache
+                    cache = previous.copy() if isinstance(previous, DistanceCache) else None
+                if cache is None:
+                    cache = DistanceCache(G)
+                else:
+                    cache.update_edges(G.edges(data="weight"))
+
+            job.progress("正在计算布局……")
+            timer.begin("布局")
+            pos = cached_layout(self.layoutCache, G, layout_option)
+            timer.end()
+            return G, pos, cache
 
-        plt.title("带权图")
-        self.graphCanvas.draw()
+        # 重新生成时取消尚未完成的旧任务
+        self.scheduler.submit("graph", profiled(compute, capture),
+                              lambda result: self.showWeightedGraph(result, errors, timer, capture),
+                              lambda message: self.failRun(timer, capture, message), self.showJobProgress)
+
+    # 后台计算完成后绘制带权图（主线程），图和最短路径缓存同时替换
+    def showWeightedGraph(self, result, errors, timer, capture):
+        G, pos, cache = result
+        with self.cacheLock:
+            self.G = G
+            self.distanceCache = cache
+        if errors:
+            QMessageBox.warning(self, "警告", format_parse_errors(errors), QMessageBox.Ok)
+
+        # 边的权重标签只在视野内的边较少时显示
+        timer.begin("绘图")
+        self.renderer.draw(self.G, pos, "带权图", show_weights=True)
         self.graphGenerated = True
+        self.statusBar().clearMessage()
+        self.finishRunAfterDraw(timer, capture)
 
         self.generateOptimalRoute()
 
+    # 关键路径分析：读取带权边（边权为起点到终点的工期），在后台计算每个顶点的最早、最迟开始时间和时差
+    def criticalPath(self):
+        errors = []
+        edges = self.iterInputEdges(True, errors)
+        layout_option = self.ui.comboBox.currentText()
+        timer, capture = self.startRun("关键路径", "schedule")
+
+        def compute(job):
+            job.progress("正在解析数据……")
+            timer.begin("解析")
+            G = CSRGraph.from_edges(edges, weighted=True)
+            timer.count("顶点数", G.number_of_nodes())
+            timer.count("边数", G.number_of_edges())
+            timer.count("格式错误的行数", len(errors))
+            if G.number_of_edges() == 0:
+                raise ValueError("请添加正确格式的数据，例如：<a,b,1>")
+
+            job.progress("正在计算关键路径……")
+            timer.begin("关键路径")
+            schedule = critical_path_analysis(G)
+            text = format_schedule(schedule)
+
+            job.progress("正在计算布局……")
+            timer.begin("布局")
+            pos = cached_layout(self.layoutCache, G, layout_option)
+            timer.end()
+            return schedule, text, pos
+
+        # 重新生成时取消尚未完成的旧任务
+        self.scheduler.submit("graph", profiled(compute, capture),
+                              lambda result: self.showSchedule(result, errors, timer, capture),
+                              lambda message: self.failRun(timer, capture, message), self.showJobProgress)
+
+    # 后台计算完成后绘制关键路径（主线程），关键顶点和关键边用红色标出
+    def showSchedule(self, result, errors, timer, capture):
+        self.schedule, text, pos = result
+        if errors:
+            QMessageBox.warning(self, "警告", format_parse_errors(errors), QMessageBox.Ok)
+
+        from tuopu_render import NODE_COLOR, EDGE_COLOR, HIGHLIGHT_NODE_COLOR, HIGHLIGHT_EDGE_COLOR
+
+        node_colors = np.where(self.schedule.critical_node_mask(), HIGHLIGHT_NODE_COLOR, NODE_COLOR)
+        edge_colors = np.where(self.schedule.critical_edge_mask(), HIGHLIGHT_EDGE_COLOR, EDGE_COLOR)
+        timer.begin("绘图")
+        self.renderer.draw(self.schedule.graph, pos, "关键路径", show_weights=True, node_colors=node_colors,
+                           edge_colors=edge_colors)
+        self.graphGenerated = True
+        self.statusBar().clearMessage()
+        self.ui.textEdit.setText(text)
+        self.finishRunAfterDraw(timer, capture)
+
     # 生成最优路线
     def generateOptimalRoute(self):
         # 在这里实现生成最优路线的功能
@@ -263,41 +903,299 @@ class GraphVisualizationApp(QMainWindow):
             # 保存图像到指定路径
             self.graphView.savefig(file_path, format='png')
 
-    # 导出结果到文本文件
+    # 导出结果到文件
+    # 复用最近一次生成的图，在后台逐块把拓扑排序写入文件，不会重新生成图，内存占用与导出数量无关；
+    # 数量较多时由多个进程并行枚举
+    # 文件格式按扩展名决定（.txt/.csv/.jsonl），以.gz结尾时使用gzip压缩
     def exportResults(self, result_text):
         if not self.graphGenerated:
             # 如果没有生成图像，显示弹出窗口提示
             QMessageBox.warning(self, "错误", "您未生成任何图像", QMessageBox.Ok)
             return
 
-        all_topo_orders = self.generateGraph()
-        result_text = "\n".join(["->".join(order) for order in all_topo_orders])
-        # 弹出文件对话框，允许用户选择保存结果的路径和文件名
+        # 导出最近一次生成的无权图的拓扑排序
+        if self.topoGraph is None and self.largeStore is not None:
+            QMessageBox.warning(self, "错误", "大图模式下不枚举拓扑排序，结果框中显示的是其中一个拓扑排序", QMessageBox.Ok)
+            return
+        if self.topoGraph is None:
+            QMessageBox.warning(self, "错误", "请先生成无权图", QMessageBox.Ok)
+            return
+
+        if self.scheduler.is_running("export"):
+            QMessageBox.information(self, "提示", "上一次导出尚未完成", QMessageBox.Ok)
+            return
+
+        # 弹出文件对话框，允许用户选择保存结果的路径、文件名和格式
         file_dialog = QFileDialog()
-        file_path, _ = file_dialog.getSaveFileName(self, "保存结果", "", "Text Files (*.txt);;All Files (*)")
-        if file_path:
+        file_path, selected_filter = file_dialog.getSaveFileName(self, "保存结果", "", EXPORT_FILTERS)
+        if not file_path:
+            return
+        if not os.path.splitext(file_path)[1]:
+            file_path += EXPORT_SUFFIXES.get(selected_filter.split(" (")[0], ".txt")
+
+        # 询问最多导出的数量，默认不超过TOPO_ORDER_LIMIT个
+        default = TOPO_ORDER_LIMIT if self.topoCount is None else min(self.topoCount, TOPO_ORDER_LIMIT)
+        limit, ok = QInputDialog.getInt(self, "导出结果", self.topoCountText() + "最多导出的排序数量（0表示全部）：",
+                                        default, 0, 2 ** 31 - 1)
+        if not ok:
+            return
+        limit = limit or None
+        if limit is None:
+            total = self.topoCount
+        else:
+            total = limit if self.topoCount is None else min(limit, self.topoCount)
+
+        # 进度对话框，总数未知或超出进度条范围时显示为忙碌状态；取消时中止后台任务，不保留不完整的文件
+        maximum = total if total is not None and total < 2 ** 31 else 0
+        progress = QProgressDialog("正在导出拓扑排序……", "取消", 0, maximum, self)
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(500)
+        progress.canceled.connect(lambda: self.scheduler.cancel("export"))
+        graph = self.topoGraph
+        # 排序数量较多时使用全部CPU核并行枚举，导出的顺序不变
+        workers = None if total is None or total >= PARALLEL_EXPORT_MIN_ORDERS else 1
+        timer, capture = self.startRun("导出拓扑排序", "export")
+
+        def compute(job):
+            timer.begin("枚举并写入")
             try:
-                # 打开文件并将结果写入
-                with open(file_path, 'w', encoding='utf-8') as file:
-                    file.write(result_text)
+                count = export_orders(graph, file_path, limit=limit, progress=job.progress, workers=workers)
+            except OSError as e:
+                raise ValueError("导出结果时出现错误：" + str(e))
+            timer.count("导出排序数", count)
+            timer.count("文件大小（字节）", os.path.getsize(file_path))
+            timer.end()
+            return count
 
-                QMessageBox.information(self, "提示", "结果已成功导出到文件：" + file_path, QMessageBox.Ok)
-            except Exception as e:
-                QMessageBox.warning(self, "错误", "导出结果时出现错误：" + str(e), QMessageBox.Ok)
+        def showProgress(count):
+            progress.setLabelText("已导出{}个拓扑排序……".format(count))
+            if maximum:
+                progress.setValue(count)
+
+        def finished(count):
+            progress.reset()
+            self.finishRun(timer, capture)
+            QMessageBox.information(self, "提示", "已导出{}个拓扑排序到文件：{}".format(count, file_path), QMessageBox.Ok)
+
+        def failed(message):
+            progress.reset()
+            self.failRun(timer, capture, message)
+
+        self.scheduler.submit("export", profiled(compute, capture), finished, failed, showProgress)
+
+    # 导出关键路径分析中每个顶点的最早开始、最迟开始时间和时差（CSV格式），在后台写入文件
+    def exportSchedule(self):
+        if self.schedule is None:
+            QMessageBox.warning(self, "错误", "请先进行关键路径分析", QMessageBox.Ok)
+            return
+
+        if self.scheduler.is_running("export"):
+            QMessageBox.information(self, "提示", "上一次导出尚未完成", QMessageBox.Ok)
+            return
+
+        file_dialog = QFileDialog()
+        file_path, selected_filter = file_dialog.getSaveFileName(self, "导出顶点时间", "", SCHEDULE_FILTERS)
+        if not file_path:
+            return
+        if not os.path.splitext(file_path)[1]:
+            file_path += SCHEDULE_SUFFIXES.get(selected_filter.split(" (")[0], ".csv")
+        schedule = self.schedule
+        timer, capture = self.startRun("导出顶点时间", "timings")
+
+        def compute(job):
+            job.progress("正在导出顶点时间……")
+            timer.begin("写入")
+            try:
+                with replacing_export_file(file_path) as file:
+                    count = write_schedule(schedule, file)
+            except OSError as e:
+                raise ValueError("导出结果时出现错误：" + str(e))
+            timer.count("导出顶点数", count)
+            timer.count("文件大小（字节）", os.path.getsize(file_path))
+            timer.end()
+            return count
+
+        def finished(count):
+            self.finishRun(timer, capture)
+            QMessageBox.information(self, "提示", "已导出{}个顶点的时间到文件：{}".format(count, file_path),
+                                    QMessageBox.Ok)
+
+        self.scheduler.submit("export", profiled(compute, capture), finished,
+                              lambda message: self.failRun(timer, capture, message), self.showJobProgress)
+
+    # 逐条生成输入的边
+    # 导入的大文件未被编辑时直接从磁盘流式解析，打开的快照未被编辑时直接使用快照中的边，否则解析编辑框中的文本
+    def iterInputEdges(self, weighted, errors):
+        modified = self.ui.plainTextEdit.document().isModified()
+        if self.importedFile is not None and not modified:
+            return iter_edge_file(self.importedFile, weighted, errors, use_mmap=True)
+        snapshot = self.importedSnapshot
+        if snapshot is not None and not modified and (snapshot.weighted or not weighted):
+            return snapshot.graph.edges(data="weight" if weighted else None)
+        return iter_parse_lines(self.ui.plainTextEdit.toPlainText().splitlines(), weighted, errors)
 
     # 导入数据文件
     def importData(self):
         # 弹出文件对话框，允许用户自行选择要导入的本地文本文件
         file_dialog = QFileDialog()
         file_path, _ = file_dialog.getOpenFileName(self, "导入数据", "", "Text Files (*.txt);;All Files (*)")
+        if not file_path:
+            return
+
+        self.importedSnapshot = None
+        # 超过LARGE_GRAPH_FILE_BYTES的文件自动使用大图模式
+        if os.path.getsize(file_path) > LARGE_GRAPH_FILE_BYTES:
+            self.ui.actionLarge_Graph_Mode.setChecked(True)
+
+        # 大文件只在编辑框中显示前PREVIEW_LINES行，生成图时直接读取文件
+        if os.path.getsize(file_path) > LARGE_FILE_BYTES:
+            preview = "".join(itertools.islice(iter_file_lines(file_path), PREVIEW_LINES))
+            self.ui.plainTextEdit.setPlainText(preview)
+            self.importedFile = file_path
+            self.ui.textEdit.setText("文件较大，编辑框中只显示前{}行预览，生成图时将直接读取文件：{}\n"
+                                     "修改编辑框中的内容后将改为使用编辑框中的数据。".format(PREVIEW_LINES, file_path))
+            return
+
         # 如果用户选择了文件，就将文件内容加载到文本编辑框
-        if file_path:
-            # 读取文件内容
-            file = QFile(file_path)
-            if file.open(QFile.ReadOnly | QFile.Text):
-                stream = QTextStream(file)
-                self.ui.plainTextEdit.setPlainText(stream.readAll())
-                file.close()
+        self.importedFile = None
+        file = QFile(file_path)
+        if file.open(QFile.ReadOnly | QFile.Text):
+            stream = QTextStream(file)
+            self.ui.plainTextEdit.setPlainText(stream.readAll())
+            file.close()
+
+    # 保存快照：最近一次生成的无权图或带权图，连同当前显示的布局、拓扑序、拓扑排序总数和全源最短路径矩阵，
+    # 在后台写入一个二进制文件；打开快照时不需要重新解析、布局和计算最短路径
+    def saveSnapshot(self):
+        if not self.graphGenerated:
+            QMessageBox.warning(self, "错误", "您未生成任何图像", QMessageBox.Ok)
+            return
+
+        drawn = self.renderer.graph
+        matrices = (None, None)
+        if self.topoDrawnGraph is not None and drawn in (self.topoDrawnGraph, self.topoGraph):
+            graph = self.topoDrawnGraph
+            count = self.topoCount
+        elif self.G is not None and drawn is self.G:
+            graph = self.G
+            count = None
+            # 矩阵在主线程中按顶点表的顺序整理，避免后台任务更新缓存时读到一半
+            with self.cacheLock:
+                if isinstance(self.distanceCache, DistanceCache):
+                    matrices = self.distanceCache.matrices(graph.names)
+        elif self.largeStore is not None:
+            QMessageBox.warning(self, "错误", "大图模式下边已经保存在磁盘上，不保存快照", QMessageBox.Ok)
+            return
+        else:
+            QMessageBox.warning(self, "错误", "请先生成无权图或带权图", QMessageBox.Ok)
+            return
+        # 显示的是分批等其他布局时不保存布局，打开时重新计算
+        positions = self.renderer.xy if drawn is graph else None
+        layout_option = self.ui.comboBox.currentText() if positions is not None else None
+
+        if self.scheduler.is_running("snapshot"):
+            QMessageBox.information(self, "提示", "上一次保存快照尚未完成", QMessageBox.Ok)
+            return
+        file_dialog = QFileDialog()
+        file_path, _ = file_dialog.getSaveFileName(self, "保存快照", "", SNAPSHOT_FILTERS)
+        if not file_path:
+            return
+        if not os.path.splitext(file_path)[1]:
+            file_path += SNAPSHOT_SUFFIX
+        timer, capture = self.startRun("保存快照", "snapshot")
+
+        def compute(job):
+            job.progress("正在保存快照……")
+            timer.begin("拓扑序")
+            order = topological_order(graph)
+            timer.begin("写入")
+            snapshot = Snapshot(graph, positions, None if order is None else np.array(order, dtype=np.int64), count,
+                                layout_option, *matrices)
+            try:
+                size = write_snapshot(file_path, snapshot)
+            except OSError as e:
+                raise ValueError("保存快照时出现错误：" + str(e))
+            timer.count("顶点数", graph.number_of_nodes())
+            timer.count("边数", graph.number_of_edges())
+            timer.count("文件大小（字节）", size)
+            timer.end()
+
+        def finished(_):
+            self.finishRun(timer, capture)
+            QMessageBox.information(self, "提示", "已保存快照：" + file_path, QMessageBox.Ok)
+
+        self.scheduler.submit("snapshot", profiled(compute, capture), finished,
+                              lambda message: self.failRun(timer, capture, message), self.showJobProgress)
+
+    # 打开快照：数组直接映射文件，不解析文本；快照中没有布局时按当前的布局选项计算，
+    # 带权图没有保存全源最短路径矩阵时重新计算（顶点较多时改为按起点查询）
+    def openSnapshot(self):
+        file_dialog = QFileDialog()
+        file_path, _ = file_dialog.getOpenFileName(self, "打开快照", "", SNAPSHOT_FILTERS)
+        if not file_path:
+            return
+        layout_option = self.ui.comboBox.currentText()
+        timer, capture = self.startRun("打开快照", "snapshot")
+
+        def compute(job):
+            job.progress("正在读取快照……")
+            timer.begin("读取")
+            try:
+                snapshot = read_snapshot(file_path)
+            except OSError as e:
+                raise ValueError("打开快照时出现错误：" + str(e))
+            G = snapshot.graph
+            timer.count("顶点数", G.number_of_nodes())
+            timer.count("边数", G.number_of_edges())
+
+            pos = snapshot.positions
+            if pos is None:
+                job.progress("正在计算布局……")
+                timer.begin("布局")
+                pos = cached_layout(self.layoutCache, G, layout_option)
+
+            if snapshot.weighted:
+                timer.begin("最短路径")
+                cache = snapshot.distance_cache()
+                if cache is None:
+                    job.progress("正在计算最短路径……")
+                    cache = SourcePaths(G) if G.number_of_nodes() > DENSE_MAX_NODES else DistanceCache(G)
+                timer.end()
+                return snapshot, (pos, cache)
+
+            # 保存时有环（没有拓扑序）的图重新分析环，缩点后排序
+            report = None
+            sort_graph = G
+            if snapshot.order is None and topological_order(G) is None:
+                job.progress("正在分析环……")
+                timer.begin("分析环")
+                components = strongly_connected_components(G)
+                report = find_cycles(G, components)
+                sort_graph = condensation(G, components)
+            timer.end()
+            return snapshot, (G, pos, snapshot.count, False, report, sort_graph, None)
+
+        self.scheduler.cancel("route")
+        self.scheduler.submit("graph", profiled(compute, capture),
+                              lambda result: self.showSnapshot(*result, timer, capture),
+                              lambda message: self.failRun(timer, capture, message), self.showJobProgress)
+
+    # 显示打开的快照（主线程）：编辑框中预览快照中的前PREVIEW_LINES条边，之后的绘图与生成图相同
+    def showSnapshot(self, snapshot, result, timer, capture):
+        self.closeLargeStores()
+        self.topoLayout = None  # 下一次生成无权图时不以快照的布局做增量布局
+        self.importedFile = None
+        self.importedSnapshot = snapshot
+        graph = snapshot.graph
+        edges = itertools.islice(graph.edges(data="weight" if snapshot.weighted else None), PREVIEW_LINES)
+        self.ui.plainTextEdit.setPlainText("\n".join("<{}>".format(",".join(map(str, edge))) for edge in edges))
+        self.ui.plainTextEdit.document().setModified(False)
+
+        if snapshot.weighted:
+            pos, cache = result
+            self.showWeightedGraph((graph, pos, cache), [], timer, capture)
+        else:
+            self.showTopoGraph(result, [], timer, capture)
 
     # 关闭应用程序
     def close_window(self):
@@ -309,6 +1207,15 @@ class GraphVisualizationApp(QMainWindow):
         if reply == QMessageBox.Yes:
             self.close()
             
+    # 窗口关闭时保存布局缓存，删除大图模式的临时文件
+    def closeEvent(self, event):
+        try:
+            self.layoutCache.save()
+        except OSError:
+            pass
+        self.closeLargeStores()
+        super().closeEvent(event)
+
     # 在GraphVisualizationApp类中添加新的help方法
     def help(self):
         # 定义README文件的路径
@@ -325,6 +1232,8 @@ class GraphVisualizationApp(QMainWindow):
 
 
 if __name__ == '__main__':
+    # 打包后的程序中，进程池（spawn方式）启动的子进程会重新执行程序入口，由此转去执行子进程的任务，而不是再打开一个窗口
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     ex = GraphVisualizationApp()
     ex.show()
@@ -0,0 +1,38 @@
+# 拓扑排序计数的测试：与networkx逐个枚举的数量比较，包括多个弱连通分量、有环和自环的图
+import random
+
+import networkx as nx
+import pytest
+
+from tuopu_core import count_topological_sorts
+from tuopu_graph import CSRGraph
+
+
+def random_edges(rng, n, p, acyclic):
+    return [(str(a), str(b)) for a in range(n) for b in range(n)
+            if a != b and (a < b or not acyclic) and rng.random() < p]
+
+
+def expected_count(edges):
+    try:
+        return sum(1 for _ in nx.all_topological_sorts(nx.DiGraph(edges)))
+    except nx.NetworkXUnfeasible:
+        return 0
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_count_matches_networkx(seed):
+    rng = random.Random(seed)
+    # 边较少时图分成多个弱连通分量
+    edges = random_edges(rng, rng.randint(2, 8), rng.choice((0.1, 0.25, 0.5)), seed % 3 != 0) or [("0", "1")]
+    assert count_topological_sorts(CSRGraph.from_edges(edges)) == expected_count(edges)
+
+
+@pytest.mark.parametrize("edges", [[("a", "a")], [("a", "b"), ("c", "c")], [("a", "b"), ("b", "b")]])
+def test_self_loop_counts_zero(edges):
+    assert count_topological_sorts(CSRGraph.from_edges(edges)) == 0
+
+
+def test_separate_components_interleave():
+    # a->b与c->d：两条链交错排列，C(4, 2) = 6种
+    assert count_topological_sorts(CSRGraph.from_edges([("a", "b"), ("c", "d")])) == 6
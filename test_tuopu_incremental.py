@@ -0,0 +1,38 @@
+# 增量图更新的测试：增量加入的边形成环（包括自环）时，与整体重建一样抛出ValueError，并保持原来的状态不变
+import pytest
+
+from tuopu_incremental import DynamicTopoOrder, IncrementalDag
+
+EDGES = [(str(i), str(i + 1)) for i in range(10)]
+
+
+def test_self_loop_rejected():
+    topo = DynamicTopoOrder.from_order([str(i) for i in range(11)], EDGES)
+    assert not topo.add_edge("x", "x")
+    assert "x" not in topo
+    assert not topo.add_edge("3", "3")
+    assert "3" not in topo.successors["3"]
+
+
+def test_incremental_self_loop_is_cycle():
+    dag = IncrementalDag()
+    dag.update(EDGES)
+    with pytest.raises(ValueError):
+        dag.update(EDGES + [("x", "x")])
+    assert dag.edges == set(EDGES)
+    assert "x" not in dag.topo
+    assert dag.topo.order() == [str(i) for i in range(11)]
+
+    # 整体重建时同样视为环
+    with pytest.raises(ValueError):
+        IncrementalDag().update(EDGES + [("x", "x")])
+
+
+def test_incremental_cycle_rolled_back():
+    dag = IncrementalDag()
+    dag.update(EDGES)
+    with pytest.raises(ValueError):
+        dag.update(EDGES + [("10", "0")])
+    assert dag.edges == set(EDGES)
+    dag.update(EDGES + [("0", "10")])
+    assert dag.incremental
@@ -0,0 +1,76 @@
+# 最短路径的测试：全源缓存和按起点查询都与networkx在小的随机带权图上的结果比较
+import random
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from tuopu_graph import CSRGraph
+from tuopu_paths import DistanceCache, SourcePaths
+from tuopu_store import EdgeStore
+
+
+def random_weighted_edges(rng, n, p):
+    return [(str(a), str(b), rng.randint(1, 9)) for a in range(n) for b in range(n) if a != b and rng.random() < p]
+
+
+# 缓存中每一对顶点的距离与networkx相同，还原的路径是图中的路径且长度等于距离
+def check_paths(cache, edges):
+    graph = nx.DiGraph()
+    graph.add_weighted_edges_from(edges)
+    weights = {(a, b): weight for a, b, weight in edges}
+    for source in graph:
+        expected = nx.single_source_dijkstra_path_length(graph, source)
+        distances = cache.distance_row(source)
+        for target in graph:
+            j = cache.node_to_index[target]
+            if target not in expected:
+                assert distances[j] == np.inf
+                assert cache.shortest_path(source, target) is None
+                continue
+            assert distances[j] == expected[target]
+            path = cache.shortest_path(source, target)
+            assert path[0] == source and path[-1] == target
+            assert sum(weights[edge] for edge in zip(path, path[1:])) == expected[target]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_distance_cache_matches_networkx(seed):
+    rng = random.Random(seed)
+    edges = random_weighted_edges(rng, rng.randint(2, 10), 0.3) or [("0", "1", 1)]
+    check_paths(DistanceCache(CSRGraph.from_edges(edges, weighted=True)), edges)
+
+
+# 增量更新：每次增加、删除少量边或修改少量权重（包括变大和变小），结果与重新计算相同
+@pytest.mark.parametrize("seed", range(20))
+def test_update_edges_matches_networkx(seed):
+    rng = random.Random(seed)
+    n = 10
+    edges = {(a, b): weight for a, b, weight in random_weighted_edges(rng, n, 0.25)}
+    edges[("0", "1")] = 1
+    cache = DistanceCache(CSRGraph.from_edges([(a, b, w) for (a, b), w in edges.items()], weighted=True))
+    for _ in range(10):
+        edge = rng.choice(sorted(edges))
+        action = rng.choice(("add", "remove", "reweight"))
+        if action == "add":
+            a, b = rng.sample(range(n), 2)
+            edges[(str(a), str(b))] = rng.randint(1, 9)
+        elif action == "remove" and len(edges) > 1:
+            del edges[edge]
+        else:
+            edges[edge] = max(1, edges[edge] + rng.choice((-5, -1, 1, 5)))
+        current = [(a, b, weight) for (a, b), weight in edges.items()]
+        cache.update_edges(current)
+        check_paths(cache, current)
+
+
+# 按起点查询：无环图按层计算，有环图使用Dijkstra；大图模式的存储中的图按小块读取出边
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("acyclic", [True, False])
+def test_source_paths_matches_networkx(seed, acyclic, tmp_path):
+    rng = random.Random(seed)
+    edges = [(a, b, weight) for a, b, weight in random_weighted_edges(rng, rng.randint(2, 12), 0.3)
+             if not acyclic or int(a) < int(b)] or [("0", "1", 1)]
+    check_paths(SourcePaths(CSRGraph.from_edges(edges, weighted=True)), edges)
+    store = EdgeStore.build(edges, str(tmp_path / "store"), weighted=True, chunk_edges=4)
+    check_paths(SourcePaths(store.graph(), chunk_edges=4), edges)
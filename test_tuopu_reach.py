@@ -0,0 +1,69 @@
+# 可达性索引和传递约简的测试：与networkx在小的随机图（包括有环的图）上的结果比较
+import random
+
+import networkx as nx
+import pytest
+
+from tuopu_graph import CSRGraph
+from tuopu_reach import ReachabilityIndex, transitive_reduction
+
+
+def random_edges(rng, n, p, acyclic):
+    return [(str(a), str(b)) for a in range(n) for b in range(n)
+            if a != b and (a < b or not acyclic) and rng.random() < p]
+
+
+def check_reachability(index, graph):
+    for a in graph:
+        descendants = nx.descendants(graph, a)
+        ancestors = nx.ancestors(graph, a)
+        assert sorted(index.descendants(a)) == sorted(descendants)
+        assert sorted(index.ancestors(a)) == sorted(ancestors)
+        for b in graph:
+            assert index.reaches(a, b) == (b in descendants), (a, b)
+
+
+@pytest.mark.parametrize("seed", range(25))
+@pytest.mark.parametrize("acyclic", [True, False])
+def test_reachability_matches_networkx(seed, acyclic):
+    rng = random.Random(seed)
+    n = rng.randint(2, 30)
+    edges = random_edges(rng, n, rng.choice((1.5, 3, 6)) / n, acyclic) or [("0", "1")]
+    graph = CSRGraph.from_edges(edges)
+    expected = nx.DiGraph(edges)
+
+    bitset = ReachabilityIndex(graph)
+    assert bitset.mode == "bitset"
+    check_reachability(bitset, expected)
+    # max_bitset_nodes为0时强制使用区间标号；labels=1时只有一组随机深度优先编号
+    for labels in (1, 3):
+        interval = ReachabilityIndex(graph, max_bitset_nodes=0, labels=labels, seed=seed)
+        assert interval.mode == "interval"
+        check_reachability(interval, expected)
+
+
+# 传递约简：无环图与networkx的传递约简相同；有环图中环内的边全部保留，分量之间保留的边对应缩点图的传递约简，
+# 可达性不变
+@pytest.mark.parametrize("seed", range(25))
+@pytest.mark.parametrize("acyclic", [True, False])
+def test_transitive_reduction_matches_networkx(seed, acyclic):
+    rng = random.Random(seed)
+    n = rng.randint(2, 20)
+    edges = random_edges(rng, n, rng.choice((1.5, 3, 6)) / n, acyclic) or [("0", "1")]
+    graph = CSRGraph.from_edges(edges)
+    reduced_graph = graph.edge_subgraph(transitive_reduction(graph))
+    kept = set(reduced_graph.edges())
+    expected = nx.DiGraph(edges)
+
+    condensed = nx.condensation(expected)
+    component = condensed.graph["mapping"]
+    reduced = set(nx.transitive_reduction(condensed).edges())
+    for a, b in edges:
+        if component[a] == component[b]:
+            assert (a, b) in kept
+        elif (a, b) in kept:
+            assert (component[a], component[b]) in reduced
+    assert {(component[a], component[b]) for a, b in kept if component[a] != component[b]} == reduced
+    if acyclic:
+        assert kept == set(nx.transitive_reduction(expected).edges())
+    check_reachability(ReachabilityIndex(reduced_graph), expected)
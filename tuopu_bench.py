@@ -0,0 +1,468 @@
+# 性能基准测试
+# 用带随机种子的生成器构造不同形状和规模的图（随机DAG、分层DAG、长链、扇出、网格），
+# 对解析、环检查、拓扑排序枚举与计数、最短路径、各种布局、离屏绘图和导出等耗时的步骤分别计时，
+# 记录耗时和内存峰值，结果保存为JSON，与上一次的结果比较即可发现性能退化
+# 不导入PySide2，绘图在离屏的Agg画布上进行；--startup在新的进程中（离屏）启动图形界面，测量启动时间
+#
+# 用法示例：
+#   python tuopu_bench.py -o bench.json
+#   python tuopu_bench.py --sizes 100 1000 --benchmarks parse layout-layered -o new.json --compare bench.json
+#   python tuopu_bench.py --startup --repeat 5 -o startup.json
+# 单核上--sizes 100 1000约需5分钟（--no-memory约1.5分钟）；默认的全部规模需要数小时
+import argparse
+import itertools
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from tuopu_core import iter_parse_lines, iter_topological_sorts, count_topological_sorts, topological_order, \
+    TOPO_ORDER_LIMIT
+from tuopu_cycles import strongly_connected_components
+from tuopu_export import export_orders
+from tuopu_graph import CSRGraph
+from tuopu_layout import compute_layout, layered_layout, LAYERED_LAYOUT
+from tuopu_levels import topological_levels
+from tuopu_reach import ReachabilityIndex, transitive_reduction
+from tuopu_paths import DistanceCache, SourcePaths, floyd_distance_matrix, single_source_distances
+from tuopu_routes import group_route_queries, iter_routes
+from tuopu_schedule import critical_path_analysis
+from tuopu_snapshot import Snapshot, read_snapshot, write_snapshot
+
+# 默认的图规模（顶点数）
+BENCH_SIZES = (100, 1000, 10000, 100000, 1000000)
+# 随机图中每个顶点平均的出边数
+BENCH_AVG_DEGREE = 3
+# 随机权重的范围
+BENCH_MAX_WEIGHT = 9
+# 枚举和导出的基准测试中输出的顶点总数（排序数量乘以顶点数），最多TOPO_ORDER_LIMIT个排序
+BENCH_ORDER_VERTICES = 10 ** 6
+# 批量最短路径查询的起点数量
+BENCH_ROUTE_SOURCES = 16
+# 可达性基准测试中查询的随机顶点对数量
+BENCH_REACH_QUERIES = 10000
+# 计数基准测试的状态数上限，比界面和命令行使用的COUNT_MAX_STATES小：状态数接近默认上限时一次计数要几秒，
+# tracemalloc测量内存时还要再慢几十倍；较小的上限同样能反映每个状态的计算开销
+BENCH_COUNT_MAX_STATES = 10000
+# 与基准结果比较时，耗时超过基准的该倍数视为性能退化
+REGRESSION_RATIO = 1.2
+# 启动时间测量的各个时刻：导入busapp完成、窗口显示、画布就绪（可以绘图），均从启动解释器开始计时
+STARTUP_STAGES = ("startup-import", "startup-window", "startup-ready")
+# 在新进程中执行的启动脚本，输出各个时刻（time.time()）的JSON
+STARTUP_SCRIPT = """
+import json, sys, time
+import busapp
+moments = {"startup-import": time.time()}
+app = busapp.QApplication(sys.argv)
+window = busapp.GraphVisualizationApp()
+window.show()
+window.repaint()
+moments["startup-window"] = time.time()
+while window.renderer is None:
+    app.processEvents()
+moments["startup-ready"] = time.time()
+print(json.dumps(moments))
+"""
+
+
+# 以下生成器返回(顶点数, 起点下标数组, 终点下标数组)，下标越小的顶点在拓扑序中越靠前
+
+# 随机DAG：随机选取顶点对，由下标小的指向下标大的
+def random_dag(n, rng):
+    m = n * BENCH_AVG_DEGREE
+    a = rng.integers(0, n, m)
+    b = rng.integers(0, n, m)
+    keep = a != b
+    return n, np.minimum(a, b)[keep], np.maximum(a, b)[keep]
+
+
+# 分层DAG：约√n层，每个顶点从上一层随机选取BENCH_AVG_DEGREE个前驱
+def layered_dag(n, rng):
+    width = max(int(np.sqrt(n)), 1)
+    targets = np.repeat(np.arange(width, n), BENCH_AVG_DEGREE)
+    layer_starts = (targets // width - 1) * width
+    sources = layer_starts + rng.integers(0, width, len(targets))
+    return n, sources, targets
+
+
+# 长链：0->1->2->…
+def chain_dag(n, rng):
+    return n, np.arange(n - 1), np.arange(1, n)
+
+
+# 扇出：一个顶点指向其余全部顶点
+def fan_out_dag(n, rng):
+    return n, np.zeros(n - 1, dtype=np.int64), np.arange(1, n)
+
+
+# 网格：√n×√n的网格，每个顶点指向右边和下边的顶点
+def grid_dag(n, rng):
+    side = max(int(np.sqrt(n)), 2)
+    cells = np.arange(side * side).reshape(side, side)
+    sources = np.concatenate((cells[:, :-1].ravel(), cells[:-1, :].ravel()))
+    targets = np.concatenate((cells[:, 1:].ravel(), cells[1:, :].ravel()))
+    return side * side, sources, targets
+
+
+# 含冗余边的分层DAG：在分层DAG的基础上，每个顶点另外从前驱的前驱中随机选取2*BENCH_AVG_DEGREE个前驱，
+# 这些边都可以由经过中间一层的路径代替，与实际输入中<a,b>、<b,c>、<a,c>同时出现的情况相似
+def redundant_dag(n, rng):
+    width = max(int(np.sqrt(n)), 1)
+    n, sources, targets = layered_dag(n, rng)
+    extra_targets = np.repeat(np.arange(2 * width, n), 2 * BENCH_AVG_DEGREE)
+    middle = sources[(extra_targets - width) * BENCH_AVG_DEGREE + rng.integers(0, BENCH_AVG_DEGREE, len(extra_targets))]
+    extra_sources = sources[(middle - width) * BENCH_AVG_DEGREE + rng.integers(0, BENCH_AVG_DEGREE, len(middle))]
+    return n, np.concatenate((sources, extra_sources)), np.concatenate((targets, extra_targets))
+
+
+GENERATORS = {"random": random_dag, "layered": layered_dag, "chain": chain_dag, "fanout": fan_out_dag,
+              "grid": grid_dag, "redundant": redundant_dag}
+
+
+# 一个测试用例：生成的图及其各种形式，按需生成并缓存，生成的时间不计入基准测试
+class BenchCase:
+
+    def __init__(self, generator, size, seed):
+        rng = np.random.default_rng(seed)
+        num_nodes, sources, targets = GENERATORS[generator](size, rng)
+        # 顶点名称随机打乱，使输入顺序不是拓扑序
+        labels = rng.permutation(num_nodes)
+        self.generator = generator
+        self.size = size
+        self.names = ["v{}".format(i) for i in labels.tolist()]
+        self.sources = sources
+        self.targets = targets
+        self.weights = rng.integers(1, BENCH_MAX_WEIGHT + 1, len(sources))
+        self._cache = {}
+        self._directory = None  # 存放临时文件的目录，close时删除
+
+    def _cached(self, key, build):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    # 与界面输入格式相同的文本行
+    def lines(self, weighted=False):
+        def build():
+            names = self.names
+            if weighted:
+                return ["<{},{},{}>".format(names[a], names[b], w) for a, b, w in
+                        zip(self.sources.tolist(), self.targets.tolist(), self.weights.tolist())]
+            return ["<{},{}>".format(names[a], names[b]) for a, b in zip(self.sources.tolist(), self.targets.tolist())]
+        return self._cached(("lines", weighted), build)
+
+    @property
+    def graph(self):
+        return self._cached("graph", lambda: CSRGraph.from_arrays(self.names, self.sources, self.targets))
+
+    @property
+    def weighted_graph(self):
+        return self._cached("weighted_graph",
+                            lambda: CSRGraph.from_arrays(self.names, self.sources, self.targets, self.weights))
+
+    @property
+    def layout(self):
+        return self._cached("layout", lambda: layered_layout(self.graph))
+
+    @property
+    def reach_index(self):
+        return self._cached("reach_index", lambda: ReachabilityIndex(self.graph))
+
+    # 带权图、布局和拓扑序的快照
+    @property
+    def snapshot(self):
+        def build():
+            positions = np.array([self.layout[name] for name in self.names], dtype=np.float64)
+            return Snapshot(self.weighted_graph, positions, np.array(topological_order(self.weighted_graph)))
+        return self._cached("snapshot", build)
+
+    # 已经写入临时文件的快照
+    @property
+    def snapshot_path(self):
+        def build():
+            path = self.temporary_path("graph.tps")
+            write_snapshot(path, self.snapshot)
+            return path
+        return self._cached("snapshot_path", build)
+
+    def temporary_path(self, name):
+        if self._directory is None:
+            self._directory = tempfile.mkdtemp(prefix="tuopu_bench_")
+        return os.path.join(self._directory, name)
+
+    def close(self):
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+
+
+# 离屏绘图：与界面相同的批量绘图，在Agg画布上完成一次完整的绘制
+def render_offscreen(graph, pos):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from tuopu_render import GraphRenderer
+
+    figure = Figure()
+    canvas = FigureCanvasAgg(figure)
+    GraphRenderer(figure).draw(graph, pos, "benchmark")
+    canvas.draw()
+
+
+# 枚举和导出的排序数量：大图的每个排序都很长，按输出的顶点总数确定数量
+def order_count(graph):
+    return max(1, min(TOPO_ORDER_LIMIT, BENCH_ORDER_VERTICES // max(graph.number_of_nodes(), 1)))
+
+
+# 逐个取出一批拓扑排序，不保存结果
+def enumerate_orders(graph):
+    for _ in iter_topological_sorts(graph, order_count(graph)):
+        pass
+
+
+# 导出一批拓扑排序到临时文件
+def export_temporary(graph, suffix):
+    directory = tempfile.mkdtemp(prefix="tuopu_bench_")
+    path = os.path.join(directory, "orders" + suffix)
+    try:
+        export_orders(graph, path, limit=order_count(graph))
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+        os.rmdir(directory)
+
+
+# 批量最短路径查询：前BENCH_ROUTE_SOURCES个顶点各自到全部顶点，按起点查询，只生成结果不保存
+def batch_routes(graph):
+    groups = group_route_queries([(name, None) for name in graph.names[:BENCH_ROUTE_SOURCES]], graph.index)
+    for _ in iter_routes(SourcePaths(graph), groups):
+        pass
+
+
+# 可达性查询：BENCH_REACH_QUERIES个随机顶点对是否在上游
+def reach_queries(index, names):
+    rng = np.random.default_rng(0)
+    pairs = rng.integers(0, len(names), (BENCH_REACH_QUERIES, 2)).tolist()
+    return sum(index.reaches(names[a], names[b]) for a, b in pairs)
+
+
+# 打开快照，并像图形界面一样取出顶点表和布局
+def load_snapshot(path):
+    snapshot = read_snapshot(path)
+    snapshot.graph.index.get(snapshot.graph.names[0])
+    return snapshot.positions.sum()
+
+
+# 启动一次图形界面，返回各个时刻距离启动进程的秒数
+def startup_times():
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    start = time.time()
+    result = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], capture_output=True, text=True, env=env,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        raise RuntimeError((result.stderr.strip().splitlines() or ["启动失败"])[-1])
+    moments = json.loads(result.stdout.strip().splitlines()[-1])
+    return {stage: moments[stage] - start for stage in STARTUP_STAGES}
+
+
+# 启动时间的测量结果，每个时刻一条记录，取repeat次中最短的时间
+def run_startup(repeat=1):
+    records = [{"benchmark": stage, "generator": "app", "size": 0} for stage in STARTUP_STAGES]
+    try:
+        runs = [startup_times() for _ in range(repeat)]
+    except Exception as e:
+        for record in records:
+            record["status"] = "error"
+            record["error"] = "{}: {}".format(type(e).__name__, e)
+        return records
+    for record in records:
+        record["seconds"] = min(run[record["benchmark"]] for run in runs)
+        record["status"] = "ok"
+    return records
+
+
+class Benchmark:
+
+    def __init__(self, name, run, max_nodes, needs=()):
+        self.name = name
+        self.run = run  # run(case)，只计时这一步
+        self.max_nodes = max_nodes  # 超过该规模时跳过（算法的复杂度决定了更大的图没有意义）
+        self.needs = needs  # 计时前需要准备好的用例属性
+
+
+BENCHMARKS = [
+    Benchmark("parse", lambda case: CSRGraph.from_edges(iter_parse_lines(case.lines())), 10 ** 6, ("lines",)),
+    Benchmark("parse-weighted", lambda case: CSRGraph.from_edges(iter_parse_lines(case.lines(True), True), True),
+              10 ** 6, ("weighted_lines",)),
+    Benchmark("cycle-check", lambda case: topological_order(case.graph), 10 ** 6, ("graph",)),
+    Benchmark("scc", lambda case: strongly_connected_components(case.graph), 10 ** 6, ("graph",)),
+    Benchmark("enumerate", lambda case: enumerate_orders(case.graph), 10 ** 6, ("graph",)),
+    Benchmark("count", lambda case: count_topological_sorts(case.graph, BENCH_COUNT_MAX_STATES), 1000, ("graph",)),
+    Benchmark("levels", lambda case: topological_levels(case.graph), 10 ** 6, ("graph",)),
+    Benchmark("reach-build", lambda case: ReachabilityIndex(case.graph), 10 ** 5, ("graph",)),
+    Benchmark("reach-query", lambda case: reach_queries(case.reach_index, case.names), 10 ** 5, ("reach_index",)),
+    Benchmark("reduce", lambda case: transitive_reduction(case.graph), 10 ** 5, ("graph",)),
+    Benchmark("critical-path", lambda case: critical_path_analysis(case.weighted_graph), 10 ** 6,
+              ("weighted_graph",)),
+    Benchmark("single-source", lambda case: single_source_distances(case.weighted_graph, case.names[0]), 10 ** 6,
+              ("weighted_graph",)),
+    Benchmark("routes-batch", lambda case: batch_routes(case.weighted_graph), 10 ** 5, ("weighted_graph",)),
+    Benchmark("floyd", lambda case: floyd_distance_matrix(case.weighted_graph), 1000, ("weighted_graph",)),
+    Benchmark("distance-cache", lambda case: DistanceCache(case.weighted_graph), 1000, ("weighted_graph",)),
+    Benchmark("layout-layered", lambda case: compute_layout(case.graph, LAYERED_LAYOUT), 10 ** 6, ("graph",)),
+    Benchmark("layout-spring", lambda case: compute_layout(case.graph, "Spring Layout"), 10 ** 4, ("graph",)),
+    Benchmark("layout-spectral", lambda case: compute_layout(case.graph, "Spectral Layout"), 10 ** 4, ("graph",)),
+    Benchmark("layout-kamada-kawai", lambda case: compute_layout(case.graph, "Kamada-Kawai Layout"), 1000,
+              ("graph",)),
+    Benchmark("layout-shell", lambda case: compute_layout(case.graph, "Shell Layout"), 10 ** 5, ("graph",)),
+    Benchmark("layout-circular", lambda case: compute_layout(case.graph, "Circular Layout"), 10 ** 5, ("graph",)),
+    Benchmark("render", lambda case: render_offscreen(case.graph, case.layout), 10 ** 5, ("graph", "layout")),
+    Benchmark("export", lambda case: export_temporary(case.graph, ".txt"), 10 ** 6, ("graph",)),
+    Benchmark("export-gz", lambda case: export_temporary(case.graph, ".txt.gz"), 10 ** 6, ("graph",)),
+    Benchmark("snapshot-save", lambda case: write_snapshot(case.temporary_path("save.tps"), case.snapshot), 10 ** 6,
+              ("snapshot",)),
+    Benchmark("snapshot-load", lambda case: load_snapshot(case.snapshot_path), 10 ** 6, ("snapshot_path",)),
+]
+
+
+# 准备用例中基准测试需要的属性，使其生成时间不计入测量
+def _prepare(case, needs):
+    for need in needs:
+        if need == "lines":
+            case.lines()
+        elif need == "weighted_lines":
+            case.lines(True)
+        else:
+            getattr(case, need)
+
+
+# 运行一项基准测试，返回结果记录
+# 耗时取repeat次中最短的一次；memory为True时另外运行一次，用tracemalloc记录内存峰值（字节）
+def run_benchmark(benchmark, case, repeat=1, memory=True):
+    record = {"benchmark": benchmark.name, "generator": case.generator, "size": case.size,
+              "nodes": len(case.names), "edges": len(case.sources)}
+    if case.size > benchmark.max_nodes:
+        record["status"] = "skipped"
+        return record
+    try:
+        _prepare(case, benchmark.needs)
+        seconds = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            benchmark.run(case)
+            seconds.append(time.perf_counter() - start)
+        record["seconds"] = min(seconds)
+        if memory:
+            tracemalloc.start()
+            try:
+                benchmark.run(case)
+                record["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        record["status"] = "ok"
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = "{}: {}".format(type(e).__name__, e)
+    return record
+
+
+# 运行环境的说明，便于比较不同机器和版本的结果
+def environment():
+    info = {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "time": time.strftime("%Y-%m-%d %H:%M:%S")}
+    for module in ("numpy", "networkx", "matplotlib"):
+        try:
+            info[module] = __import__(module).__version__
+        except ImportError:
+            info[module] = None
+    try:
+        info["commit"] = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                        cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        info["commit"] = None
+    return info
+
+
+# 一条结果的文字说明
+def format_record(record):
+    text = "{:<8} {:>8} {:<20}".format(record["generator"], record["size"], record["benchmark"])
+    if record["status"] != "ok":
+        return text + " " + record["status"] + (" " + record["error"] if "error" in record else "")
+    text += " {:>10.4f}s".format(record["seconds"])
+    if "peak_bytes" in record:
+        text += " {:>10.1f}MB".format(record["peak_bytes"] / 2 ** 20)
+    return text
+
+
+# 与基准结果比较，返回说明文字的列表；耗时超过基准REGRESSION_RATIO倍的项目标记为退化
+def compare_results(results, baseline):
+    def key(record):
+        return record["benchmark"], record["generator"], record["size"]
+
+    previous = {key(record): record for record in baseline["results"] if record.get("status") == "ok"}
+    lines = []
+    for record in results:
+        old = previous.get(key(record))
+        if record["status"] != "ok" or old is None:
+            continue
+        ratio = record["seconds"] / max(old["seconds"], 1e-9)
+        line = "{:<8} {:>8} {:<20} {:>10.4f}s -> {:>10.4f}s  x{:.2f}".format(
+            record["generator"], record["size"], record["benchmark"], old["seconds"], record["seconds"], ratio)
+        if ratio >= REGRESSION_RATIO:
+            line += "  变慢"
+        lines.append(line)
+    return lines
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="拓扑排序与最短路径的性能基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(BENCH_SIZES), help="图的规模（顶点数）")
+    parser.add_argument("--generators", nargs="+", choices=sorted(GENERATORS), default=list(GENERATORS),
+                        help="图的生成器")
+    parser.add_argument("--benchmarks", nargs="+", choices=[benchmark.name for benchmark in BENCHMARKS],
+                        default=[benchmark.name for benchmark in BENCHMARKS], help="要运行的基准测试")
+    parser.add_argument("--seed", type=int, default=0, help="生成器的随机种子")
+    parser.add_argument("--repeat", type=int, default=1, help="每项测试重复的次数，取最短的耗时")
+    parser.add_argument("--no-memory", action="store_true", help="不测量内存峰值（tracemalloc需要再运行一次）")
+    parser.add_argument("-o", "--output", help="结果保存为JSON文件")
+    parser.add_argument("--compare", help="与之前保存的JSON结果比较")
+    parser.add_argument("--startup", action="store_true", help="只测量图形界面的启动时间（需要PySide2）")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    selected = [benchmark for benchmark in BENCHMARKS if benchmark.name in args.benchmarks]
+    results = []
+    if args.startup:
+        results = run_startup(args.repeat)
+        for record in results:
+            print(format_record(record), file=sys.stderr, flush=True)
+    for generator, size in itertools.product(args.generators, args.sizes) if not args.startup else ():
+        case = BenchCase(generator, size, args.seed)
+        for benchmark in selected:
+            record = run_benchmark(benchmark, case, args.repeat, not args.no_memory)
+            results.append(record)
+            print(format_record(record), file=sys.stderr, flush=True)
+        case.close()
+
+    report = {"environment": environment(), "seed": args.seed, "results": results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=1)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+        print("\n".join(compare_results(results, baseline)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
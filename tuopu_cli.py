@@ -0,0 +1,342 @@
+# 拓扑排序/最短路径命令行工具
+# 不导入PySide2和matplotlib，可以在没有显示器的服务器上批量运行
+#
+# 用法示例：
+#   python tuopu_cli.py sort edges.txt --limit 100 -o orders.txt
+#   python tuopu_cli.py sort edges.txt --limit 0 -o orders.jsonl.gz
+#   python tuopu_cli.py sort edges.txt --limit 0 --jobs 0 -o orders.txt
+#   python tuopu_cli.py count edges.txt
+#   python tuopu_cli.py levels edges.txt --workers 4
+#   python tuopu_cli.py cycles edges.txt
+#   python tuopu_cli.py reach edges.txt --vertex c --queries pairs.txt
+#   python tuopu_cli.py reduce edges.txt -o reduced.txt
+#   python tuopu_cli.py sort edges.txt --reduce --limit 100
+#   python tuopu_cli.py paths weighted_edges.txt --start a
+#   python tuopu_cli.py routes weighted_edges.txt --sources a b --queries queries.txt --jobs 0 -o routes.csv
+#   python tuopu_cli.py schedule weighted_edges.txt --timings -o timings.csv
+#   python tuopu_cli.py snapshot edges.txt graph.tps --layout "Layered Layout"
+#   python tuopu_cli.py sort graph.tps --limit 100
+#
+# 输入文件可以是边数据文本，也可以是图形界面或snapshot子命令保存的快照（按文件开头的标识识别）
+import argparse
+import multiprocessing
+import sys
+
+import numpy as np
+
+from tuopu_core import iter_topological_sorts, count_topological_sorts, iter_parse_lines, iter_edge_file, \
+    iter_file_lines, format_parse_errors, topological_sort, topological_order, TOPO_ORDER_LIMIT
+from tuopu_cycles import find_cycles, condensation, format_cycle_report, strongly_connected_components
+from tuopu_export import EXPORT_FORMATS, export_format, replacing_export_file, write_orders, write_orders_parallel
+from tuopu_graph import CSRGraph
+from tuopu_layout import compute_layout, LAYERED_LAYOUT
+from tuopu_levels import topological_levels, write_levels
+from tuopu_reach import ReachabilityIndex, format_reachability, transitive_reduction, format_reduction
+from tuopu_paths import DistanceCache, path_cache, DENSE_MAX_NODES
+from tuopu_routes import parse_route_queries, group_route_queries, iter_routes, write_routes
+from tuopu_schedule import critical_path_analysis, format_schedule, write_schedule
+from tuopu_snapshot import Snapshot, is_snapshot, read_snapshot, write_snapshot
+
+# snapshot子命令可以计算的布局
+LAYOUT_OPTIONS = ("Spectral Layout", "Shell Layout", "Circular Layout", "Spring Layout", LAYERED_LAYOUT)
+
+
+# 流式读取输入文件中的边，"-"表示标准输入，格式错误的行输出到标准错误
+def iter_input_edges(path, weighted):
+    errors = []
+    if path == "-":
+        yield from iter_parse_lines(sys.stdin, weighted, errors)
+    else:
+        yield from iter_edge_file(path, weighted, errors)
+    if errors:
+        print(format_parse_errors(errors), end="", file=sys.stderr)
+
+
+# 输入文件为快照时返回读取的快照，否则返回None
+def input_snapshot(path):
+    return read_snapshot(path) if path != "-" and is_snapshot(path) else None
+
+
+# 快照中的图：weighted为True时要求图带权，否则去掉权重
+def snapshot_graph(snapshot, weighted):
+    graph = snapshot.graph
+    if not weighted:
+        return CSRGraph(graph.names, graph.offsets, graph.targets, index=graph.index)
+    if graph.weights is None:
+        raise ValueError("快照中的图没有权重")
+    return graph
+
+
+# 由无权边建立有向图，没有数据时抛出ValueError
+def build_graph(path, snapshot=None):
+    snapshot = snapshot or input_snapshot(path)
+    if snapshot is not None:
+        return snapshot_graph(snapshot, False)
+    G = CSRGraph.from_edges(iter_input_edges(path, False))
+    if G.number_of_edges() == 0:
+        raise ValueError("请添加正确格式的数据，例如：<a,b>")
+    return G
+
+
+# 传递约简后的图（拓扑排序不变），删除的边数输出到标准错误
+def reduce_graph(G):
+    keep = transitive_reduction(G)
+    print(format_reduction(G, keep, 0), end="", file=sys.stderr)
+    return G.edge_subgraph(keep)
+
+
+# 由无权边建立有向无环图，reduce为True时先做传递约简
+# 存在环时抛出带有环诊断信息的ValueError；condense为True时改为输出诊断信息到标准错误，
+# 并返回把每个强连通分量缩成一个顶点后的图
+def build_dag(path, condense=False, reduce=False):
+    snapshot = input_snapshot(path)
+    G = build_graph(path, snapshot)
+    if reduce:
+        G = reduce_graph(G)
+    # 快照中保存了拓扑序时图一定无环
+    if (snapshot is not None and snapshot.order is not None) or topological_sort(G) is not None:
+        return G
+    components = strongly_connected_components(G)
+    report = format_cycle_report(find_cycles(G, components))
+    if not condense:
+        raise ValueError(report + "可以使用 --condense 把每个环缩成一个顶点后排序")
+    print(report, end="", file=sys.stderr)
+    return condensation(G, components)
+
+
+# 由带权边建立带权有向图，没有数据时抛出ValueError
+def build_weighted_graph(path, snapshot=None):
+    snapshot = snapshot or input_snapshot(path)
+    if snapshot is not None:
+        return snapshot_graph(snapshot, True)
+    G = CSRGraph.from_edges(iter_input_edges(path, True), weighted=True)
+    if G.number_of_edges() == 0:
+        raise ValueError("请添加正确格式的数据，例如：<a,b,1>")
+    return G
+
+
+# 流式输出拓扑排序，每行一个，默认格式为 a->b->c
+# --jobs不为1时多进程枚举，0表示使用全部CPU核
+def run_sort(args, output):
+    G = build_dag(args.input, args.condense, args.reduce)
+    limit = None if args.limit <= 0 else args.limit
+    fmt = args.format or (export_format(args.output) if args.output else "txt")
+    if args.jobs == 1:
+        write_orders(iter_topological_sorts(G, limit), output, fmt)
+    else:
+        write_orders_parallel(G, output, fmt, limit, args.jobs or None, not args.unordered)
+
+
+# 输出拓扑排序的总数
+def run_count(args, output):
+    G = build_dag(args.input, args.condense, args.reduce)
+    count = count_topological_sorts(G)
+    if count is None:
+        raise ValueError("拓扑排序数量过多，无法精确计算")
+    output.write("{}\n".format(count))
+
+
+# 输出拓扑排序的分批，每批一行，同一批中的顶点可以同时执行
+def run_levels(args, output):
+    G = build_dag(args.input, args.condense, args.reduce)
+    if args.workers < 0:
+        raise ValueError("每批的顶点数不能为负数")
+    fmt = args.format or (export_format(args.output) if args.output else "txt")
+    write_levels(topological_levels(G, args.workers or None), G.names, output, fmt)
+
+
+# 输出环的诊断信息，没有环时只输出提示
+def run_cycles(args, output):
+    report = find_cycles(build_graph(args.input))
+    output.write("输入的数据中没有环\n" if report is None else format_cycle_report(report))
+
+
+# 可达性查询：--vertex中的每个顶点输出全部上游和下游顶点；--queries文件中每行"上游顶点,下游顶点"（"-"表示标准输入），
+# 每行输出两个顶点和前者是否在后者的上游（true/false），只有一个顶点的行与--vertex相同；图中可以有环
+def run_reach(args, output):
+    G = build_graph(args.input)
+    queries = [(name, None) for name in args.vertex or ()]
+    if args.queries:
+        errors = []
+        queries += parse_route_queries(sys.stdin if args.queries == "-" else iter_file_lines(args.queries), errors)
+        if errors:
+            print(format_parse_errors(errors), end="", file=sys.stderr)
+    if not queries:
+        raise ValueError("请用 --vertex 或 --queries 指定顶点")
+    missing = sorted({name for query in queries for name in query if name is not None and name not in G})
+    if missing:
+        raise ValueError("以下顶点不在图中：" + ", ".join(missing))
+    index = ReachabilityIndex(G)
+    for a, b in queries:
+        if b is None:
+            output.write(format_reachability(index, a, index.ancestor_mask(a), index.descendant_mask(a),
+                                             G.number_of_nodes()))
+        else:
+            output.write("{}\t{}\t{}\n".format(a, b, "true" if index.reaches(a, b) else "false"))
+
+
+# 传递约简：输出约简后的边（与输入格式相同，每行一条），--removed时改为输出删除的边；删除的边数输出到标准错误
+def run_reduce(args, output):
+    G = build_graph(args.input)
+    keep = transitive_reduction(G)
+    print(format_reduction(G, keep, 0), end="", file=sys.stderr)
+    selected = ~keep if args.removed else keep
+    names = G.names
+    for a, b in zip(G.sources()[selected].tolist(), G.targets[selected].tolist()):
+        output.write("<{},{}>\n".format(names[a], names[b]))
+
+
+# 输出从起始点出发的最短路径，每行：终点、距离、路径（制表符分隔），不可达的距离为inf
+def run_paths(args, output):
+    snapshot = input_snapshot(args.input)
+    G = build_weighted_graph(args.input, snapshot)
+    if args.start not in G:
+        raise ValueError("起始点 '{}' 不在图中".format(args.start))
+
+    # 快照中保存了全源最短路径矩阵时直接使用，否则顶点较多时不计算全源最短路径，只计算这一个起点
+    cache = (snapshot is not None and snapshot.distance_cache()) or path_cache(G)
+    for node, distance in cache.distances_from(args.start).items():
+        if node == args.start:
+            continue
+        path = cache.shortest_path(args.start, node)
+        output.write("{}\t{}\t{}\n".format(node, distance, "->".join(path) if path else ""))
+
+
+# 批量最短路径查询：--sources中的起点到全部顶点，--queries文件中每行一个起点或"起点,终点"（"-"表示标准输入）
+# 查询按起点分组后一次计算，每行输出起点、终点、距离和路径；--jobs不为1时起点较多的按起点查询使用多进程
+def run_routes(args, output):
+    snapshot = input_snapshot(args.input)
+    G = build_weighted_graph(args.input, snapshot)
+    queries = [(source, None) for source in args.sources or ()]
+    if args.queries:
+        errors = []
+        queries += parse_route_queries(sys.stdin if args.queries == "-" else iter_file_lines(args.queries), errors)
+        if errors:
+            print(format_parse_errors(errors), end="", file=sys.stderr)
+    if not queries:
+        raise ValueError("请用 --sources 或 --queries 指定起点")
+    groups = group_route_queries(queries, G.index)
+
+    cache = (snapshot is not None and snapshot.distance_cache()) or path_cache(G)
+    fmt = args.format or (export_format(args.output) if args.output else "txt")
+    graph_path = args.input if snapshot is not None else None
+    write_routes(iter_routes(cache, groups, args.jobs or None, graph_path=graph_path), output, fmt)
+
+
+# 关键路径分析：默认输出总工期、关键路径和各顶点的时间（最多SCHEDULE_DISPLAY_ROWS个），
+# --timings时按CSV格式输出全部顶点的最早开始、最迟开始时间和时差
+def run_schedule(args, output):
+    schedule = critical_path_analysis(build_weighted_graph(args.input))
+    if args.timings:
+        write_schedule(schedule, output)
+    else:
+        output.write(format_schedule(schedule))
+
+
+# 把边数据保存为快照：无权图同时保存拓扑序和拓扑排序总数，带权图在顶点不超过DENSE_MAX_NODES时保存全源最短路径矩阵；
+# 指定--layout时计算并保存布局，图形界面打开快照时直接使用
+def run_snapshot(args, output):
+    G = build_weighted_graph(args.input) if args.weighted else build_graph(args.input)
+    order = topological_order(G)
+    count = None
+    if not args.weighted:
+        # 与图形界面相同，有环时保存缩点后的图的拓扑排序总数
+        count = count_topological_sorts(G if order is not None else condensation(G))
+    matrices = (None, None)
+    if args.weighted and G.number_of_nodes() <= DENSE_MAX_NODES:
+        cache = DistanceCache(G)
+        matrices = cache.matrices(G.names)
+    positions = None
+    if args.layout is not None:
+        pos = compute_layout(G, args.layout)
+        positions = np.array([pos[name] for name in G.names], dtype=np.float64).reshape(-1, 2)
+    order = None if order is None else np.array(order, dtype=np.int64)
+    size = write_snapshot(args.snapshot, Snapshot(G, positions, order, count, args.layout, *matrices))
+    output.write("已保存快照：{}个顶点，{}条边，{}字节\n".format(G.number_of_nodes(), G.number_of_edges(), size))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="拓扑排序与最短路径命令行工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    sort_parser = subparsers.add_parser("sort", help="输出拓扑排序")
+    sort_parser.add_argument("--limit", type=int, default=TOPO_ORDER_LIMIT, help="最多输出的排序数量，0表示不限制")
+    sort_parser.add_argument("--format", choices=EXPORT_FORMATS,
+                             help="输出格式：txt（a->b->c）、csv或jsonl，默认按输出文件的扩展名决定")
+    sort_parser.add_argument("--jobs", type=int, default=1, help="并行枚举的进程数，0表示使用全部CPU核，默认为1")
+    sort_parser.add_argument("--unordered", action="store_true",
+                             help="并行枚举时按完成的先后输出，不保证与串行相同的顺序")
+    sort_parser.set_defaults(func=run_sort)
+
+    count_parser = subparsers.add_parser("count", help="输出拓扑排序的总数")
+    count_parser.set_defaults(func=run_count)
+
+    levels_parser = subparsers.add_parser("levels", help="输出拓扑排序的分批（每批中的顶点可以同时执行）")
+    levels_parser.add_argument("--workers", type=int, default=0, help="每批最多的顶点数，0表示不限制")
+    levels_parser.add_argument("--format", choices=EXPORT_FORMATS,
+                               help="输出格式：txt（顶点之间用空格分隔）、csv或jsonl，默认按输出文件的扩展名决定")
+    levels_parser.set_defaults(func=run_levels)
+
+    cycles_parser = subparsers.add_parser("cycles", help="输出图中的环、强连通分量和建议删除的边")
+    cycles_parser.set_defaults(func=run_cycles)
+
+    reach_parser = subparsers.add_parser("reach", help="查询顶点的全部上游和下游，或一个顶点是否在另一个顶点的上游")
+    reach_parser.add_argument("--vertex", nargs="+", help="顶点，输出它的全部上游和下游顶点")
+    reach_parser.add_argument("--queries", help="查询文件，每行\"上游顶点,下游顶点\"或一个顶点，- 表示标准输入")
+    reach_parser.set_defaults(func=run_reach)
+
+    reduce_parser = subparsers.add_parser("reduce", help="传递约简：删除可以由其他路径代替的边，拓扑排序不变")
+    reduce_parser.add_argument("--removed", action="store_true", help="输出删除的边，而不是保留的边")
+    reduce_parser.set_defaults(func=run_reduce)
+
+    paths_parser = subparsers.add_parser("paths", help="输出带权图中从起始点出发的最短路径")
+    paths_parser.add_argument("--start", required=True, help="起始点")
+    paths_parser.set_defaults(func=run_paths)
+
+    routes_parser = subparsers.add_parser("routes", help="批量查询带权图中多个起点或多个(起点, 终点)的最短路径")
+    routes_parser.add_argument("--sources", nargs="+", help="起点，查询到全部顶点的最短路径")
+    routes_parser.add_argument("--queries", help="查询文件，每行一个起点或\"起点,终点\"，- 表示标准输入")
+    routes_parser.add_argument("--format", choices=EXPORT_FORMATS,
+                               help="输出格式：txt（制表符分隔）、csv或jsonl，默认按输出文件的扩展名决定")
+    routes_parser.add_argument("--jobs", type=int, default=1, help="并行计算的进程数，0表示使用全部CPU核，默认为1")
+    routes_parser.set_defaults(func=run_routes)
+
+    schedule_parser = subparsers.add_parser("schedule", help="带权无环图的关键路径分析（最早、最迟开始时间和时差）")
+    schedule_parser.add_argument("--timings", action="store_true", help="按CSV格式输出全部顶点的时间")
+    schedule_parser.set_defaults(func=run_schedule)
+
+    snapshot_parser = subparsers.add_parser("snapshot", help="把边数据保存为二进制快照，之后可以直接作为各子命令和图形界面的输入")
+    snapshot_parser.add_argument("--weighted", action="store_true", help="输入为带权边")
+    snapshot_parser.add_argument("--layout", choices=LAYOUT_OPTIONS, help="同时计算并保存布局")
+    snapshot_parser.set_defaults(func=run_snapshot)
+
+    for subparser in (sort_parser, count_parser, levels_parser):
+        subparser.add_argument("--condense", action="store_true", help="存在环时把每个环缩成一个顶点后继续计算")
+        subparser.add_argument("--reduce", action="store_true", help="先做传递约简，删除可以由其他路径代替的边")
+    for subparser in (sort_parser, count_parser, levels_parser, cycles_parser, reach_parser, reduce_parser,
+                      paths_parser, routes_parser, schedule_parser, snapshot_parser):
+        subparser.add_argument("input", help="边数据文件或快照，- 表示标准输入")
+        subparser.add_argument("-o", "--output", help="结果输出文件，以.gz结尾时使用gzip压缩，默认输出到标准输出")
+    snapshot_parser.add_argument("snapshot", help="保存的快照文件")
+    return parser
+
+
+# 指定输出文件时先写入临时文件（<输出文件>.part），完成后再替换输出文件；出错或中断时删除临时文件，不留下不完整的结果
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        if args.output:
+            with replacing_export_file(args.output) as output:
+                args.func(args, output)
+        else:
+            args.func(args, sys.stdout)
+    except (ValueError, OSError) as e:
+        print("错误：" + str(e), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    # 打包后的程序中，进程池（spawn方式）启动的子进程会重新执行程序入口，由此转去执行子进程的任务
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,354 @@
+# 拓扑排序计算核心
+# 本模块不依赖PySide2和matplotlib，界面程序和其他脚本都可以直接导入使用
+import itertools
+import math
+import mmap
+import os
+import re
+
+# 默认最多枚举的拓扑排序数量，排序个数随节点数按阶乘增长，必须设置上限
+TOPO_ORDER_LIMIT = 1000
+# 界面中每次显示的拓扑排序数量
+TOPO_PAGE_SIZE = 20
+
+
+# 无权边的输入格式："<a,b>" 或 "《a,b》"
+EDGE_PATTERN = r'<(\w+),(\w+)>|《(\w+),(\w+)》'
+# 带权边的输入格式："<a,b,1>" 或 "《a,b,1》"
+WEIGHTED_EDGE_PATTERN = r'<(\w+),(\w+),(\d+)>|《(\w+),(\w+),(\d+)》'
+# 一行中多条边之间允许出现的分隔字符
+SEPARATOR_CHARS = " \t\r\n,，;；、"
+# 流式读取文件时的缓冲区大小
+READ_CHUNK_SIZE = 1 << 20
+
+
+# 把一个正则匹配结果转换为边
+def _match_to_edge(match, weighted):
+    groups = match.groups()
+    if not weighted:
+        a, b = groups[0:2] if groups[0] else groups[2:4]  # 尖括号或双尖括号
+        return a.strip(), b.strip()
+    a, b, weight = groups[0:3] if groups[0] else groups[3:6]
+    return a.strip(), b.strip(), int(weight)
+
+
+# 逐行流式解析边数据，lines为任意可迭代的文本行（文件对象、列表等）
+# 无权边生成(a, b)，带权边生成(a, b, 权重)
+# errors不为None时，含有无法识别内容的行以(行号, 行内容)追加到errors中
+def iter_parse_lines(lines, weighted=False, errors=None):
+    pattern = re.compile(WEIGHTED_EDGE_PATTERN if weighted else EDGE_PATTERN)
+    for line_no, line in enumerate(lines, 1):
+        end = 0
+        malformed = False
+        for match in pattern.finditer(line):
+            if line[end:match.start()].strip(SEPARATOR_CHARS):
+                malformed = True
+            end = match.end()
+            yield _match_to_edge(match, weighted)
+        if errors is not None and (malformed or line[end:].strip(SEPARATOR_CHARS)):
+            errors.append((line_no, line.strip()))
+
+
+# 逐行读取文本文件，不把整个文件读入内存
+# use_mmap为True时通过内存映射读取，适合反复读取的大文件
+def iter_file_lines(path, use_mmap=False):
+    if use_mmap and os.path.getsize(path) > 0:
+        with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for line in iter(mapped.readline, b""):
+                yield line.decode('utf-8', errors='replace')
+    else:
+        with open(path, 'r', encoding='utf-8', errors='replace', buffering=READ_CHUNK_SIZE) as file:
+            yield from file
+
+
+# 从磁盘流式解析边数据文件，边解析边生成，可直接传给CSRGraph.from_edges
+def iter_edge_file(path, weighted=False, errors=None, use_mmap=False):
+    return iter_parse_lines(iter_file_lines(path, use_mmap), weighted, errors)
+
+
+# 从文本中解析无权边，返回[(a, b), ...]
+# 没有匹配到任何数据时抛出ValueError
+def parse_edges(input_text, errors=None):
+    edges = list(iter_parse_lines(input_text.splitlines(), False, errors))
+    if not edges:
+        raise ValueError("请添加正确格式的数据，例如：<a,b>")
+    return edges
+
+
+# 从文本中解析带权边，返回[(a, b, 权重), ...]
+# 没有匹配到任何数据时抛出ValueError
+def parse_weighted_edges(input_text, errors=None):
+    weighted_edges = list(iter_parse_lines(input_text.splitlines(), True, errors))
+    if not weighted_edges:
+        raise ValueError("请添加正确格式的数据，例如：<a,b,1>")
+    return weighted_edges
+
+
+# 把格式错误的行整理为提示文字，最多列出max_lines行
+def format_parse_errors(errors, max_lines=10):
+    text = "共有{}行数据格式错误，已跳过：\n".format(len(errors))
+    for line_no, line in errors[:max_lines]:
+        text += "第{}行：{}\n".format(line_no, line)
+    if len(errors) > max_lines:
+        text += "……\n"
+    return text
+
+
+# 用Kahn算法求一个拓扑排序（顶点下标列表），图中有环时返回None
+# graph为tuopu_graph.CSRGraph，以下函数均直接使用顶点下标计算
+def topological_order(graph):
+    in_degree = graph.in_degrees().tolist()
+    successors = graph.successor_lists()
+
+    order = [i for i, degree in enumerate(in_degree) if degree == 0]
+    for i in order:
+        for j in successors[i]:
+            in_degree[j] -= 1
+            if in_degree[j] == 0:
+                order.append(j)
+    if len(order) < len(in_degree):
+        return None
+    return order
+
+
+# 求一个拓扑排序（顶点名称列表），图中有环时返回None
+def topological_sort(graph):
+    order = topological_order(graph)
+    if order is None:
+        return None
+    return [graph.names[i] for i in order]
+
+
+# 当前可选的（入度为0的）顶点保存在循环双向链表中，head为哨兵
+# 选择一个顶点时把它从链表中摘下，新变为入度0的顶点追加到末尾；撤销时按相反的顺序恢复，
+# 被摘下的顶点仍然记得原来的前后邻居，可以直接放回原位。每一步只需O(1 + 出度)的时间，不复制候选列表
+class _Candidates:
+
+    def __init__(self, num_nodes, initial):
+        self.head = num_nodes
+        self.next = [num_nodes] * (num_nodes + 1)
+        self.prev = [num_nodes] * (num_nodes + 1)
+        for node in initial:
+            self.append(node)
+
+    def append(self, node):
+        tail = self.prev[self.head]
+        self.next[tail] = node
+        self.prev[node] = tail
+        self.next[node] = self.head
+        self.prev[self.head] = node
+
+    def unlink(self, node):
+        self.next[self.prev[node]] = self.next[node]
+        self.prev[self.next[node]] = self.prev[node]
+
+    def relink(self, node):
+        self.next[self.prev[node]] = node
+        self.prev[self.next[node]] = node
+
+    # 删除末尾的count个顶点
+    def truncate(self, count):
+        for _ in range(count):
+            self.unlink(self.prev[self.head])
+
+
+# 选择顶点node：从候选中摘下，后继的入度减1，新变为入度0的后继追加到候选末尾，返回追加的数量
+def _choose(node, successors, in_degree, candidates):
+    candidates.unlink(node)
+    added = 0
+    for succ in successors[node]:
+        in_degree[succ] -= 1
+        if in_degree[succ] == 0:
+            candidates.append(succ)
+            added += 1
+    return added
+
+
+# 撤销_choose
+def _unchoose(node, added, successors, in_degree, candidates):
+    candidates.truncate(added)
+    for succ in successors[node]:
+        in_degree[succ] += 1
+    candidates.relink(node)
+
+
+# 求出依次选定前缀prefix（顶点下标列表）之后的搜索状态，规则与iter_topological_orders完全相同
+# 返回(后继列表, 入度列表, 候选链表)；前缀不是合法的拓扑序前缀时抛出ValueError
+def _prefix_state(graph, prefix):
+    successors = graph.successor_lists()
+    in_degree = graph.in_degrees().tolist()
+    candidates = _Candidates(len(in_degree), [i for i in range(len(in_degree)) if in_degree[i] == 0])
+    chosen = set()
+    for node in prefix:
+        if in_degree[node] != 0 or node in chosen:
+            raise ValueError("{} 不是合法的拓扑排序前缀".format(list(prefix)))
+        chosen.add(node)
+        _choose(node, successors, in_degree, candidates)
+    return successors, in_degree, candidates
+
+
+# 按需逐个生成拓扑排序（顶点下标列表），生成的列表会被复用，调用者需要保存时应自行复制
+# limit为最多生成的数量，None表示不限制；prefix为已经选定的前几个顶点，只枚举以其开头的排序；
+# depth不为None时只在prefix之后再选depth个顶点，生成的是排序的前缀（用于把搜索树划分为子树）
+# 生成顺序与不带prefix时的顺序一致，因此按前缀的顺序依次枚举各子树，结果与整体枚举完全相同
+# 每一层依次尝试当前的候选顶点；下一层的候选为本层候选去掉所选顶点、再在末尾加上新变为入度0的顶点
+def iter_topological_orders(graph, limit=None, prefix=(), depth=None):
+    num_nodes = len(graph.names)
+    successors, in_degree, candidates = _prefix_state(graph, prefix)
+    order = list(prefix)
+    stop = num_nodes if depth is None else min(num_nodes, len(order) + depth)
+    if len(order) == stop:
+        if num_nodes > 0:
+            yield order
+        return
+
+    # 用显式栈代替递归，避免节点较多时超出递归深度；每一层记录所选的顶点和因此追加的候选数量
+    head = candidates.head
+    following = candidates.next
+    stack = []
+    node = following[head]
+    count = 0
+    while True:
+        if node == head:
+            # 本层的候选已经全部尝试过，回到上一层尝试下一个候选
+            if not stack:
+                return
+            node, added = stack.pop()
+            order.pop()
+            _unchoose(node, added, successors, in_degree, candidates)
+            node = following[node]
+            continue
+
+        added = _choose(node, successors, in_degree, candidates)
+        order.append(node)
+        if len(order) == stop:
+            yield order
+            count += 1
+            if limit is not None and count >= limit:
+                return
+            order.pop()
+            _unchoose(node, added, successors, in_degree, candidates)
+            node = following[node]
+        else:
+            stack.append((node, added))
+            node = following[head]
+
+
+# 按需逐个生成所有拓扑排序（顶点名称列表）
+# limit为最多生成的排序数量，None表示不限制；调用者停止迭代即可提前结束枚举
+def iter_topological_sorts(graph, limit=None):
+    names = graph.names
+    for order in iter_topological_orders(graph, limit):
+        yield [names[i] for i in order]
+
+
+# 拓扑排序分页器，每次只向生成器索取一页结果
+class TopoOrderPager:
+
+    def __init__(self, graph, limit=TOPO_ORDER_LIMIT):
+        self.limit = limit
+        self.count = 0  # 已经取出的排序数量
+        self.exhausted = False  # 是否已经没有更多排序
+        self._orders = iter_topological_sorts(graph, limit)
+
+    # 取出下一页排序结果，最多size个
+    def next_page(self, size=TOPO_PAGE_SIZE):
+        if self.exhausted:
+            return []
+        page = list(itertools.islice(self._orders, size))
+        self.count += len(page)
+        if len(page) < size or self.reached_limit():
+            self.exhausted = True
+        return page
+
+    # 是否因为达到上限而停止（而不是真正枚举完毕）
+    def reached_limit(self):
+        return self.limit is not None and self.count >= self.limit
+
+
+# 子集动态规划允许的最大状态数，超过时放弃精确计数
+COUNT_MAX_STATES = 100000
+
+
+# 计算单个连通分量的拓扑排序数量（子集动态规划）
+# dp[mask]表示先排好mask中节点的方案数，同时记录此时可选节点的位掩码，
+# 加入节点i后只需检查i的后继是否变为可选，避免每个状态都扫描全部节点
+def _count_component(nodes, successors, max_states):
+    index = {node: i for i, node in enumerate(nodes)}
+    succ_lists = [[index[succ] for succ in successors[node]] for node in nodes]
+    pred_masks = [0] * len(nodes)
+    for i, succs in enumerate(succ_lists):
+        for j in succs:
+            pred_masks[j] |= 1 << i
+
+    sources = 0
+    for i, pred_mask in enumerate(pred_masks):
+        if not pred_mask:
+            sources |= 1 << i
+
+    layer = {0: [1, sources]}
+    for _ in range(len(nodes)):
+        next_layer = {}
+        for mask, (ways, available) in layer.items():
+            rest = available
+            while rest:
+                bit = rest & -rest
+                rest ^= bit
+                new_mask = mask | bit
+                state = next_layer.get(new_mask)
+                if state is None:
+                    new_available = available ^ bit
+                    for j in succ_lists[bit.bit_length() - 1]:
+                        if pred_masks[j] & new_mask == pred_masks[j]:
+                            new_available |= 1 << j
+                    next_layer[new_mask] = [ways, new_available]
+                    # 一层的状态数可能是上一层的很多倍（如一个顶点指向其余全部顶点），超过上限时立即放弃，不等这一层算完
+                    if len(next_layer) > max_states:
+                        return None
+                else:
+                    state[0] += ways
+        if not next_layer:
+            return 0  # 存在环，无法继续排序
+        layer = next_layer
+    return sum(ways for ways, _ in layer.values())
+
+
+# 计算拓扑排序的总数，不需要逐个枚举
+# 先拆分弱连通分量分别计数，再乘以各分量交错排列的多项式系数
+# 返回Python大整数；图中有环时返回0；状态数超过max_states时返回None
+def count_topological_sorts(graph, max_states=COUNT_MAX_STATES):
+    num_nodes = len(graph.names)
+    successors = graph.successor_lists()
+    # 只有一个顶点的分量不做动态规划，自环要单独检查
+    if any(i in successors[i] for i in range(num_nodes)):
+        return 0
+
+    # 用并查集划分弱连通分量
+    parent = list(range(num_nodes))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i in range(num_nodes):
+        for j in successors[i]:
+            parent[find(i)] = find(j)
+
+    components = {}
+    for i in range(num_nodes):
+        components.setdefault(find(i), []).append(i)
+
+    total = 1
+    placed = 0
+    for component in components.values():
+        if len(component) > 1:
+            ways = _count_component(component, successors, max_states)
+            if ways is None:
+                return None
+            total *= ways
+        # 新分量的节点与已放置节点交错排列
+        placed += len(component)
+        total *= math.comb(placed, len(component))
+    return total
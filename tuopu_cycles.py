@@ -0,0 +1,259 @@
+# 环的诊断
+# 图中有环时，用迭代版Tarjan算法求出全部强连通分量（线性时间，不受递归深度限制），
+# 对每个含环的分量给出一个最短的环作为例证，并用Eades-Lin-Smyth贪心算法给出一组建议删除的边；
+# 把每个强连通分量缩成一个顶点后得到的图无环，仍然可以做拓扑排序
+# 本模块不依赖PySide2和matplotlib
+import heapq
+from collections import deque
+
+import numpy as np
+
+from tuopu_graph import CSRGraph
+
+# 缩点后的顶点名称中最多列出的成员数
+CONDENSED_NAME_MEMBERS = 5
+
+
+# 迭代版Tarjan算法，返回强连通分量列表（每个分量为顶点下标列表）
+# 分量按缩点图的逆拓扑序排列（没有出边的分量在前）
+def strongly_connected_components(graph, successors=None):
+    if successors is None:
+        successors = graph.successor_lists()
+    num_nodes = len(successors)
+    index = [-1] * num_nodes
+    low = [0] * num_nodes
+    on_stack = [False] * num_nodes
+    stack = []
+    components = []
+    counter = 0
+
+    for root in range(num_nodes):
+        if index[root] >= 0:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, 0)]  # 模拟递归调用栈：(顶点, 下一个要访问的后继序号)
+        while work:
+            v, i = work[-1]
+            if i < len(successors[v]):
+                work[-1] = (v, i + 1)
+                w = successors[v][i]
+                if index[w] < 0:
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = True
+                    work.append((w, 0))
+                elif on_stack[w] and index[w] < low[v]:
+                    low[v] = index[w]
+                continue
+
+            work.pop()
+            if work and low[v] < low[work[-1][0]]:
+                low[work[-1][0]] = low[v]
+            if low[v] == index[v]:
+                component = []
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = False
+                    component.append(w)
+                    if w == v:
+                        break
+                components.append(component)
+    return components
+
+
+# 分量中经过第一个顶点的最短环（顶点下标列表，首尾不重复），用广度优先搜索求得
+def _witness_cycle(component, successors, component_of, component_id):
+    start = component[0]
+    parents = {start: None}
+    queue = deque([start])
+    while queue:
+        v = queue.popleft()
+        for w in successors[v]:
+            if w == start:
+                cycle = [v]
+                while parents[cycle[-1]] is not None:
+                    cycle.append(parents[cycle[-1]])
+                return cycle[::-1]
+            if component_of[w] == component_id and w not in parents:
+                parents[w] = v
+                queue.append(w)
+    return [start]
+
+
+# Eades-Lin-Smyth贪心算法：不断把汇点放到序列末尾、源点放到序列开头，
+# 都没有时取出度减入度最大的顶点放到开头；最后与序列方向相反的边即为建议删除的边
+def _greedy_order(component, successors):
+    inside = set(component)
+    out_degree = {v: 0 for v in component}
+    in_degree = {v: 0 for v in component}
+    predecessors = {v: [] for v in component}
+    for v in component:
+        for w in successors[v]:
+            if w in inside and w != v:
+                out_degree[v] += 1
+                in_degree[w] += 1
+                predecessors[w].append(v)
+
+    head, tail = [], []
+    remaining = set(component)
+    sinks = [v for v in component if out_degree[v] == 0]
+    sources = [v for v in component if in_degree[v] == 0 and out_degree[v] > 0]
+    heap = [(in_degree[v] - out_degree[v], v) for v in component]
+    heapq.heapify(heap)
+
+    def remove(v):
+        remaining.discard(v)
+        for w in successors[v]:
+            if w in remaining and w != v:
+                in_degree[w] -= 1
+                if in_degree[w] == 0:
+                    sources.append(w)
+                heapq.heappush(heap, (in_degree[w] - out_degree[w], w))
+        for u in predecessors[v]:
+            if u in remaining:
+                out_degree[u] -= 1
+                if out_degree[u] == 0:
+                    sinks.append(u)
+                heapq.heappush(heap, (in_degree[u] - out_degree[u], u))
+
+    while remaining:
+        if sinks:
+            v = sinks.pop()
+            if v in remaining:
+                tail.append(v)
+                remove(v)
+        elif sources:
+            v = sources.pop()
+            if v in remaining:
+                head.append(v)
+                remove(v)
+        else:
+            # 堆中的旧记录在取出时跳过
+            key, v = heapq.heappop(heap)
+            if v in remaining and key == in_degree[v] - out_degree[v]:
+                head.append(v)
+                remove(v)
+    return head + tail[::-1]
+
+
+class CycleReport:
+
+    def __init__(self, graph, components, cycles, break_edges):
+        self.graph = graph
+        self.components = components  # 含环的强连通分量（顶点下标列表）
+        self.cycles = cycles  # 每个分量的一个环（顶点下标列表）
+        self.break_edges = break_edges  # 每个分量建议删除的边在CSR数组中的位置列表
+
+    # 建议删除的全部边（顶点名称对）
+    def break_edge_names(self):
+        names = self.graph.names
+        sources = self.graph.sources()
+        return [(names[sources[k]], names[self.graph.targets[k]]) for edges in self.break_edges for k in edges]
+
+    # 与CSR边顺序一致的布尔数组，标记建议删除的边
+    def break_edge_mask(self):
+        mask = np.zeros(self.graph.number_of_edges(), dtype=bool)
+        for edges in self.break_edges:
+            mask[edges] = True
+        return mask
+
+    # 与顶点顺序一致的布尔数组，标记环上（含环分量中）的顶点
+    def cyclic_node_mask(self):
+        mask = np.zeros(self.graph.number_of_nodes(), dtype=bool)
+        for component in self.components:
+            mask[component] = True
+        return mask
+
+
+# 诊断图中的环，无环时返回None
+# components为已经求出的强连通分量，可以与condensation共用
+def find_cycles(graph, components=None):
+    successors = graph.successor_lists()
+    if components is None:
+        components = strongly_connected_components(graph, successors)
+    component_of = [0] * graph.number_of_nodes()
+    for component_id, component in enumerate(components):
+        for v in component:
+            component_of[v] = component_id
+
+    offsets = graph.offsets.tolist()
+    cyclic, cycles, break_edges = [], [], []
+    for component_id, component in enumerate(components):
+        if len(component) == 1 and component[0] not in successors[component[0]]:
+            continue
+        component = sorted(component)
+        cyclic.append(component)
+        cycles.append(_witness_cycle(component, successors, component_of, component_id))
+
+        order = _greedy_order(component, successors)
+        position = {v: i for i, v in enumerate(order)}
+        edges = []
+        for v in component:
+            for k in range(offsets[v], offsets[v + 1]):
+                w = successors[v][k - offsets[v]]
+                if component_of[w] == component_id and position[w] <= position[v]:
+                    edges.append(k)
+        break_edges.append(edges)
+
+    if not cyclic:
+        return None
+    # 按分量中最先输入的顶点排序，便于对照输入数据
+    order = sorted(range(len(cyclic)), key=lambda i: cyclic[i][0])
+    return CycleReport(graph, [cyclic[i] for i in order], [cycles[i] for i in order],
+                       [break_edges[i] for i in order])
+
+
+# 缩点后顶点的名称，如 "{a,b,c}"，成员过多时只列出前几个
+def _condensed_name(members):
+    if len(members) > CONDENSED_NAME_MEMBERS:
+        return "{{{},…共{}个}}".format(",".join(members[:CONDENSED_NAME_MEMBERS]), len(members))
+    return "{{{}}}".format(",".join(members))
+
+
+# 把每个强连通分量缩成一个顶点，得到无环的CSRGraph
+# 不含环的顶点保持原名，顶点按其分量中最先输入的顶点排序
+def condensation(graph, components=None):
+    if components is None:
+        components = strongly_connected_components(graph)
+    components = sorted((sorted(component) for component in components), key=lambda component: component[0])
+    component_of = np.empty(graph.number_of_nodes(), dtype=np.int64)
+    names = []
+    for component_id, component in enumerate(components):
+        component_of[component] = component_id
+        if len(component) == 1:
+            names.append(graph.names[component[0]])
+        else:
+            names.append(_condensed_name([graph.names[v] for v in component]))
+
+    sources, targets = component_of[graph.sources()], component_of[graph.targets]
+    between = sources != targets
+    return CSRGraph.from_arrays(names, sources[between], targets[between])
+
+
+# 把诊断结果整理为可以直接显示的文字
+def format_cycle_report(report, max_components=10, max_items=20):
+    names = report.graph.names
+    sources = report.graph.sources()
+    targets = report.graph.targets
+
+    def join(items, separator):
+        text = separator.join(items[:max_items])
+        if len(items) > max_items:
+            text += "{}……共{}个".format(separator, len(items))
+        return text
+
+    total = sum(len(edges) for edges in report.break_edges)
+    lines = ["输入的数据存在依赖关系：共有{}个含环的强连通分量，建议删除{}条边。".format(len(report.components), total)]
+    for number, (component, cycle, edges) in enumerate(zip(report.components, report.cycles, report.break_edges), 1):
+        if number > max_components:
+            lines.append("其余{}个分量未列出。".format(len(report.components) - max_components))
+            break
+        lines.append("分量{}（{}个顶点）：{}".format(number, len(component), join([names[v] for v in component], ", ")))
+        lines.append("  环：" + "->".join(names[v] for v in cycle + cycle[:1]))
+        lines.append("  建议删除的边：" + join(["<{},{}>".format(names[sources[k]], names[targets[k]])
+                                           for k in edges], " "))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,124 @@
+# 拓扑排序结果的流式导出
+# 排序结果由生成器逐个产生，每次格式化一块后写入文件，内存占用与导出的数量无关；
+# 支持每行一个排序的文本、CSV和JSON Lines三种格式，文件名以.gz结尾时使用gzip压缩
+# 本模块不依赖PySide2和matplotlib
+import contextlib
+import csv
+import functools
+import gzip
+import io
+import itertools
+import json
+import os
+import shutil
+
+from tuopu_core import iter_topological_sorts
+from tuopu_parallel import iter_subtree_files, make_prefixes
+
+# 支持的导出格式：文本（a->b->c）、CSV（每个顶点一列）、JSON Lines（每行一个JSON数组）
+EXPORT_FORMATS = ("txt", "csv", "jsonl")
+# 每写入这么多个排序汇报一次进度
+EXPORT_CHUNK_SIZE = 1000
+# gzip压缩级别：排序结果重复度很高，级别6的压缩率与最高级别9相差无几，速度快约十倍
+GZIP_LEVEL = 6
+# 要导出的排序数量不少于该值（或数量未知）时，界面中的导出使用多进程
+PARALLEL_EXPORT_MIN_ORDERS = 100000
+
+
+# 由文件名推断导出格式（忽略.gz后缀），无法识别时为文本格式
+def export_format(path):
+    name = path[:-3] if path.endswith(".gz") else path
+    extension = os.path.splitext(name)[1].lower().lstrip(".")
+    return extension if extension in EXPORT_FORMATS else "txt"
+
+
+# 以文本方式打开输出文件，compress为None时按文件名是否以.gz结尾决定是否使用gzip压缩
+def open_export_file(path, compress=None):
+    if compress is None:
+        compress = path.endswith(".gz")
+    if compress:
+        return gzip.open(path, 'wt', compresslevel=GZIP_LEVEL, encoding='utf-8', newline='')
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+# 以open_export_file的方式打开输出文件，实际先写入临时文件（<path>.part），正常结束时替换目标文件；
+# 中途出错或被取消时删除临时文件，目标文件不会只写入一部分
+@contextlib.contextmanager
+def replacing_export_file(path, compress=None):
+    if compress is None:
+        compress = path.endswith(".gz")
+    temporary = path + ".part"
+    try:
+        with open_export_file(temporary, compress) as file:
+            yield file
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+# 一块排序结果格式化为文本
+def format_orders(chunk, fmt="txt"):
+    if fmt == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(chunk)
+        return buffer.getvalue()
+    if fmt == "jsonl":
+        return "".join(json.dumps(order, ensure_ascii=False) + "\n" for order in chunk)
+    return "".join("->".join(order) + "\n" for order in chunk)
+
+
+# 把排序结果按指定格式写入已打开的文件，每EXPORT_CHUNK_SIZE个排序写入一次，返回写入的数量
+# progress(count)在每块写入后调用，可以在其中抛出异常来中止导出
+def write_orders(orders, file, fmt="txt", progress=None):
+    orders = iter(orders)
+    count = 0
+    while True:
+        chunk = list(itertools.islice(orders, EXPORT_CHUNK_SIZE))
+        if not chunk:
+            return count
+        file.write(format_orders(chunk, fmt))
+        count += len(chunk)
+        if progress is not None:
+            progress(count)
+
+
+# 多进程导出：子进程直接把各自子树的排序格式化为文本写入临时文件，主进程只按顺序复制文件内容，
+# 不必再逐个处理排序；ordered为False时按子树完成的先后写入。workers为进程数，None表示CPU核数，
+# 只有一个进程或无法划分子树时退回串行导出。progress(count)在每棵子树写入后调用
+def write_orders_parallel(graph, file, fmt="txt", limit=None, workers=None, ordered=True, progress=None):
+    if workers is None:
+        workers = os.cpu_count() or 1
+    prefixes = make_prefixes(graph, workers)
+    if workers <= 1 or len(prefixes) <= 1:
+        return write_orders(iter_topological_sorts(graph, limit), file, fmt, progress)
+
+    count = 0
+    formatter = functools.partial(format_orders, fmt=fmt)
+    with contextlib.closing(iter_subtree_files(graph, prefixes, limit, workers, ordered, formatter)) as files:
+        for path, size in files:
+            with open(path, 'r', encoding='utf-8', newline='') as source:
+                if limit is not None and count + size > limit:
+                    # 每个排序占一行，最后一棵子树只复制还需要的行数
+                    size = limit - count
+                    file.writelines(itertools.islice(source, size))
+                else:
+                    shutil.copyfileobj(source, file)
+            os.remove(path)
+            count += size
+            if progress is not None:
+                progress(count)
+    return count
+
+
+# 把图的拓扑排序导出到文件，limit为最多导出的数量（None表示全部），返回导出的数量
+# workers不为1时使用多进程导出（None表示CPU核数），导出的顺序与串行相同
+# 先写入临时文件，完成后再替换目标文件；中途出错或被取消时删除临时文件，不留下不完整的结果
+def export_orders(graph, path, fmt=None, limit=None, progress=None, workers=1):
+    if fmt is None:
+        fmt = export_format(path)
+    with replacing_export_file(path) as file:
+        if workers == 1:
+            return write_orders(iter_topological_sorts(graph, limit), file, fmt, progress)
+        return write_orders_parallel(graph, file, fmt, limit, workers, progress=progress)
@@ -0,0 +1,150 @@
+# 紧凑的整数下标图结构
+# 顶点名称统一存放在顶点表中，边按CSR（压缩稀疏行）格式存放在NumPy数组里：
+# 顶点i的后继为targets[offsets[i]:offsets[i + 1]]，对应权重为weights中同样的区间
+# 拓扑排序、环检测、最短路径都直接使用下标计算，只有绘图时才转换为networkx图
+# 本模块不依赖PySide2和matplotlib
+from array import array
+
+import numpy as np
+
+
+# 顶点表：把顶点名称映射为连续的整数下标
+class NodeTable:
+
+    def __init__(self):
+        self.names = []
+        self.index = {}
+
+    # 返回名称对应的下标，新名称自动分配下标
+    def intern(self, name):
+        i = self.index.get(name)
+        if i is None:
+            i = len(self.names)
+            self.index[name] = i
+            self.names.append(name)
+        return i
+
+    def __len__(self):
+        return len(self.names)
+
+
+class CSRGraph:
+
+    def __init__(self, names, offsets, targets, weights=None, index=None):
+        self.names = names  # 下标到名称
+        if index is None:
+            index = {name: i for i, name in enumerate(names)}
+        self.index = index  # 名称到下标
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights  # 无权图为None
+
+    # 由边的迭代器建立图，边逐条读入，不需要先生成完整的边列表
+    # weighted为True时每条边为(a, b, 权重)，否则为(a, b)；重复的边只保留一条，权重以最后一次为准
+    @classmethod
+    def from_edges(cls, edges, weighted=False):
+        table = NodeTable()
+        sources = array('q')
+        targets = array('q')
+        weights = None
+        for edge in edges:
+            sources.append(table.intern(edge[0]))
+            targets.append(table.intern(edge[1]))
+            if weighted:
+                if weights is None:
+                    weights = array('q' if isinstance(edge[2], int) else 'd')
+                weights.append(edge[2])
+        return cls.from_arrays(table.names, np.frombuffer(sources, dtype=np.int64),
+                               np.frombuffer(targets, dtype=np.int64),
+                               None if weights is None else np.array(weights), table.index)
+
+    # 由边的起点、终点下标数组建立图
+    @classmethod
+    def from_arrays(cls, names, sources, targets, weights=None, index=None):
+        num_nodes = len(names)
+        if len(sources):
+            # 去除重复边：位置取第一次出现的位置，权重取最后一次出现的权重
+            keys = sources * num_nodes + targets
+            _, first = np.unique(keys, return_index=True)
+            _, last = np.unique(keys[::-1], return_index=True)
+            input_order = np.argsort(first)
+            first = first[input_order]
+            if weights is not None:
+                weights = weights[len(keys) - 1 - last[input_order]]
+            sources, targets = sources[first], targets[first]
+
+        # 按起点稳定排序，同一起点的后继保持输入顺序
+        order = np.argsort(sources, kind='stable')
+        offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=num_nodes), out=offsets[1:])
+        return cls(names, offsets, np.ascontiguousarray(targets[order]),
+                   None if weights is None else np.ascontiguousarray(weights[order]), index)
+
+    def number_of_nodes(self):
+        return len(self.names)
+
+    def number_of_edges(self):
+        return len(self.targets)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __len__(self):
+        return len(self.names)
+
+    # 每个顶点的入度
+    def in_degrees(self):
+        return np.bincount(self.targets, minlength=len(self.names))
+
+    # 每个顶点的后继下标列表，便于在Python循环中快速访问
+    def successor_lists(self):
+        targets = self.targets.tolist()
+        offsets = self.offsets.tolist()
+        return [targets[offsets[i]:offsets[i + 1]] for i in range(len(self.names))]
+
+    # 每个顶点的(后继下标, 权重)列表
+    def weighted_successor_lists(self):
+        targets = self.targets.tolist()
+        weights = self.weights.tolist()
+        offsets = self.offsets.tolist()
+        return [list(zip(targets[offsets[i]:offsets[i + 1]], weights[offsets[i]:offsets[i + 1]]))
+                for i in range(len(self.names))]
+
+    # 只保留mask（与CSR边顺序一致的布尔数组）为True的边，顶点表不变
+    def edge_subgraph(self, mask):
+        offsets = np.zeros_like(self.offsets)
+        np.cumsum(np.bincount(self.sources()[mask], minlength=len(self.names)), out=offsets[1:])
+        return CSRGraph(self.names, offsets, self.targets[mask], None if self.weights is None else self.weights[mask],
+                        self.index)
+
+    # 每条边的起点下标数组
+    def sources(self):
+        return np.repeat(np.arange(len(self.names)), np.diff(self.offsets))
+
+    # 以下方法与nx.DiGraph的同名方法用法相同，返回顶点名称
+    def nodes(self):
+        return list(self.names)
+
+    def successors(self, name):
+        i = self.index[name]
+        return [self.names[j] for j in self.targets[self.offsets[i]:self.offsets[i + 1]].tolist()]
+
+    # data="weight"时生成(a, b, 权重)，否则生成(a, b)
+    def edges(self, data=None):
+        names = self.names
+        sources = self.sources().tolist()
+        targets = self.targets.tolist()
+        if data == "weight":
+            return ((names[i], names[j], w) for i, j, w in zip(sources, targets, self.weights.tolist()))
+        return ((names[i], names[j]) for i, j in zip(sources, targets))
+
+    # 转换为networkx图，仅在绘图时使用
+    def to_networkx(self):
+        import networkx as nx
+        G = nx.DiGraph()
+        G.add_nodes_from(self.names)
+        if self.weights is None:
+            G.add_edges_from(self.edges())
+        else:
+            G.add_weighted_edges_from(self.edges(data="weight"))
+        return G
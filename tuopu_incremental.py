@@ -0,0 +1,162 @@
+# 编辑过程中的增量图更新
+# 每次生成图时把新解析出的边集合与上一次比较，只对增加和删除的边做处理；
+# 用Pearce-Kelly算法在线维护拓扑序：加入一条边时只需调整两个端点之间受影响的那一段顶点，
+# 能在不重新检查整个图的情况下发现新形成的环
+# 本模块不依赖PySide2和matplotlib
+from tuopu_core import topological_order
+from tuopu_graph import CSRGraph
+
+# 变化的边数超过当前边数的该比例时，直接整体重建拓扑序
+INCREMENTAL_REBUILD_RATIO = 0.25
+
+
+class DynamicTopoOrder:
+
+    def __init__(self):
+        self.position = {}  # {顶点: 在拓扑序中的位置}，位置只需保持相对大小，允许有空位
+        self.successors = {}  # {顶点: 后继集合}
+        self.predecessors = {}  # {顶点: 前驱集合}
+        self.next_position = 0
+
+    # 由一个已知的拓扑序和边建立，O(V+E)
+    @classmethod
+    def from_order(cls, order, edges):
+        dynamic = cls()
+        for node in order:
+            dynamic.add_node(node)
+        for a, b in edges:
+            dynamic.successors[a].add(b)
+            dynamic.predecessors[b].add(a)
+        return dynamic
+
+    def __contains__(self, node):
+        return node in self.position
+
+    def __len__(self):
+        return len(self.position)
+
+    # 新顶点放在拓扑序的末尾
+    def add_node(self, node):
+        if node not in self.position:
+            self.position[node] = self.next_position
+            self.next_position += 1
+            self.successors[node] = set()
+            self.predecessors[node] = set()
+
+    # 删除没有任何边的顶点
+    def discard_isolated(self, node):
+        if node in self.position and not self.successors[node] and not self.predecessors[node]:
+            del self.position[node]
+            del self.successors[node]
+            del self.predecessors[node]
+
+    # 加入边a->b，会形成环时（包括自环<a,a>）不加入并返回False
+    def add_edge(self, a, b):
+        if a == b:
+            return False
+        self.add_node(a)
+        self.add_node(b)
+        if b in self.successors[a]:
+            return True
+
+        lower, upper = self.position[b], self.position[a]
+        if lower < upper:
+            # b排在a之前，只需调整位置在[lower, upper]之间的顶点：
+            # 从b向前搜索位置不超过upper的后代（遇到a说明形成环），从a向后搜索位置不小于lower的祖先
+            forward = self._search(b, self.successors, lambda p: p <= upper, a)
+            if forward is None:
+                return False
+            backward = self._search(a, self.predecessors, lambda p: p >= lower)
+            self._reorder(backward, forward)
+
+        self.successors[a].add(b)
+        self.predecessors[b].add(a)
+        return True
+
+    # 删除边不会破坏拓扑序
+    def remove_edge(self, a, b):
+        self.successors[a].discard(b)
+        self.predecessors[b].discard(a)
+
+    # 在位置满足条件的顶点中做深度优先搜索，遇到stop时返回None
+    def _search(self, start, neighbours, allowed, stop=None):
+        visited = {start}
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            for next_node in neighbours[node]:
+                if next_node == stop:
+                    return None
+                if next_node not in visited and allowed(self.position[next_node]):
+                    visited.add(next_node)
+                    stack.append(next_node)
+        return visited
+
+    # 受影响的祖先整体移到后代之前，两组顶点内部保持原来的相对顺序，复用它们原来占用的位置
+    def _reorder(self, backward, forward):
+        backward = sorted(backward, key=self.position.__getitem__)
+        forward = sorted(forward, key=self.position.__getitem__)
+        positions = sorted(self.position[node] for node in backward + forward)
+        for node, position in zip(backward + forward, positions):
+            self.position[node] = position
+
+    # 当前的拓扑序（顶点列表）
+    def order(self):
+        return sorted(self.position, key=self.position.__getitem__)
+
+
+class IncrementalDag:
+
+    def __init__(self):
+        self.edges = set()  # 上一次成功更新后的边集合
+        self.topo = None  # DynamicTopoOrder
+        self.incremental = False  # 上一次更新是否为增量更新（否则为整体重建）
+
+    # 用新解析出的边列表替换当前的边，返回(增加的边, 删除的边)
+    # 新的边集合存在环时抛出ValueError，并保持原来的状态不变
+    def update(self, edges):
+        new_edges = set(edges)
+        added = list(dict.fromkeys(edge for edge in edges if edge not in self.edges))  # 去除重复边，保持输入顺序
+        removed = [edge for edge in self.edges if edge not in new_edges]
+
+        if self.topo is None or len(added) + len(removed) > INCREMENTAL_REBUILD_RATIO * max(len(new_edges), 1):
+            self._rebuild(edges, new_edges)
+            self.incremental = False
+        else:
+            self._apply(added, removed)
+            self.incremental = True
+        self.edges = new_edges
+        return added, removed
+
+    # 整体重建：CSR图上的Kahn算法求一次拓扑序
+    def _rebuild(self, edges, new_edges):
+        graph = CSRGraph.from_edges(edges)
+        order = topological_order(graph)
+        if order is None:
+            raise ValueError("输入的数据存在依赖关系")
+        self.topo = DynamicTopoOrder.from_order([graph.names[i] for i in order], new_edges)
+
+    # 增量更新：先删除边再逐条加入新边，出现环时撤销本次的全部修改
+    def _apply(self, added, removed):
+        topo = self.topo
+        for a, b in removed:
+            topo.remove_edge(a, b)
+        for count, (a, b) in enumerate(added):
+            if not topo.add_edge(a, b):
+                for edge in added[:count]:
+                    topo.remove_edge(*edge)
+                for edge in removed:
+                    topo.add_edge(*edge)
+                self._discard_isolated(added)
+                raise ValueError("输入的数据存在依赖关系（加入<{},{}>时形成环）".format(a, b))
+        self._discard_isolated(removed)
+
+    def _discard_isolated(self, edges):
+        for edge in edges:
+            for node in edge:
+                self.topo.discard_isolated(node)
+
+
+# 增加或删除的边涉及的顶点
+def changed_nodes(added, removed):
+    return {node for edge in added for node in edge} | {node for edge in removed for node in edge}
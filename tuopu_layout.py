@@ -0,0 +1,269 @@
+# 图布局计算与布局缓存
+# 布局结果按"边集合指纹 + 布局选项 + 随机种子"缓存，采用LRU淘汰，并可保存到磁盘供下次启动使用；
+# 对稍作修改的图，spring布局以缓存中最相近的布局为初始位置，只需少量迭代即可收敛
+# 本模块不依赖PySide2和matplotlib；networkx只在计算其布局时才导入，不影响程序的启动时间
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from tuopu_export import replacing_export_file
+
+# spring布局使用的随机种子
+LAYOUT_SEED = 10
+# 内存中最多缓存的布局数量
+LAYOUT_CACHE_SIZE = 32
+# 布局缓存文件的默认位置
+LAYOUT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".tuopu", "layout_cache.json")
+# 热启动时spring布局的迭代次数（默认为50次）
+WARM_START_ITERATIONS = 10
+# 节点重合比例不低于该值的缓存布局才用于热启动
+WARM_START_MIN_OVERLAP = 0.5
+# 分层布局（Sugiyama）的选项名称，以及交叉消减的扫描轮数
+LAYERED_LAYOUT = "Layered Layout"
+BARYCENTER_SWEEPS = 4
+# 增量布局时，以变化的顶点为中心向外扩展的邻居层数
+RELAX_RADIUS = 1
+
+
+# 根据用户选择的布局来计算节点的位置（可在后台线程中调用）
+# graph为CSRGraph，分层布局直接在CSR数组上计算，其余布局才转换为networkx图
+# initial_pos为spring布局的初始位置（可以只包含部分节点），不为None时只迭代WARM_START_ITERATIONS次
+# 布局不考虑边的权重（spring和Kamada-Kawai默认按权重计算），与缓存的图指纹一致，修改权重不会用到过时的缓存
+def compute_layout(graph, layout_option, seed=LAYOUT_SEED, initial_pos=None):
+    if layout_option == LAYERED_LAYOUT:
+        return layered_layout(graph)
+
+    import networkx as nx
+
+    drawing_graph = graph.to_networkx()
+    if layout_option == "Spectral Layout":
+        return nx.spectral_layout(drawing_graph)
+    elif layout_option == "Shell Layout":
+        return nx.shell_layout(drawing_graph)
+    elif layout_option == "Kamada-Kawai Layout":
+        return nx.kamada_kawai_layout(drawing_graph, weight=None)
+    elif layout_option == "Circular Layout":
+        return nx.circular_layout(drawing_graph)
+    if initial_pos is not None:
+        return nx.spring_layout(drawing_graph, pos=initial_pos, iterations=WARM_START_ITERATIONS, seed=seed,
+                                weight=None)
+    return nx.spring_layout(drawing_graph, seed=seed, weight=None)  # 默认使用spring_layout布局
+
+
+# 增量布局：图只有少量边变化时，未受影响的顶点保持原来的位置，
+# 只有变化的顶点及其RELAX_RADIUS层以内的邻居参与spring布局，其余邻居作为固定点
+# 新顶点初始放在已有邻居的重心附近
+def relax_layout(graph, previous_pos, changed, seed=LAYOUT_SEED):
+    neighbours = {name: set() for name in graph.names}
+    for a, b in graph.edges():
+        neighbours[a].add(b)
+        neighbours[b].add(a)
+
+    moving = {node for node in changed if node in neighbours}
+    moving |= {node for node in graph.names if node not in previous_pos}
+    frontier = set(moving)
+    for _ in range(RELAX_RADIUS):
+        frontier = {other for node in frontier for other in neighbours[node]} - moving
+        moving |= frontier
+    anchors = {other for node in moving for other in neighbours[node]} - moving
+
+    rng = np.random.default_rng(seed)
+    pos = {node: previous_pos[node] for node in graph.names if node in previous_pos}
+    for node in moving:
+        if node not in pos:
+            placed = [pos[other] for other in neighbours[node] if other in pos]
+            center = np.mean(placed, axis=0) if placed else np.zeros(2)
+            pos[node] = center + rng.uniform(-0.05, 0.05, 2)
+    if not moving:
+        return pos
+
+    import networkx as nx
+
+    subgraph = nx.Graph()
+    subgraph.add_nodes_from(moving | anchors)
+    subgraph.add_edges_from((a, b) for a in moving for b in neighbours[a])
+    # k按整个图的顶点数取值，使局部布局的间距与原布局一致；scale=None表示不重新缩放坐标
+    relaxed = nx.spring_layout(subgraph, k=1 / np.sqrt(max(len(graph.names), 1)),
+                               pos={node: pos[node] for node in subgraph}, fixed=list(anchors) or None,
+                               iterations=WARM_START_ITERATIONS, scale=None, seed=seed)
+    for node in moving:
+        pos[node] = relaxed[node]
+    return pos
+
+
+# 取出一组顶点的全部出边，返回(起点下标数组, 终点下标数组)
+def _out_edges(graph, vertices):
+    starts = graph.offsets[vertices]
+    counts = graph.offsets[vertices + 1] - starts
+    total = int(counts.sum())
+    if total == 0:
+        return vertices[:0], vertices[:0]
+    # 每条边在targets中的位置：各顶点的起始位置加上边在该顶点内的序号
+    first = np.cumsum(counts) - counts
+    positions = np.repeat(starts - first, counts) + np.arange(total)
+    return np.repeat(vertices, counts), graph.targets[positions]
+
+
+# 分层：每个顶点的层号为从源点出发的最长路径长度（拓扑深度）
+# 按层批量处理Kahn算法的队列，每层只做一次数组运算；环上的顶点统一放在最后一层
+def assign_layers(graph):
+    num_nodes = graph.number_of_nodes()
+    in_degree = graph.in_degrees()
+    layers = np.full(num_nodes, -1, dtype=np.int64)
+    frontier = np.flatnonzero(in_degree == 0)
+    depth = 0
+    while len(frontier):
+        layers[frontier] = depth
+        _, targets = _out_edges(graph, frontier)
+        np.subtract.at(in_degree, targets, 1)
+        targets = np.unique(targets)
+        frontier = targets[in_degree[targets] == 0]
+        depth += 1
+    layers[layers < 0] = depth
+    return layers
+
+
+# 按关键字对每一层内的顶点重新排序，返回每个顶点在本层中的位置
+def _rank_within_layers(layers, keys, layer_starts):
+    order = np.lexsort((keys, layers))
+    positions = np.empty(len(layers), dtype=np.float64)
+    positions[order] = np.arange(len(layers)) - layer_starts[layers[order]]
+    return positions
+
+
+# 分层布局（Sugiyama方法）：
+# 1. 按拓扑深度分层；2. 上下交替按重心（相邻层邻居位置的平均值）排序，减少边的交叉；
+# 3. 每层顶点等间距排列并居中，层号作为纵坐标。全部计算都是O(V+E)的数组运算
+# 跨越多层的长边不插入虚拟顶点，重心直接取其另一端顶点的位置
+# layers为每个顶点的层号数组，None表示按拓扑深度分层
+def layered_layout(graph, sweeps=BARYCENTER_SWEEPS, layers=None):
+    num_nodes = graph.number_of_nodes()
+    if num_nodes == 0:
+        return {}
+
+    if layers is None:
+        layers = assign_layers(graph)
+    layer_sizes = np.bincount(layers)
+    layer_starts = np.cumsum(layer_sizes) - layer_sizes
+    sources = graph.sources()
+    targets = graph.targets
+    # 只保留从上层指向下层的边参与重心计算
+    forward = layers[sources] < layers[targets]
+    sources, targets = sources[forward], targets[forward]
+
+    positions = _rank_within_layers(layers, np.arange(num_nodes), layer_starts)
+    for sweep in range(sweeps):
+        # 偶数轮自上而下按前驱的重心排序，奇数轮自下而上按后继的重心排序
+        if sweep % 2 == 0:
+            neighbours, vertices = sources, targets
+        else:
+            neighbours, vertices = targets, sources
+        totals = np.bincount(vertices, weights=positions[neighbours], minlength=num_nodes)
+        counts = np.bincount(vertices, minlength=num_nodes)
+        barycenters = np.where(counts > 0, totals / np.maximum(counts, 1), positions)
+        positions = _rank_within_layers(layers, barycenters, layer_starts)
+
+    # 每层居中，横纵坐标都缩放到[-1, 1]
+    x = positions - (layer_sizes[layers] - 1) / 2
+    x = x / max(np.abs(x).max(), 1)
+    y = 1 - 2 * layers / max(layers.max(), 1)
+    coordinates = np.column_stack((x, y))
+    return dict(zip(graph.names, coordinates))
+
+
+# 计算图的指纹：对边集合排序后取哈希，与边的输入顺序、重复边和权重无关
+def graph_fingerprint(graph):
+    digest = hashlib.sha1()
+    for a, b in sorted(graph.edges()):
+        digest.update("{}\t{}\n".format(a, b).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class LayoutCache:
+
+    def __init__(self, path=LAYOUT_CACHE_PATH, max_entries=LAYOUT_CACHE_SIZE):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # {缓存键: {节点: 坐标}}，按最近使用排序
+        self.lock = threading.Lock()  # 布局在后台线程中计算，访问缓存需要加锁
+
+    @staticmethod
+    def make_key(fingerprint, layout_option, seed=LAYOUT_SEED):
+        return "{}|{}|{}".format(fingerprint, layout_option, seed)
+
+    # 查找缓存的布局，未命中时返回None
+    def get(self, key):
+        with self.lock:
+            pos = self.entries.get(key)
+            if pos is not None:
+                self.entries.move_to_end(key)
+            return pos
+
+    def put(self, key, pos):
+        with self.lock:
+            self.entries[key] = pos
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    # 为新图寻找热启动的初始位置：同一布局选项下节点重合比例最高的缓存布局
+    def warm_start(self, layout_option, seed, nodes):
+        nodes = set(nodes)
+        suffix = "|{}|{}".format(layout_option, seed)
+        best_pos, best_overlap = None, WARM_START_MIN_OVERLAP
+        with self.lock:
+            for key, pos in reversed(self.entries.items()):
+                if not key.endswith(suffix):
+                    continue
+                shared = sum(1 for node in pos if node in nodes)
+                overlap = shared / max(len(nodes), len(pos))
+                if overlap >= best_overlap:
+                    best_pos, best_overlap = pos, overlap
+        if best_pos is None:
+            return None
+        return {node: xy for node, xy in best_pos.items() if node in nodes}
+
+    # 从磁盘读取缓存，文件不存在或损坏时忽略
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return
+        with self.lock:
+            for key, pos in data.items():
+                self.entries[key] = {node: np.array(xy) for node, xy in pos.items()}
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    # 把缓存写入磁盘，先写入临时文件再替换，中途退出不会留下不完整的缓存文件
+    def save(self):
+        with self.lock:
+            data = {key: {str(node): [float(v) for v in xy] for node, xy in pos.items()}
+                    for key, pos in self.entries.items()}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with replacing_export_file(self.path, compress=False) as file:
+            json.dump(data, file)
+
+
+# 带缓存的布局计算：命中缓存直接返回，否则计算后存入缓存
+# previous_pos和changed为上一次的布局和此后变化的顶点，spring布局据此只调整变化的部分
+def cached_layout(cache, graph, layout_option, seed=LAYOUT_SEED, previous_pos=None, changed=None):
+    key = cache.make_key(graph_fingerprint(graph), layout_option, seed)
+    pos = cache.get(key)
+    if pos is not None:
+        return pos
+
+    if layout_option in (LAYERED_LAYOUT, "Spectral Layout", "Shell Layout", "Kamada-Kawai Layout",
+                         "Circular Layout"):
+        pos = compute_layout(graph, layout_option, seed)
+    elif previous_pos is not None and changed is not None:
+        pos = relax_layout(graph, previous_pos, changed, seed)
+    else:
+        pos = compute_layout(graph, layout_option, seed, cache.warm_start(layout_option, seed, graph.names))
+    cache.put(key, pos)
+    return pos
@@ -0,0 +1,100 @@
+# 拓扑排序的分批（分层）
+# 同一批中的顶点互不依赖，可以同时执行；前一批全部完成后才开始下一批
+# 不限制每批的数量时，按Kahn算法逐批取出入度为0的顶点，O(V+E)；
+# 限制为workers个时按列表调度分批，就绪的顶点中优先选择到汇点的最长路径更长的顶点（Hu算法的优先级），
+# 使关键的长链尽早开始，O((V+E) + V log V)
+# 本模块不依赖PySide2和matplotlib
+import heapq
+
+from tuopu_core import topological_order
+from tuopu_export import format_orders
+
+# 结果框中最多列出的批数，以及每批最多列出的顶点数
+LEVEL_DISPLAY_ROWS = 100
+LEVEL_DISPLAY_ITEMS = 50
+
+
+# 每个顶点到汇点的最长路径长度（边数），order为一个拓扑序
+def _heights(successors, order):
+    heights = [0] * len(successors)
+    for i in reversed(order):
+        for j in successors[i]:
+            if heights[j] + 1 > heights[i]:
+                heights[i] = heights[j] + 1
+    return heights
+
+
+# 把图的顶点分批，返回批的列表（每批为顶点下标列表）
+# workers为每批最多的顶点数，None表示不限制；不限制时每批中的顶点按就绪的先后排列，限制时按优先级排列
+# 图中有环时抛出ValueError
+def topological_levels(graph, workers=None):
+    successors = graph.successor_lists()
+    in_degree = graph.in_degrees().tolist()
+    level = [i for i, degree in enumerate(in_degree) if degree == 0]
+
+    if workers is None:
+        levels = []
+        while level:
+            levels.append(level)
+            following = []
+            for i in level:
+                for j in successors[i]:
+                    in_degree[j] -= 1
+                    if in_degree[j] == 0:
+                        following.append(j)
+            level = following
+        if sum(len(level) for level in levels) < len(in_degree):
+            raise ValueError("输入的数据存在依赖关系（有环），无法分批")
+        return levels
+
+    if workers < 1:
+        raise ValueError("每批的顶点数至少为1")
+    order = topological_order(graph)
+    if order is None:
+        raise ValueError("输入的数据存在依赖关系（有环），无法分批")
+    heights = _heights(successors, order)
+
+    # 就绪顶点按(最长路径取负, 下标)放在堆中，每批取出至多workers个
+    ready = [(-heights[i], i) for i in level]
+    heapq.heapify(ready)
+    levels = []
+    while ready:
+        level = [heapq.heappop(ready)[1] for _ in range(min(workers, len(ready)))]
+        levels.append(level)
+        for i in level:
+            for j in successors[i]:
+                in_degree[j] -= 1
+                if in_degree[j] == 0:
+                    heapq.heappush(ready, (-heights[j], j))
+    return levels
+
+
+# 与顶点顺序一致的批号列表
+def level_numbers(levels, num_nodes):
+    numbers = [0] * num_nodes
+    for number, level in enumerate(levels):
+        for i in level:
+            numbers[i] = number
+    return numbers
+
+
+# 把分批结果整理为可以直接显示的文字
+def format_levels(levels, names, max_rows=LEVEL_DISPLAY_ROWS, max_items=LEVEL_DISPLAY_ITEMS):
+    widest = max((len(level) for level in levels), default=0)
+    lines = ["共{}批，每批最多{}个顶点：".format(len(levels), widest)]
+    for number, level in enumerate(levels[:max_rows], 1):
+        text = ", ".join(names[i] for i in level[:max_items])
+        if len(level) > max_items:
+            text += ", ……共{}个".format(len(level))
+        lines.append("第{}批：{}".format(number, text))
+    if len(levels) > max_rows:
+        lines.append("其余{}批未列出。".format(len(levels) - max_rows))
+    return "\n".join(lines) + "\n"
+
+
+# 把分批结果写入已打开的文件，每批一行：txt格式顶点之间用空格分隔，csv和jsonl格式与导出的拓扑排序相同
+def write_levels(levels, names, file, fmt="txt"):
+    for level in levels:
+        members = [names[i] for i in level]
+        file.write(" ".join(members) + "\n" if fmt == "txt" else format_orders([members], fmt))
+    return len(levels)
@@ -0,0 +1,193 @@
+# 拓扑排序的多进程并行枚举
+# 固定前k个顶点的选择，把搜索树划分为若干棵子树，交给进程池分别枚举；
+# 子进程把结果按块写入临时文件，主进程按前缀的顺序读回，合并后的顺序与串行枚举完全相同；
+# 允许乱序时按子树完成的先后读回。两端的内存占用都与排序数量无关
+# 本模块不依赖PySide2和matplotlib
+import itertools
+import multiprocessing
+import os
+import shutil
+import tempfile
+from array import array
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from tuopu_core import iter_topological_orders, iter_topological_sorts
+
+# 每个进程平均分到的子树数量，子树越多负载越均衡
+PARALLEL_TASKS_PER_WORKER = 8
+# 子树数量的上限，划分前缀本身也需要枚举
+PARALLEL_MAX_TASKS = 4096
+# 子进程每次写入、主进程每次读回的排序数量
+PARALLEL_CHUNK_ORDERS = 4096
+# 同时提交给进程池的子树数量为进程数的倍数，限制尚未读回的临时文件数量
+PARALLEL_INFLIGHT_PER_WORKER = 2
+# 临时目录中的停止标记，主进程提前结束时通知子进程不再继续枚举
+STOP_MARKER = "stop"
+
+# 子进程中的图，由进程池的初始化函数设置，避免每个任务重复传输
+_worker_graph = None
+
+
+def _init_worker(graph):
+    global _worker_graph
+    _worker_graph = graph
+
+
+# 子进程：枚举以prefix开头的排序（最多limit个），按块写入path，返回写入的数量
+# formatter为None时写入int32顶点下标（每个排序一行），否则写入formatter(一块顶点名称列表)返回的UTF-8文本
+def _enumerate_subtree(prefix, limit, path, formatter=None):
+    names = _worker_graph.names
+    stop_path = os.path.join(os.path.dirname(path), STOP_MARKER)
+    orders = iter_topological_orders(_worker_graph, limit, prefix)
+    count = 0
+    with open(path, 'wb') as file:
+        while not os.path.exists(stop_path):
+            if formatter is None:
+                buffer = array('i')
+                for order in itertools.islice(orders, PARALLEL_CHUNK_ORDERS):
+                    buffer.extend(order)
+                size = len(buffer) // len(names)
+                buffer.tofile(file)
+            else:
+                chunk = [[names[i] for i in order] for order in itertools.islice(orders, PARALLEL_CHUNK_ORDERS)]
+                size = len(chunk)
+                file.write(formatter(chunk).encode('utf-8'))
+            count += size
+            if size < PARALLEL_CHUNK_ORDERS:
+                break
+    return count
+
+
+# 把搜索树划分为至少min_tasks棵子树（顶点较少时可能更少），返回各子树的前缀（顶点下标列表），按串行枚举的顺序排列
+# 逐层把每个前缀延长一个顶点：每个前缀保存选定之后的候选顶点（顺序与iter_topological_orders相同）
+# 和入度已经减少但还不为0的顶点的剩余入度，不需要每一层都从头重新枚举更短的前缀
+def split_prefixes(graph, min_tasks):
+    successors = graph.successor_lists()
+    in_degree = graph.in_degrees().tolist()
+    # 每个前缀为(最后一个顶点, 上一层的前缀)，最后再展开为列表，避免每层复制整个前缀
+    level = [(None, [i for i, degree in enumerate(in_degree) if degree == 0], {})]
+    for _ in range(graph.number_of_nodes()):
+        deeper = []
+        for prefix, candidates, remaining in level:
+            for node in candidates:
+                following = [candidate for candidate in candidates if candidate != node]
+                left = dict(remaining)
+                for succ in successors[node]:
+                    degree = left.get(succ, in_degree[succ]) - 1
+                    if degree == 0:
+                        left.pop(succ, None)
+                        following.append(succ)
+                    else:
+                        left[succ] = degree
+                deeper.append(((node, prefix), following, left))
+            if len(deeper) > PARALLEL_MAX_TASKS:
+                break
+        if len(deeper) > PARALLEL_MAX_TASKS:
+            break
+        level = deeper
+        if len(level) >= min_tasks or not level:
+            break
+    return [_unwind(prefix) for prefix, _, _ in level]
+
+
+# 把(最后一个顶点, 上一层的前缀)形式的前缀展开为顶点下标列表
+def _unwind(prefix):
+    nodes = []
+    while prefix is not None:
+        node, prefix = prefix
+        nodes.append(node)
+    nodes.reverse()
+    return nodes
+
+
+# 按固定的前缀长度depth（None表示按进程数自动选择）划分子树
+def make_prefixes(graph, workers, depth=None):
+    if depth is None:
+        return split_prefixes(graph, workers * PARALLEL_TASKS_PER_WORKER)
+    return [list(prefix) for prefix in iter_topological_orders(graph, depth=depth)]
+
+
+# 在进程池中枚举各子树，按前缀的顺序（ordered为False时按完成的先后）生成(临时文件路径, 排序数量)
+# 一棵子树全部枚举完才生成它的文件；每棵子树最多枚举limit减去已生成数量的排序，调用者按需截断；
+# 调用者读完一个文件后可以删除它
+# 停止迭代时（包括出错或被取消）通知子进程停止，并删除全部临时文件
+def iter_subtree_files(graph, prefixes, limit=None, workers=None, ordered=True, formatter=None):
+    if workers is None:
+        workers = os.cpu_count() or 1
+    directory = tempfile.mkdtemp(prefix="tuopu_")
+    # 使用spawn方式启动子进程：界面程序是多线程的，fork可能复制到被其他线程持有的锁
+    pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_init_worker, initargs=(graph,))
+    tasks = iter(enumerate(prefixes))
+    inflight = {}  # {future: 临时文件路径}
+    queue = deque()  # 按提交顺序排列的future
+    total = 0
+
+    def submit():
+        task = next(tasks, None)
+        if task is not None:
+            path = os.path.join(directory, "{}.part".format(task[0]))
+            future = pool.submit(_enumerate_subtree, task[1], None if limit is None else limit - total, path,
+                                 formatter)
+            inflight[future] = path
+            queue.append(future)
+
+    try:
+        for _ in range(workers * PARALLEL_INFLIGHT_PER_WORKER):
+            submit()
+        while inflight and (limit is None or total < limit):
+            if ordered:
+                future = queue.popleft()
+            else:
+                future = next(iter(wait(inflight, return_when=FIRST_COMPLETED).done))
+                queue.remove(future)
+            count = future.result()
+            path = inflight.pop(future)
+            total += count
+            submit()
+            yield path, count
+    finally:
+        open(os.path.join(directory, STOP_MARKER), 'w').close()
+        pool.shutdown(wait=True, cancel_futures=True)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+# 从子树的临时文件中逐个读回排序（顶点名称列表）
+def _read_subtree(path, names):
+    width = len(names)
+    with open(path, 'rb') as file:
+        while True:
+            chunk = np.fromfile(file, dtype=np.int32, count=PARALLEL_CHUNK_ORDERS * width)
+            if len(chunk) == 0:
+                return
+            for order in chunk.reshape(-1, width).tolist():
+                yield [names[i] for i in order]
+
+
+# 并行地按需生成拓扑排序（顶点名称列表）
+# workers为进程数，None表示CPU核数；depth为固定的前缀长度，None表示按进程数自动选择；
+# ordered为True时结果顺序与iter_topological_sorts相同，否则按子树完成的先后输出
+# 只有一个进程或无法划分时直接串行枚举
+def parallel_topological_sorts(graph, limit=None, workers=None, depth=None, ordered=True):
+    if workers is None:
+        workers = os.cpu_count() or 1
+    prefixes = make_prefixes(graph, workers, depth)
+    if workers <= 1 or len(prefixes) <= 1:
+        yield from iter_topological_sorts(graph, limit)
+        return
+
+    count = 0
+    files = iter_subtree_files(graph, prefixes, limit, workers, ordered)
+    try:
+        for path, _ in files:
+            for order in _read_subtree(path, graph.names):
+                yield order
+                count += 1
+                if limit is not None and count >= limit:
+                    return
+            os.remove(path)
+    finally:
+        files.close()
@@ -0,0 +1,402 @@
+# 带权图最短路径计算
+# 全源最短路径需要n×n的距离矩阵和前驱矩阵（共16·n²字节），顶点数超过DENSE_MAX_NODES时拒绝计算，
+# 改为按起点逐个查询（SourcePaths），其数组可以是大图模式下的内存映射
+# 本模块不依赖PySide2和matplotlib
+import heapq
+
+import numpy as np
+
+from tuopu_core import topological_order
+from tuopu_store import iter_out_edges, streaming_levels, STORE_CHUNK_EDGES
+
+# 计算全源最短路径的最多顶点数
+DENSE_MAX_NODES = 2000
+# 最短路径结果中最多列出的终点数量
+ROUTE_DISPLAY_ROWS = 1000
+
+
+# 顶点数超过max_nodes时抛出ValueError
+def _check_dense(graph, max_nodes):
+    if graph.number_of_nodes() > max_nodes:
+        raise ValueError("顶点数{}超过{}，不计算全源最短路径，请按起点查询".format(graph.number_of_nodes(), max_nodes))
+
+
+# 根据带权图（tuopu_graph.CSRGraph）建立邻接索引
+# 返回节点列表、节点到下标的映射，以及每个节点的(后继下标, 权重)列表
+def build_adjacency(graph):
+    return graph.names, graph.index, graph.weighted_successor_lists()
+
+
+# 有向无环图按拓扑序松弛各边，O(V+E)
+def _dag_distances(adjacency, order, source):
+    distances = [np.inf] * len(adjacency)
+    distances[source] = 0
+    for i in order:
+        if distances[i] == np.inf:
+            continue
+        for j, weight in adjacency[i]:
+            if distances[i] + weight < distances[j]:
+                distances[j] = distances[i] + weight
+    return distances
+
+
+# 基于二叉堆的Dijkstra算法，O((V+E)logV)，要求权重非负
+# 返回距离列表和前驱下标列表（-1表示无前驱）
+def _dijkstra(adjacency, source):
+    distances = [np.inf] * len(adjacency)
+    predecessors = [-1] * len(adjacency)
+    distances[source] = 0
+    heap = [(0, source)]
+    while heap:
+        distance, i = heapq.heappop(heap)
+        if distance > distances[i]:
+            continue
+        for j, weight in adjacency[i]:
+            if distance + weight < distances[j]:
+                distances[j] = distance + weight
+                predecessors[j] = i
+                heapq.heappush(heap, (distances[j], j))
+    return distances, predecessors
+
+
+# 单源最短路径：无环图按拓扑序松弛，有环图使用Dijkstra
+# 返回{顶点: 最短距离}，不可达的顶点距离为np.inf
+def single_source_distances(graph, start_vertex):
+    nodes, node_to_index, adjacency = build_adjacency(graph)
+    source = node_to_index[start_vertex]
+    order = topological_order(graph)
+    if order is not None:
+        distances = _dag_distances(adjacency, order, source)
+    else:
+        distances, _ = _dijkstra(adjacency, source)
+    return dict(zip(nodes, distances))
+
+
+# 全源最短路径：NumPy广播实现的Floyd-Warshall算法
+# 每个中转点k只做一次整矩阵运算，返回节点列表和距离矩阵；顶点数超过max_nodes时抛出ValueError
+def floyd_distance_matrix(graph, max_nodes=DENSE_MAX_NODES):
+    _check_dense(graph, max_nodes)
+    nodes = graph.names
+    num_nodes = len(nodes)
+    distance_matrix = np.full((num_nodes, num_nodes), np.inf)
+    distance_matrix[graph.sources(), graph.targets] = graph.weights
+    np.fill_diagonal(distance_matrix, 0)
+
+    for k in range(num_nodes):
+        np.minimum(distance_matrix, distance_matrix[:, k, None] + distance_matrix[None, k, :], out=distance_matrix)
+    return nodes, distance_matrix
+
+
+# 全源最短路径缓存：保存距离矩阵和前驱矩阵，支持任意起点查询、路径还原，
+# 以及单条边增加/删除/修改权重后的增量更新
+# predecessor_matrix[i, j]为从i到j最短路径上j的前一个顶点下标，-1表示无
+# 顶点数超过max_nodes时抛出ValueError
+class DistanceCache:
+
+    def __init__(self, graph, max_nodes=DENSE_MAX_NODES):
+        _check_dense(graph, max_nodes)
+        self._load_edges(graph)
+        self._rebuild()
+
+    # 由已经算好的矩阵（如快照中保存的）建立缓存，矩阵的顶点顺序与graph.names一致，不重新计算
+    @classmethod
+    def from_matrices(cls, graph, distance_matrix, predecessor_matrix):
+        cache = cls.__new__(cls)
+        cache._load_edges(graph)
+        cache.distance_matrix = distance_matrix
+        cache.predecessor_matrix = predecessor_matrix
+        return cache
+
+    def _load_edges(self, graph):
+        self.nodes = []
+        self.node_to_index = {}
+        self.weights = {}  # {(a, b): 权重}
+        self.out_edges = []  # 每个顶点的{后继下标: 权重}
+        for node in graph.nodes():
+            self._add_node(node)
+        for a, b, weight in graph.edges(data="weight"):
+            self.weights[(a, b)] = weight
+            self.out_edges[self.node_to_index[a]][self.node_to_index[b]] = weight
+
+    def _add_node(self, node):
+        self.node_to_index[node] = len(self.nodes)
+        self.nodes.append(node)
+        self.out_edges.append({})
+
+    # 用带前驱记录的向量化Floyd-Warshall重新计算整个缓存
+    def _rebuild(self):
+        num_nodes = len(self.nodes)
+        distance_matrix = np.full((num_nodes, num_nodes), np.inf)
+        predecessor_matrix = np.full((num_nodes, num_nodes), -1, dtype=np.int64)
+        for i, edges in enumerate(self.out_edges):
+            for j, weight in edges.items():
+                distance_matrix[i, j] = weight
+                predecessor_matrix[i, j] = i
+        np.fill_diagonal(distance_matrix, 0)
+        np.fill_diagonal(predecessor_matrix, -1)
+
+        for k in range(num_nodes):
+            candidate = distance_matrix[:, k, None] + distance_matrix[None, k, :]
+            improved = candidate < distance_matrix
+            distance_matrix = np.where(improved, candidate, distance_matrix)
+            predecessor_matrix = np.where(improved, predecessor_matrix[None, k, :], predecessor_matrix)
+
+        self.distance_matrix = distance_matrix
+        self.predecessor_matrix = predecessor_matrix
+
+    # 新顶点加入时扩展矩阵
+    def _grow(self, node):
+        self._add_node(node)
+        num_nodes = len(self.nodes)
+        distance_matrix = np.full((num_nodes, num_nodes), np.inf)
+        distance_matrix[:-1, :-1] = self.distance_matrix
+        distance_matrix[-1, -1] = 0
+        predecessor_matrix = np.full((num_nodes, num_nodes), -1, dtype=np.int64)
+        predecessor_matrix[:-1, :-1] = self.predecessor_matrix
+        self.distance_matrix = distance_matrix
+        self.predecessor_matrix = predecessor_matrix
+
+    # 从起点出发到各顶点的最短距离，{顶点: 距离}，不可达为np.inf
+    def distances_from(self, start_vertex):
+        return dict(zip(self.nodes, self.distance_row(start_vertex).tolist()))
+
+    # 缓存的副本，之后增量更新这个缓存时不会改变副本
+    def copy(self):
+        cache = self.__class__.__new__(self.__class__)
+        cache.nodes = list(self.nodes)
+        cache.node_to_index = dict(self.node_to_index)
+        cache.weights = dict(self.weights)
+        cache.out_edges = [dict(edges) for edges in self.out_edges]
+        cache.distance_matrix = self.distance_matrix.copy()
+        cache.predecessor_matrix = self.predecessor_matrix.copy()
+        return cache
+
+    # 按nodes的顺序重新排列的(距离矩阵, 前驱矩阵)，增量更新后缓存中的顶点顺序可能与图的顶点表不同
+    def matrices(self, nodes):
+        permutation = np.array([self.node_to_index[node] for node in nodes], dtype=np.int64)
+        inverse = np.full(len(self.nodes) + 1, -1, dtype=np.int64)
+        inverse[permutation] = np.arange(len(permutation))
+        grid = np.ix_(permutation, permutation)
+        # 前驱为-1时取inverse的最后一项（-1）
+        return self.distance_matrix[grid], inverse[self.predecessor_matrix[grid]]
+
+    # 从起点出发到各顶点的最短距离数组，与顶点顺序一致
+    def distance_row(self, start_vertex):
+        return self.distance_matrix[self.node_to_index[start_vertex]]
+
+    # 从起点出发的(距离数组, 前驱数组)，前驱为-1表示起点本身或不可达
+    def paths_from(self, start_vertex):
+        i = self.node_to_index[start_vertex]
+        return self.distance_matrix[i], self.predecessor_matrix[i]
+
+    # 还原从start_vertex到target的最短路径（顶点列表），不可达时返回None
+    def shortest_path(self, start_vertex, target):
+        i = self.node_to_index[start_vertex]
+        j = self.node_to_index[target]
+        if self.distance_matrix[i, j] == np.inf:
+            return None
+        path = [j]
+        while j != i:
+            j = int(self.predecessor_matrix[i, j])
+            path.append(j)
+        return [self.nodes[k] for k in reversed(path)]
+
+    # 增加一条边或修改边的权重
+    def set_edge(self, a, b, weight):
+        for node in (a, b):
+            if node not in self.node_to_index:
+                self._grow(node)
+
+        old_weight = self.weights.get((a, b))
+        self.weights[(a, b)] = weight
+        self.out_edges[self.node_to_index[a]][self.node_to_index[b]] = weight
+        if old_weight is None or weight < old_weight:
+            self._decrease(self.node_to_index[a], self.node_to_index[b], weight)
+        elif weight > old_weight:
+            self._increase(self.node_to_index[a], self.node_to_index[b], old_weight)
+
+    # 删除一条边（顶点保留）
+    def remove_edge(self, a, b):
+        old_weight = self.weights.pop((a, b))
+        i, j = self.node_to_index[a], self.node_to_index[b]
+        del self.out_edges[i][j]
+        self._increase(i, j, old_weight)
+
+    # 用新的带权边列表替换缓存中的边，只对变化的边做增量更新
+    # 变化过多或有顶点被删除时直接整体重算，返回变化的边数
+    def update_edges(self, weighted_edges):
+        new_weights = {}
+        for a, b, weight in weighted_edges:
+            new_weights[(a, b)] = weight
+        removed = [edge for edge in self.weights if edge not in new_weights]
+        changed = [(a, b, weight) for (a, b), weight in new_weights.items() if self.weights.get((a, b)) != weight]
+
+        new_nodes = {node for edge in new_weights for node in edge}
+        if len(removed) + len(changed) > len(self.nodes) or any(node not in new_nodes for node in self.nodes):
+            self.nodes = []
+            self.node_to_index = {}
+            self.weights = {}
+            self.out_edges = []
+            for (a, b), weight in new_weights.items():
+                for node in (a, b):
+                    if node not in self.node_to_index:
+                        self._add_node(node)
+                self.weights[(a, b)] = weight
+                self.out_edges[self.node_to_index[a]][self.node_to_index[b]] = weight
+            self._rebuild()
+        else:
+            for a, b in removed:
+                self.remove_edge(a, b)
+            for a, b, weight in changed:
+                self.set_edge(a, b, weight)
+        return len(removed) + len(changed)
+
+    # 边(a, b)变短：所有经过该边更短的路径为 i->a->b->j，O(n²)
+    def _decrease(self, a, b, weight):
+        candidate = self.distance_matrix[:, a, None] + weight + self.distance_matrix[None, b, :]
+        improved = candidate < self.distance_matrix
+        if not improved.any():
+            return
+        predecessor_row = self.predecessor_matrix[b].copy()
+        predecessor_row[b] = a
+        self.distance_matrix = np.where(improved, candidate, self.distance_matrix)
+        self.predecessor_matrix = np.where(improved, predecessor_row[None, :], self.predecessor_matrix)
+
+    # 边(a, b)变长或被删除：只有原最短路径可能经过该边的起点需要重算，
+    # 对这些起点逐个运行Dijkstra
+    def _increase(self, a, b, old_weight):
+        through = self.distance_matrix[:, a, None] + old_weight + self.distance_matrix[None, b, :]
+        affected = np.isfinite(through) & (through == self.distance_matrix)
+        sources = np.flatnonzero(affected.any(axis=1))
+        if len(sources) == 0:
+            return
+
+        adjacency = [list(edges.items()) for edges in self.out_edges]
+        for source in sources:
+            distances, predecessors = _dijkstra(adjacency, source)
+            self.distance_matrix[source] = distances
+            self.predecessor_matrix[source] = predecessors
+
+
+# 按起点查询的最短路径，接口与DistanceCache相同，只保存最近一个起点的距离和前驱（O(V)内存）
+# 无环图按层松弛：同一层的顶点之间没有边，每层的出边做一次数组运算；有环图使用Dijkstra
+# graph的数组可以是内存映射（大图模式），出边按块读取；levels为已经求出的streaming_levels结果
+class SourcePaths:
+
+    def __init__(self, graph, levels=None, chunk_edges=STORE_CHUNK_EDGES):
+        self.graph = graph
+        self.nodes = graph.names
+        self.node_to_index = graph.index
+        self.chunk_edges = chunk_edges
+        order, layers = streaming_levels(graph, chunk_edges) if levels is None else levels
+        self.order = order
+        self.layers = layers
+        self.levels = None  # 各层的顶点下标数组，有环时为None
+        if len(order) == graph.number_of_nodes():
+            self.levels = np.split(order, np.cumsum(np.bincount(layers))[:-1])
+        self._source = None
+        self._distances = None
+        self._predecessors = None
+
+    def _query(self, start_vertex):
+        source = self.node_to_index[start_vertex]
+        if source != self._source:
+            if self.levels is not None:
+                self._distances, self._predecessors = self._level_paths(source)
+            else:
+                self._distances, self._predecessors = self._dijkstra_paths(source)
+            self._source = source
+        return source
+
+    def _level_paths(self, source):
+        graph = self.graph
+        distances = np.full(graph.number_of_nodes(), np.inf)
+        distances[source] = 0
+        for level in self.levels[self.layers[source]:]:
+            level = level[np.isfinite(distances[level])]
+            for sources, targets, positions in iter_out_edges(graph, level, self.chunk_edges):
+                np.minimum.at(distances, targets, distances[sources] + graph.weights[positions])
+
+        # 前驱取任意一条满足 距离[起点] + 权重 = 距离[终点] 的边（无环图中不会形成环）
+        predecessors = np.full(graph.number_of_nodes(), -1, dtype=np.int64)
+        reached = np.flatnonzero(np.isfinite(distances))
+        for sources, targets, positions in iter_out_edges(graph, reached, self.chunk_edges):
+            tight = distances[sources] + graph.weights[positions] == distances[targets]
+            predecessors[targets[tight]] = sources[tight]
+        predecessors[source] = -1
+        return distances, predecessors
+
+    def _dijkstra_paths(self, source):
+        graph = self.graph
+        distances = [np.inf] * graph.number_of_nodes()
+        predecessors = [-1] * graph.number_of_nodes()
+        distances[source] = 0
+        heap = [(0, source)]
+        while heap:
+            distance, i = heapq.heappop(heap)
+            if distance > distances[i]:
+                continue
+            start, end = int(graph.offsets[i]), int(graph.offsets[i + 1])
+            for j, weight in zip(graph.targets[start:end].tolist(), graph.weights[start:end].tolist()):
+                if distance + weight < distances[j]:
+                    distances[j] = distance + weight
+                    predecessors[j] = i
+                    heapq.heappush(heap, (distances[j], j))
+        return np.array(distances, dtype=np.float64), np.array(predecessors, dtype=np.int64)
+
+    # 共用图和分层的副本，只有上一次查询的结果是各自的
+    def copy(self):
+        return SourcePaths(self.graph, (self.order, self.layers), self.chunk_edges)
+
+    def distances_from(self, start_vertex):
+        return dict(zip(self.nodes, self.distance_row(start_vertex).tolist()))
+
+    def distance_row(self, start_vertex):
+        self._query(start_vertex)
+        return self._distances
+
+    def paths_from(self, start_vertex):
+        self._query(start_vertex)
+        return self._distances, self._predecessors
+
+    def shortest_path(self, start_vertex, target):
+        i = self._query(start_vertex)
+        j = self.node_to_index[target]
+        if self._distances[j] == np.inf:
+            return None
+        path = [j]
+        while j != i:
+            j = int(self._predecessors[j])
+            path.append(j)
+        return [self.nodes[k] for k in reversed(path)]
+
+
+# 顶点数不超过max_nodes时返回全源最短路径缓存，否则返回按起点查询的SourcePaths
+def path_cache(graph, max_nodes=DENSE_MAX_NODES):
+    if graph.number_of_nodes() <= max_nodes:
+        return DistanceCache(graph, max_nodes)
+    return SourcePaths(graph)
+
+
+# 从起点出发的最短路径说明文字，cache为DistanceCache或SourcePaths，最多列出max_rows个终点（此时可达的终点在前）
+def format_routes(cache, start_vertex, max_rows=ROUTE_DISPLAY_ROWS):
+    distances = cache.distance_row(start_vertex)
+    start = cache.node_to_index[start_vertex]
+    lines = ["从顶点 '{}' 出发的最短路径：".format(start_vertex)]
+    targets = np.arange(len(distances))
+    targets = targets[targets != start]
+    if len(targets) > max_rows:
+        # 列不全时先列出可达的终点
+        reachable = np.isfinite(distances[targets])
+        targets = np.concatenate((targets[reachable], targets[~reachable]))
+    for j in targets[:max_rows].tolist():
+        node = cache.nodes[j]
+        if distances[j] == np.inf:
+            lines.append("顶点 '{}' 不可达到顶点 '{}'。".format(start_vertex, node))
+        else:
+            path = cache.shortest_path(start_vertex, node)
+            lines.append("到顶点 '{}' 的最短路径为：{}（{}）".format(node, float(distances[j]), "->".join(path)))
+    if len(targets) > max_rows:
+        lines.append("……共{}个顶点，其中{}个可达，只列出前{}个。".format(
+            len(targets), int(np.isfinite(distances[targets]).sum()), max_rows))
+    return "\n".join(lines) + "\n"
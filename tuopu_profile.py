@@ -0,0 +1,161 @@
+# 运行过程的分阶段计时和性能采样
+# StageTimer记录一次运行中各阶段（解析、检查、布局、枚举、绘图等）的耗时和计数，每个阶段只调用两次time.perf_counter，
+# 开销可以忽略，因此总是开启；ProfileCapture对某一次运行做cProfile或tracemalloc采样并保存到文件，只在需要时创建
+# 本模块不依赖PySide2和matplotlib
+import cProfile
+import os
+import time
+import tracemalloc
+
+# 诊断面板中保留的最近运行次数
+DIAGNOSTICS_HISTORY = 20
+# 采样结果保存的目录
+PROFILE_DIR = os.path.join(os.path.expanduser("~"), ".tuopu", "profiles")
+# 采样方式及其结果文件的扩展名：cProfile结果可以用pstats或snakeviz查看，tracemalloc结果为文字报告
+PROFILE_SUFFIXES = {"cprofile": ".prof", "tracemalloc": ".txt"}
+# tracemalloc记录的调用栈深度，以及报告中列出的内存分配位置数量
+TRACEMALLOC_FRAMES = 10
+TRACEMALLOC_TOP = 30
+
+
+# 一次运行的分阶段计时，阶段依次进行：begin开始新阶段时自动结束上一个阶段，同名阶段的耗时累加
+# 计算和绘图可以在不同的线程中进行，但不能同时进行
+class StageTimer:
+
+    def __init__(self, title):
+        self.title = title  # 运行的名称，例如"生成无权图"
+        self.started_at = time.time()
+        self.stages = {}  # 阶段名称 -> 耗时（秒），按开始的先后排列
+        self.counters = {}  # 计数名称 -> 数值，例如顶点数、边数
+        self.status = None  # 运行出错时的错误信息
+        self.profile_path = None  # 采样结果文件
+        self._stage = None
+        self._stage_start = None
+
+    def begin(self, stage):
+        now = time.perf_counter()
+        self._close(now)
+        self._stage = stage
+        self._stage_start = now
+
+    def end(self):
+        self._close(time.perf_counter())
+        self._stage = None
+
+    def _close(self, now):
+        if self._stage is not None:
+            self.stages[self._stage] = self.stages.get(self._stage, 0.0) + now - self._stage_start
+
+    def count(self, name, value):
+        self.counters[name] = value
+
+    def total(self):
+        return sum(self.stages.values())
+
+    # 状态栏中显示的一行摘要
+    def summary(self):
+        stages = "，".join("{}{:.2f}秒".format(stage, seconds) for stage, seconds in self.stages.items())
+        text = "{}：共{:.2f}秒".format(self.title, self.total())
+        if stages:
+            text += "（{}）".format(stages)
+        if self.status is not None:
+            text += "，出错：" + self.status
+        return text
+
+    # 诊断面板中显示的详细信息：各阶段耗时及占比、计数和采样结果文件
+    def format(self):
+        total = self.total()
+        lines = ["[{}] {}：共{:.3f}秒{}".format(time.strftime("%H:%M:%S", time.localtime(self.started_at)), self.title,
+                                             total, "（出错：{}）".format(self.status) if self.status is not None else "")]
+        for stage, seconds in self.stages.items():
+            lines.append("  {}\t{:.3f}秒\t{:.1%}".format(stage, seconds, seconds / total if total else 0.0))
+        for name, value in self.counters.items():
+            lines.append("  {}\t{}".format(name, value))
+        if self.profile_path is not None:
+            lines.append("  采样结果：" + self.profile_path)
+        return "\n".join(lines)
+
+
+# 诊断面板的全部文字，最近的运行在前
+def format_diagnostics(timers):
+    if not timers:
+        return "尚无运行记录。\n"
+    return "\n\n".join(timer.format() for timer in reversed(timers)) + "\n"
+
+
+# 按采样方式和运行的标签（ASCII）生成不重复的结果文件路径
+def profile_path(kind, label, directory=PROFILE_DIR):
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(directory, "{}-{}{}".format(label, stamp, PROFILE_SUFFIXES[kind]))
+    number = 1
+    while os.path.exists(path):
+        number += 1
+        path = os.path.join(directory, "{}-{}-{}{}".format(label, stamp, number, PROFILE_SUFFIXES[kind]))
+    return path
+
+
+# 对一段计算做cProfile或tracemalloc采样，结束时把结果写入path
+# cProfile只记录调用wrap返回的函数所在的线程；tracemalloc记录所有线程的内存分配，采样期间会明显变慢
+class ProfileCapture:
+
+    def __init__(self, kind, path):
+        if kind not in PROFILE_SUFFIXES:
+            raise ValueError("不支持的采样方式：{}".format(kind))
+        self.kind = kind
+        self.path = path
+        self.error = None  # 保存结果时的错误信息
+
+    # 返回在采样中执行function的函数，采样结果在function结束（包括抛出异常）时保存
+    def wrap(self, function):
+        def run(*args, **kwargs):
+            self.start()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.stop()
+        return run
+
+    def start(self):
+        if self.kind == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            # 已经在跟踪（例如以-X tracemalloc启动）时不在结束时停止
+            self._was_tracing = tracemalloc.is_tracing()
+            if not self._was_tracing:
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+            tracemalloc.reset_peak()
+            self._baseline = tracemalloc.get_traced_memory()[0]
+
+    def stop(self):
+        if self.kind == "cprofile":
+            self._profiler.disable()
+            self._save(self._profiler.dump_stats)
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        if not self._was_tracing:
+            tracemalloc.stop()
+        self._save(lambda path: self._write_memory_report(path, snapshot, current, peak))
+
+    def _save(self, write):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            write(self.path)
+        except OSError as e:
+            self.error = str(e)
+
+    # tracemalloc文字报告：峰值、结束时仍占用的内存，以及按分配位置统计的前TRACEMALLOC_TOP项
+    def _write_memory_report(self, path, snapshot, current, peak):
+        statistics = snapshot.statistics('lineno')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write("峰值内存：{:.1f} MiB（开始时 {:.1f} MiB）\n".format(peak / 2 ** 20, self._baseline / 2 ** 20))
+            file.write("结束时占用：{:.1f} MiB\n\n".format(current / 2 ** 20))
+            file.write("按分配位置统计（前{}项）：\n".format(TRACEMALLOC_TOP))
+            for statistic in statistics[:TRACEMALLOC_TOP]:
+                file.write("{}\n".format(statistic))
+
+
+# capture为None（不采样）时原样返回function，没有额外开销
+def profiled(function, capture):
+    return function if capture is None else capture.wrap(function)
@@ -0,0 +1,402 @@
+# 可达性索引（传递闭包）
+# 回答"a是否在b的上游""哪些顶点依赖x"这类查询：每个图只建立一次索引，之后的查询不需要从头遍历整个图
+# 有环时先把每个强连通分量缩成一个顶点，同一分量中的顶点互相可达
+# 分量数不超过REACH_BITSET_MAX_NODES时计算完整的传递闭包：每个分量的后代集合是一行打包的位（np.packbits的格式），
+# 按逆拓扑序把后继的行按位或起来；判断可达只需读取一位，某个顶点的全部祖先就是闭包矩阵的一列
+# 分量更多时闭包矩阵太大，改用区间标记（GRAIL）：若干次随机深度优先遍历的后序编号，从u可达v时
+# v的区间[low, post]一定包含在u的区间中，而且u的深度（到源点的最长路径）一定小于v的深度，不满足即可断定不可达；
+# 随机遍历同时记录先序编号：v在某次遍历的搜索树中是u的后代时即可断定可达；
+# 另外选出REACH_LANDMARKS个度数大的顶点作为地标，每个顶点用一个64位整数记录它可以到达的地标和可以到达它的地标：
+# u可以到达某个可以到达v的地标时可达，有地标可以到达u却不能到达v（或v可以到达某个地标而u不能）时不可达；
+# 都无法断定时再做只进入候选顶点的剪枝搜索（逐层整体处理），搜索中同样使用这些条件
+# 同样按逆拓扑序合并后继的后代集合，还可以求出传递约简：删除可以由其他路径代替的边，拓扑排序和可达性都不变
+# 本模块不依赖PySide2和matplotlib
+import numpy as np
+
+from tuopu_cycles import strongly_connected_components
+
+# 使用完整传递闭包的最大分量数，闭包矩阵占用 n*n/8 字节（20000个分量时约50MB）
+REACH_BITSET_MAX_NODES = 20000
+# 区间标记的数量，越多剪枝越有效，建立索引的时间也越长
+REACH_INTERVAL_LABELS = 3
+# 地标的数量，每个顶点的地标集合存放在一个uint64中
+REACH_LANDMARKS = 64
+# 结果框中最多列出的上游/下游顶点数
+REACH_DISPLAY_ITEMS = 100
+# 传递约简时尚未释放的后代集合最多占用的内存
+REDUCTION_MAX_BYTES = 512 << 20
+# 结果框中最多列出的冗余边数
+REDUCTION_DISPLAY_ITEMS = 100
+
+
+# 由(起点, 终点)数组建立去重后的CSR数组
+def _csr(sources, targets, num_nodes):
+    keys = np.unique(sources * num_nodes + targets)
+    offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys // num_nodes, minlength=num_nodes), out=offsets[1:])
+    return offsets, keys % num_nodes
+
+
+# frontier中各顶点的全部后继（可能重复）
+def _expand(offsets, targets, frontier):
+    starts = offsets[frontier]
+    counts = offsets[frontier + 1] - starts
+    positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    return targets[positions]
+
+
+# 从start出发逐层广度优先搜索，返回可以到达的顶点（不包括start本身，除非它在环上）的布尔数组
+def _reach_from(offsets, targets, start):
+    reached = np.zeros(len(offsets) - 1, dtype=bool)
+    frontier = np.array([start], dtype=np.int64)
+    while len(frontier):
+        following = np.unique(_expand(offsets, targets, frontier))
+        frontier = following[~reached[following]]
+        reached[frontier] = True
+    return reached
+
+
+# 一次随机的深度优先遍历的(先序编号, 后序编号)，两者共用一个计数器：
+# 从入度为0的顶点按随机顺序出发，后继的访问顺序也随机
+def _random_dfs_numbers(offsets, targets, rng):
+    num_nodes = len(offsets) - 1
+    sources = np.repeat(np.arange(num_nodes), np.diff(offsets))
+    targets = targets[np.lexsort((rng.random(len(targets)), sources))].tolist()
+    roots = np.flatnonzero(np.bincount(np.asarray(targets, dtype=np.int64), minlength=num_nodes) == 0)
+    offsets = offsets.tolist()
+    pre = [0] * num_nodes
+    post = [0] * num_nodes
+    visited = bytearray(num_nodes)
+    counter = 0
+    for root in rng.permutation(roots).tolist():
+        visited[root] = 1
+        pre[root] = counter
+        counter += 1
+        stack = [root]
+        nexts = [offsets[root]]  # 每个栈中顶点下一个要访问的后继位置
+        while stack:
+            v = stack[-1]
+            k = nexts[-1]
+            if k < offsets[v + 1]:
+                nexts[-1] = k + 1
+                w = targets[k]
+                if not visited[w]:
+                    visited[w] = 1
+                    pre[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    nexts.append(offsets[w])
+            else:
+                stack.pop()
+                nexts.pop()
+                post[v] = counter
+                counter += 1
+    return np.array(pre, dtype=np.int64), np.array(post, dtype=np.int64)
+
+
+# 每个顶点的深度：从入度为0的顶点出发的最长路径的边数，按拓扑序（分量编号从大到小）计算
+def _depths(offsets, targets):
+    offsets = offsets.tolist()
+    targets = targets.tolist()
+    depth = [0] * (len(offsets) - 1)
+    for v in range(len(depth) - 1, -1, -1):
+        d = depth[v] + 1
+        for w in targets[offsets[v]:offsets[v + 1]]:
+            if depth[w] < d:
+                depth[w] = d
+    return np.array(depth, dtype=np.int64)
+
+
+# 每个顶点可以到达的地标和可以到达它的地标，各为一个位集合（第k位表示landmarks[k]），返回两个uint64数组
+def _landmark_bits(offsets, targets, landmarks):
+    offsets = offsets.tolist()
+    targets = targets.tolist()
+    reaches = [0] * (len(offsets) - 1)
+    reached_by = [0] * (len(offsets) - 1)
+    for bit, v in enumerate(landmarks):
+        reaches[v] = reached_by[v] = 1 << bit
+    # 可以到达的地标按逆拓扑序（分量编号从小到大）汇总后继的集合，可以到达它的地标按拓扑序向后继传递
+    for v in range(len(reaches)):
+        bits = reaches[v]
+        for w in targets[offsets[v]:offsets[v + 1]]:
+            bits |= reaches[w]
+        reaches[v] = bits
+    for v in range(len(reached_by) - 1, -1, -1):
+        bits = reached_by[v]
+        if bits:
+            for w in targets[offsets[v]:offsets[v + 1]]:
+                reached_by[w] |= bits
+    return np.array(reaches, dtype=np.uint64), np.array(reached_by, dtype=np.uint64)
+
+
+# 区间的下端：每个顶点的全部后代（包括自身）中最小的后序编号，按后序编号从小到大计算
+def _interval_low(offsets, targets, post):
+    offsets = offsets.tolist()
+    targets = targets.tolist()
+    low = post.tolist()
+    for v in np.argsort(post).tolist():
+        m = low[v]
+        for w in targets[offsets[v]:offsets[v + 1]]:
+            if low[w] < m:
+                m = low[w]
+        low[v] = m
+    return np.array(low, dtype=np.int64)
+
+
+class ReachabilityIndex:
+
+    def __init__(self, graph, max_bitset_nodes=REACH_BITSET_MAX_NODES, labels=REACH_INTERVAL_LABELS, seed=0):
+        self.graph = graph
+        # Tarjan算法给出的分量按逆拓扑序排列：从分量a可以到达分量b（a != b）时一定有a > b
+        components = strongly_connected_components(graph)
+        num_components = len(components)
+        self.component_of = np.empty(graph.number_of_nodes(), dtype=np.int64)
+        for component_id, component in enumerate(components):
+            self.component_of[component] = component_id
+        self.component_sizes = np.bincount(self.component_of, minlength=num_components)
+
+        sources, targets = self.component_of[graph.sources()], self.component_of[graph.targets]
+        between = sources != targets
+        sources, targets = sources[between], targets[between]
+        self.offsets, self.targets = _csr(sources, targets, num_components)
+        self.bits = None  # 完整传递闭包，第c行为分量c的后代集合
+        self.low = self.post = None  # 区间标记，每行一次遍历
+        self.pre = None  # 随机遍历的先序编号，与post的第2行起一一对应
+        self.depth = None  # 区间标记模式下各分量的深度
+        self.landmark_out = self.landmark_in = None  # 各分量可以到达的地标、可以到达它的地标
+        self.reverse_offsets = self.reverse_targets = None  # 反向边，区间标记模式下查询祖先时使用
+
+        if num_components <= max_bitset_nodes:
+            self._build_bits()
+        else:
+            rng = np.random.default_rng(seed)
+            # 分量编号本身就是一次深度优先遍历的后序编号，其余的标记使用随机遍历
+            numbers = [_random_dfs_numbers(self.offsets, self.targets, rng) for _ in range(labels - 1)]
+            posts = [np.arange(num_components)] + [post for _, post in numbers]
+            self.pre = np.array([pre for pre, _ in numbers]).reshape(-1, num_components)
+            self.post = np.array(posts)
+            self.low = np.array([_interval_low(self.offsets, self.targets, post) for post in posts])
+            self.depth = _depths(self.offsets, self.targets)
+            # 地标：入度和出度（各加1）的乘积最大的分量，相同时随机选择
+            degree = (np.bincount(sources, minlength=num_components) + 1) * \
+                (np.bincount(targets, minlength=num_components) + 1)
+            landmarks = np.lexsort((rng.random(num_components), -degree))[:REACH_LANDMARKS]
+            self.landmark_out, self.landmark_in = _landmark_bits(self.offsets, self.targets, landmarks.tolist())
+            self.reverse_offsets, self.reverse_targets = _csr(targets, sources, num_components)
+
+    # 按逆拓扑序（分量编号从小到大）计算传递闭包：分量的后代为各后继及其后代的并集
+    def _build_bits(self):
+        num_components = len(self.component_sizes)
+        self.bits = np.zeros((num_components, (num_components + 7) // 8), dtype=np.uint8)
+        offsets = self.offsets.tolist()
+        for c in range(num_components):
+            successors = self.targets[offsets[c]:offsets[c + 1]]
+            if not len(successors):
+                continue
+            row = np.bitwise_or.reduce(self.bits[successors], axis=0)
+            np.bitwise_or.at(row, successors >> 3, (0x80 >> (successors & 7)).astype(np.uint8))
+            self.bits[c] = row
+
+    # 索引的模式："bitset"（完整传递闭包）或"interval"（区间标记）
+    @property
+    def mode(self):
+        return "bitset" if self.bits is not None else "interval"
+
+    # 索引占用的字节数
+    @property
+    def nbytes(self):
+        arrays = (self.component_of, self.component_sizes, self.offsets, self.targets, self.bits, self.low, self.post,
+                  self.pre, self.depth, self.landmark_out,
+                  self.landmark_in, self.reverse_offsets, self.reverse_targets)
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    def _index_of(self, name):
+        i = self.graph.index.get(name)
+        if i is None:
+            raise ValueError("顶点 '{}' 不在图中".format(name))
+        return i
+
+    # 区间标记模式下，candidates中哪些分量可能到达分量v（区间包含v的区间，深度小于v的深度，地标条件不矛盾）
+    def _may_reach(self, candidates, v):
+        return (self.depth[candidates] < self.depth[v]) & \
+            ((self.landmark_in[candidates] & ~self.landmark_in[v]) == 0) & \
+            ((self.landmark_out[v] & ~self.landmark_out[candidates]) == 0) & \
+            np.all(self.low[:, candidates] <= self.low[:, v:v + 1], axis=0) & \
+            np.all(self.post[:, candidates] >= self.post[:, v:v + 1], axis=0)
+
+    # 区间标记模式下，candidates中是否有分量可以经过地标到达v，或在某次随机遍历的搜索树中是v的祖先（或就是v），
+    # 有则一定可以到达v
+    def _tree_reaches(self, candidates, v):
+        if np.any(self.landmark_out[candidates] & self.landmark_in[v]):
+            return True
+        post = self.post[1:]
+        return bool(np.any((self.pre[:, candidates] <= self.pre[:, v:v + 1]) &
+                           (post[:, candidates] >= post[:, v:v + 1])))
+
+    # 分量a是否可以到达另一个分量b
+    def _component_reaches(self, a, b):
+        if a <= b:
+            return False
+        if self.bits is not None:
+            return bool(self.bits[a, b >> 3] & (0x80 >> (b & 7)))
+        frontier = np.array([a], dtype=np.int64)
+        if not self._may_reach(frontier, b)[0]:
+            return False
+        # 剪枝搜索：逐层取出当前各分量的后继，只保留可能到达b且没有访问过的分量
+        visited = {a}
+        while len(frontier):
+            if self._tree_reaches(frontier, b):
+                return True
+            successors = np.unique(_expand(self.offsets, self.targets, frontier))
+            if np.any(successors == b):
+                return True
+            successors = successors[self._may_reach(successors, b)]
+            frontier = np.array([w for w in successors.tolist() if w not in visited], dtype=np.int64)
+            visited.update(frontier.tolist())
+        return False
+
+    # a是否在b的上游（从a出发可以到达b），a与b相同时为False
+    def reaches(self, a, b):
+        i, j = self._index_of(a), self._index_of(b)
+        if i == j:
+            return False
+        a, b = self.component_of[i], self.component_of[j]
+        return a == b or self._component_reaches(a, b)
+
+    # 分量c的后代分量/祖先分量的布尔数组（不包括c本身）
+    def _descendant_components(self, c):
+        if self.bits is not None:
+            return np.unpackbits(self.bits[c], count=len(self.component_sizes)).astype(bool)
+        return _reach_from(self.offsets, self.targets, c)
+
+    def _ancestor_components(self, c):
+        if self.bits is not None:
+            return (self.bits[:, c >> 3] & (0x80 >> (c & 7))) != 0
+        return _reach_from(self.reverse_offsets, self.reverse_targets, c)
+
+    # 由分量的掩码得到顶点的掩码，同一分量（环）中的其他顶点也计入，顶点本身不计入
+    def _node_mask(self, i, component_mask):
+        c = self.component_of[i]
+        mask = component_mask[self.component_of]
+        if self.component_sizes[c] > 1:
+            mask |= self.component_of == c
+        mask[i] = False
+        return mask
+
+    # 下游（依赖name的顶点，即从name可以到达的顶点）的布尔数组，顺序与graph.names一致
+    def descendant_mask(self, name):
+        i = self._index_of(name)
+        return self._node_mask(i, self._descendant_components(self.component_of[i]))
+
+    # 上游（name依赖的顶点，即可以到达name的顶点）的布尔数组
+    def ancestor_mask(self, name):
+        i = self._index_of(name)
+        return self._node_mask(i, self._ancestor_components(self.component_of[i]))
+
+    def descendants(self, name):
+        return [self.graph.names[i] for i in np.flatnonzero(self.descendant_mask(name)).tolist()]
+
+    def ancestors(self, name):
+        return [self.graph.names[i] for i in np.flatnonzero(self.ancestor_mask(name)).tolist()]
+
+    # 两端都在node_mask中的边，与CSR边顺序一致的布尔数组
+    def edge_mask(self, node_mask):
+        return node_mask[self.graph.sources()] & node_mask[self.graph.targets]
+
+
+# 顶点名称列表整理为一行文字，过多时只列出前max_items个
+def _join(names, max_items):
+    text = ", ".join(names[:max_items])
+    if len(names) > max_items:
+        text += ", ……共{}个".format(len(names))
+    return text
+
+
+# 一个顶点的上游和下游，整理为可以直接显示的文字
+def format_reachability(index, name, ancestors, descendants, max_items=REACH_DISPLAY_ITEMS):
+    names = index.graph.names
+    ancestors = [names[i] for i in np.flatnonzero(ancestors).tolist()]
+    descendants = [names[i] for i in np.flatnonzero(descendants).tolist()]
+    lines = ["顶点 {} 的上游（它依赖的顶点）共{}个：{}".format(name, len(ancestors), _join(ancestors, max_items) or "无"),
+             "顶点 {} 的下游（依赖它的顶点）共{}个：{}".format(name, len(descendants), _join(descendants, max_items) or "无")]
+    return "\n".join(lines) + "\n"
+
+
+# "a是否在b的上游"的查询结果，between为a和b之间（不含两端）的顶点掩码
+def format_reach_query(index, a, b, between, max_items=REACH_DISPLAY_ITEMS):
+    if index.reaches(a, b):
+        names = [index.graph.names[i] for i in np.flatnonzero(between).tolist()]
+        text = "{} 在 {} 的上游，两者之间的路径经过{}个顶点".format(a, b, len(names))
+        return text + ("：" + _join(names, max_items) if names else "") + "\n"
+    if index.reaches(b, a):
+        return "{} 不在 {} 的上游（{} 在 {} 的上游）\n".format(a, b, b, a)
+    return "{} 与 {} 之间没有依赖关系\n".format(a, b)
+
+
+# 传递约简：<a,c>与<a,b>、<b,c>同时存在时<a,c>是冗余的边，删除全部冗余边后拓扑排序和可达性都不变
+# 有环时环内的边全部保留，只约简不同强连通分量之间的边；返回与CSR边顺序一致的布尔数组，True表示保留
+# 按逆拓扑序计算每个分量的后代集合（打包的位，后代的编号都更小，只保存到自身编号为止），
+# 一条边的终点在同一起点的其他后继的后代集合中时即为冗余；分量的全部前驱处理完后释放它的集合，
+# 尚未释放的集合超过max_bytes时抛出ValueError
+def transitive_reduction(graph, components=None, max_bytes=REDUCTION_MAX_BYTES):
+    if components is None:
+        components = strongly_connected_components(graph)
+    num_components = len(components)
+    component_of = np.empty(graph.number_of_nodes(), dtype=np.int64)
+    for component_id, component in enumerate(components):
+        component_of[component] = component_id
+    sources, targets = component_of[graph.sources()], component_of[graph.targets]
+    between = sources != targets
+    offsets, successors = _csr(sources[between], targets[between], num_components)
+
+    remaining = np.bincount(successors, minlength=num_components).tolist()  # 尚未处理的前驱数
+    redundant = np.zeros(len(successors), dtype=bool)
+    rows = {}  # 尚未释放的后代集合，没有后代的分量不保存
+    live = 0
+    bounds = offsets.tolist()
+    for c in range(num_components):
+        start, end = bounds[c], bounds[c + 1]
+        if start == end:
+            continue
+        following = successors[start:end]
+        row = np.zeros((c >> 3) + 1, dtype=np.uint8)
+        for w in following.tolist():
+            descendants = rows.get(w)
+            if descendants is not None:
+                row[:len(descendants)] |= descendants
+            remaining[w] -= 1
+            if remaining[w] == 0 and descendants is not None:
+                live -= descendants.nbytes
+                del rows[w]
+        bits = (0x80 >> (following & 7)).astype(np.uint8)
+        redundant[start:end] = (row[following >> 3] & bits) != 0
+        np.bitwise_or.at(row, following >> 3, bits)
+        if remaining[c]:
+            rows[c] = row
+            live += row.nbytes
+            if live > max_bytes:
+                raise ValueError("传递约简需要的内存超过{}MB，图太大，不计算传递约简".format(max_bytes >> 20))
+
+    # 分量之间的边按(起点, 终点)在CSR数组中找到对应位置
+    keep = np.ones(graph.number_of_edges(), dtype=bool)
+    keys = np.repeat(np.arange(num_components), np.diff(offsets)) * num_components + successors
+    positions = np.searchsorted(keys, sources[between] * num_components + targets[between])
+    keep[between] = ~redundant[positions]
+    return keep
+
+
+# 传递约简删除的边，整理为可以直接显示的文字，max_items为0时只输出数量
+def format_reduction(graph, keep, max_items=REDUCTION_DISPLAY_ITEMS):
+    names = graph.names
+    removed = np.flatnonzero(~keep)
+    total = graph.number_of_edges()
+    lines = ["传递约简：删除了{}条冗余边（原有{}条，保留{}条，减少{:.0%}）。".format(
+        len(removed), total, total - len(removed), len(removed) / total if total else 0)]
+    if len(removed) and max_items:
+        sources = graph.sources()[removed[:max_items]].tolist()
+        targets = graph.targets[removed[:max_items]].tolist()
+        text = " ".join("<{},{}>".format(names[a], names[b]) for a, b in zip(sources, targets))
+        if len(removed) > max_items:
+            text += " ……共{}条".format(len(removed))
+        lines.append("删除的边：" + text)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,263 @@
+# 大图的批量绘制
+# 所有边合并为一个LineCollection，箭头合并为一个PolyCollection，所有节点合并为一个散点图，
+# 绘制开销与边数基本无关；节点和权重标签只在当前视野内的数量不超过阈值时才绘制。
+# 支持滚轮缩放、左键拖动平移，拖动过程中隐藏标签，只重绘少量集合对象；
+# 边数很多时启用细节层次（LOD）模式，把视野内的节点按网格聚合后绘制，放大后自动显示更多细节
+# 本模块不依赖PySide2，可以在任意matplotlib Figure（包括离屏的Agg画布）上绘制
+import numpy as np
+from matplotlib.collections import LineCollection, PolyCollection
+
+NODE_COLOR = "skyblue"
+EDGE_COLOR = "black"
+# 需要突出显示的顶点和边（如环上的顶点、建议删除的边）使用的颜色
+HIGHLIGHT_NODE_COLOR = "salmon"
+HIGHLIGHT_EDGE_COLOR = "red"
+# 可达性查询中选中顶点的上游和下游顶点使用的颜色
+ANCESTOR_NODE_COLOR = "gold"
+DESCENDANT_NODE_COLOR = "lightgreen"
+# 节点数不超过LABEL_NODE_LIMIT时使用大节点（与原来nx.draw的效果一致），否则使用小节点
+NODE_SIZE = 500
+SMALL_NODE_SIZE = 12
+# 视野内的节点/边不超过该数量时才绘制节点标签/权重标签
+LABEL_NODE_LIMIT = 150
+LABEL_EDGE_LIMIT = 150
+# 视野内的边超过该数量时启用细节层次模式，以及聚合网格的大小
+LOD_EDGE_THRESHOLD = 20000
+LOD_GRID_SIZE = 96
+# 每次滚轮缩放的倍数
+ZOOM_FACTOR = 1.25
+# 双击选择节点时，鼠标与节点中心的最大像素距离
+PICK_RADIUS = 12
+
+
+class GraphRenderer:
+
+    def __init__(self, figure):
+        self.figure = figure
+        self.ax = None
+        self.graph = None
+        self.xy = None  # 节点坐标数组，顺序与graph.names一致
+        self.sources = None
+        self.targets = None
+        self.show_weights = False
+        self.node_colors = None
+        self.edge_colors = None
+        self.level_of_detail = False
+        self.artists = []  # 当前绘制的集合和标签，刷新视野时移除重建
+        self.labels = []
+        self._press = None  # 拖动开始时的鼠标位置和坐标范围
+        self.node_activated = None  # 双击节点时调用，参数为节点下标
+
+        canvas = figure.canvas
+        canvas.mpl_connect('scroll_event', self._on_scroll)
+        canvas.mpl_connect('button_press_event', self._on_press)
+        canvas.mpl_connect('motion_notify_event', self._on_motion)
+        canvas.mpl_connect('button_release_event', self._on_release)
+
+    # 绘制整个图
+    # pos为{节点: 坐标}，或顺序与graph.names一致的(n, 2)坐标数组（如快照中保存的布局）；show_weights为True时在边的中点显示权重
+    # node_colors/edge_colors可以是单一颜色（字符串），也可以是与节点/边一一对应的颜色数组（CSR边顺序）
+    # level_of_detail为None时按边数自动决定是否启用细节层次模式
+    # keep_view为True时保持当前的缩放和平移（用于编辑后的增量重绘）
+    def draw(self, graph, pos, title, show_weights=False, node_colors=None, edge_colors=None,
+             level_of_detail=None, keep_view=False):
+        view = None
+        if keep_view and self.ax is not None:
+            view = self.ax.get_xlim(), self.ax.get_ylim()
+        self.graph = graph
+        if isinstance(pos, np.ndarray):
+            self.xy = np.asarray(pos, dtype=np.float64).reshape(-1, 2)
+        else:
+            self.xy = np.array([pos[name] for name in graph.names], dtype=np.float64).reshape(-1, 2)
+        self.sources = graph.sources()
+        self.targets = graph.targets
+        self.show_weights = show_weights and graph.weights is not None
+        self.node_colors = NODE_COLOR if node_colors is None else node_colors
+        self.edge_colors = EDGE_COLOR if edge_colors is None else edge_colors
+        if level_of_detail is None:
+            level_of_detail = graph.number_of_edges() > LOD_EDGE_THRESHOLD
+        self.level_of_detail = level_of_detail
+
+        self.figure.clf()
+        self.ax = self.figure.add_subplot(111)
+        self.ax.set_axis_off()
+        self.ax.set_title(title)
+        self.artists = []
+        self.labels = []
+
+        # 坐标范围留出边距，之后的缩放平移都只修改这个范围
+        if view is not None:
+            self.ax.set_xlim(*view[0])
+            self.ax.set_ylim(*view[1])
+        elif len(self.xy):
+            low, high = self.xy.min(axis=0), self.xy.max(axis=0)
+            margin = np.maximum((high - low) * 0.08, 0.1)
+            self.ax.set_xlim(low[0] - margin[0], high[0] + margin[0])
+            self.ax.set_ylim(low[1] - margin[1], high[1] + margin[1])
+        self._refresh()
+
+    # 只修改节点和边的颜色，保持当前的图、布局和视野
+    def recolor(self, node_colors=None, edge_colors=None):
+        self.node_colors = NODE_COLOR if node_colors is None else node_colors
+        self.edge_colors = EDGE_COLOR if edge_colors is None else edge_colors
+        self._refresh()
+
+    # 鼠标位置附近（PICK_RADIUS像素以内）最近的节点下标，没有时返回None
+    def node_at(self, event):
+        if self.graph is None or not len(self.xy):
+            return None
+        offsets = self.ax.transData.transform(self.xy) - (event.x, event.y)
+        distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        i = int(np.argmin(distances))
+        return i if distances[i] <= PICK_RADIUS else None
+
+    # 重新生成视野内的内容（集合对象和标签）
+    def _refresh(self):
+        for artist in self.artists:
+            artist.remove()
+        self.artists = []
+        if self.graph is None or not len(self.xy):
+            self.figure.canvas.draw_idle()
+            return
+
+        visible_nodes = self._visible_mask()
+        visible_edges = visible_nodes[self.sources] | visible_nodes[self.targets]
+        if self.level_of_detail and np.count_nonzero(visible_edges) > LOD_EDGE_THRESHOLD:
+            self._draw_aggregated(visible_nodes, visible_edges)
+        else:
+            self._draw_exact(visible_nodes, visible_edges)
+        self._draw_labels(visible_nodes, visible_edges)
+        self.figure.canvas.draw_idle()
+
+    # 当前视野内的节点
+    def _visible_mask(self):
+        (x0, x1), (y0, y1) = self.ax.get_xlim(), self.ax.get_ylim()
+        x, y = self.xy[:, 0], self.xy[:, 1]
+        return (x >= min(x0, x1)) & (x <= max(x0, x1)) & (y >= min(y0, y1)) & (y <= max(y0, y1))
+
+    # 精确绘制：一个LineCollection画边，一个PolyCollection画箭头，一个散点图画节点
+    def _draw_exact(self, visible_nodes, visible_edges):
+        if not self.level_of_detail:
+            # 非LOD模式下边数有限，全部绘制，平移时不需要重建
+            visible_edges = np.ones(len(self.sources), dtype=bool)
+        sources, targets = self.sources[visible_edges], self.targets[visible_edges]
+        edge_colors = self._select(self.edge_colors, visible_edges)
+        start, end = self.xy[sources], self.xy[targets]
+
+        # 箭头的大小按当前视野的比例计算，箭头尖端避开目标节点
+        (x0, x1), (y0, y1) = self.ax.get_xlim(), self.ax.get_ylim()
+        span = max(abs(x1 - x0), abs(y1 - y0))
+        large = len(self.xy) <= LABEL_NODE_LIMIT
+        shrink = span * (0.035 if large else 0.006)
+        head = span * (0.02 if large else 0.006)
+
+        direction = end - start
+        length = np.hypot(direction[:, 0], direction[:, 1])
+        keep = length > 0
+        direction[keep] /= length[keep, None]
+        tip = end - direction * np.minimum(shrink, length / 2)[:, None]
+        normal = np.column_stack((-direction[:, 1], direction[:, 0]))
+        heads = np.stack((tip, tip - direction * head + normal * head * 0.5,
+                          tip - direction * head - normal * head * 0.5), axis=1)
+
+        lines = LineCollection(np.stack((start, tip), axis=1), colors=edge_colors, linewidths=1, zorder=1)
+        arrows = PolyCollection(heads[keep], facecolors=self._select(edge_colors, keep), edgecolors='none', zorder=1)
+        nodes = self.ax.scatter(self.xy[:, 0], self.xy[:, 1], s=NODE_SIZE if large else SMALL_NODE_SIZE,
+                                c=self.node_colors, zorder=2)
+        self.ax.add_collection(lines)
+        self.ax.add_collection(arrows)
+        self.artists += [lines, arrows, nodes]
+
+    # 细节层次模式：把视野划分为网格，同一格内的节点合并为一个点，格子之间的边合并为一条线，
+    # 线宽和点的大小随合并的数量增大
+    def _draw_aggregated(self, visible_nodes, visible_edges):
+        (x0, x1), (y0, y1) = self.ax.get_xlim(), self.ax.get_ylim()
+        low = np.array([min(x0, x1), min(y0, y1)])
+        size = np.array([abs(x1 - x0), abs(y1 - y0)]) / LOD_GRID_SIZE
+        cells = np.clip(((self.xy - low) / size).astype(np.int64), -1, LOD_GRID_SIZE)
+        cell_ids = (cells[:, 0] + 1) * (LOD_GRID_SIZE + 2) + cells[:, 1] + 1
+
+        # 每个格子中节点的平均位置
+        unique_cells, inverse, counts = np.unique(cell_ids, return_inverse=True, return_counts=True)
+        centers = np.column_stack((np.bincount(inverse, weights=self.xy[:, 0]),
+                                   np.bincount(inverse, weights=self.xy[:, 1]))) / counts[:, None]
+
+        # 合并格子之间的边，去掉格子内部的边
+        a, b = inverse[self.sources[visible_edges]], inverse[self.targets[visible_edges]]
+        between = a != b
+        pairs, weights = np.unique(a[between] * len(unique_cells) + b[between], return_counts=True)
+        segments = np.stack((centers[pairs // len(unique_cells)], centers[pairs % len(unique_cells)]), axis=1)
+
+        lines = LineCollection(segments, colors=EDGE_COLOR, linewidths=0.3 + np.log1p(weights) * 0.4,
+                               alpha=0.5, zorder=1)
+        shown = np.unique(inverse[visible_nodes])
+        nodes = self.ax.scatter(centers[shown, 0], centers[shown, 1], s=SMALL_NODE_SIZE * np.sqrt(counts[shown]),
+                                c=NODE_COLOR, zorder=2)
+        self.ax.add_collection(lines)
+        self.artists += [lines, nodes]
+
+    # 视野内节点/边较少时才绘制标签
+    def _draw_labels(self, visible_nodes, visible_edges):
+        self.labels = []
+        node_indices = np.flatnonzero(visible_nodes)
+        if len(node_indices) <= LABEL_NODE_LIMIT:
+            for i in node_indices.tolist():
+                self.labels.append(self.ax.text(self.xy[i, 0], self.xy[i, 1], str(self.graph.names[i]),
+                                                fontsize=10, ha='center', va='center', zorder=3))
+        if self.show_weights:
+            edge_indices = np.flatnonzero(visible_edges)
+            if len(edge_indices) <= LABEL_EDGE_LIMIT:
+                middle = (self.xy[self.sources[edge_indices]] + self.xy[self.targets[edge_indices]]) / 2
+                for (x, y), weight in zip(middle.tolist(), self.graph.weights[edge_indices].tolist()):
+                    self.labels.append(self.ax.text(x, y, str(weight), fontsize=8, ha='center', va='center',
+                                                    zorder=3, bbox=dict(boxstyle='round', ec='none', fc='white')))
+        self.artists += self.labels
+
+    # 颜色参数为数组时按掩码取出对应部分（单一颜色用字符串表示）
+    @staticmethod
+    def _select(colors, mask):
+        if isinstance(colors, str):
+            return colors
+        return np.asarray(colors)[mask]
+
+    # 滚轮以鼠标位置为中心缩放
+    def _on_scroll(self, event):
+        if self.ax is None or event.inaxes is not self.ax:
+            return
+        factor = 1 / ZOOM_FACTOR if event.button == 'up' else ZOOM_FACTOR
+        (x0, x1), (y0, y1) = self.ax.get_xlim(), self.ax.get_ylim()
+        x, y = event.xdata, event.ydata
+        self.ax.set_xlim(x - (x - x0) * factor, x + (x1 - x) * factor)
+        self.ax.set_ylim(y - (y - y0) * factor, y + (y1 - y) * factor)
+        self._refresh()
+
+    def _on_press(self, event):
+        if self.ax is None or event.inaxes is not self.ax or event.button != 1:
+            return
+        if event.dblclick:
+            i = self.node_at(event)
+            if i is not None and self.node_activated is not None:
+                self.node_activated(i)
+            return
+        self._press = (event.x, event.y, self.ax.get_xlim(), self.ax.get_ylim())
+        # 拖动时隐藏标签，每帧只重绘集合对象
+        for label in self.labels:
+            label.set_visible(False)
+
+    def _on_motion(self, event):
+        if self._press is None:
+            return
+        x, y, (x0, x1), (y0, y1) = self._press
+        # 鼠标移动的像素距离换算为坐标距离
+        bbox = self.ax.bbox
+        dx = (event.x - x) * (x1 - x0) / bbox.width
+        dy = (event.y - y) * (y1 - y0) / bbox.height
+        self.ax.set_xlim(x0 - dx, x1 - dx)
+        self.ax.set_ylim(y0 - dy, y1 - dy)
+        self.figure.canvas.draw_idle()
+
+    def _on_release(self, event):
+        if self._press is None:
+            return
+        self._press = None
+        self._refresh()
@@ -0,0 +1,219 @@
+# 带权图的批量最短路径查询
+# 一次查询多个起点（每个起点到全部顶点），或多个(起点, 终点)对。查询按起点分组，同一起点的全部查询共用一次计算：
+# 全源缓存（DistanceCache）按块取出距离矩阵和前驱矩阵的行；按起点查询（SourcePaths）时每个起点计算一次，
+# 起点较多时分给进程池并行计算（图来自大图模式的存储或快照时，子进程以只读方式重新映射文件，不复制边数组）。
+# 路径由前驱数组还原，每个起点的最短路径树中每个顶点只处理一次；
+# 结果逐行生成(起点, 终点, 距离, 路径)，分块写入文件或只显示前若干行，不拼接整个结果
+# 本模块不依赖PySide2和matplotlib
+import csv
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import re
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from tuopu_export import export_format, replacing_export_file
+from tuopu_paths import DistanceCache, SourcePaths, ROUTE_DISPLAY_ROWS
+from tuopu_snapshot import read_snapshot
+from tuopu_store import EdgeStore
+
+# 每次写入文件、汇报进度的结果行数
+ROUTE_CHUNK_ROWS = 10000
+# 从距离矩阵中每次取出的行数
+ROUTE_MATRIX_ROWS = 64
+# 按起点查询时，起点不少于该数量才使用进程池
+PARALLEL_ROUTE_MIN_SOURCES = 8
+# 同时提交给进程池的起点数量为进程数的倍数，限制尚未取回的距离和前驱数组占用的内存
+ROUTE_INFLIGHT_PER_WORKER = 2
+# 查询中的顶点名称，与边数据中的顶点名称格式相同
+_NAME_PATTERN = re.compile(r'\w+')
+
+# 子进程中的按起点查询，由进程池的初始化函数建立，避免每个任务重复传输图
+_worker_paths = None
+
+
+# graph为图，或大图模式的存储目录、快照文件的路径
+def _init_worker(graph, levels):
+    global _worker_paths
+    if isinstance(graph, str):
+        graph = _open_graph(graph)
+    _worker_paths = SourcePaths(graph, levels)
+
+
+# 以只读的内存映射重新打开大图模式的存储目录或快照文件中的图
+def _open_graph(path):
+    if os.path.isdir(path):
+        return EdgeStore.open(path).graph()
+    return read_snapshot(path, 'r').graph
+
+
+def _worker_paths_from(source):
+    return _worker_paths.paths_from(_worker_paths.nodes[source])
+
+
+# 逐行解析查询：每行一个起点（查询到全部顶点的最短路径），或"起点,终点"（也可以用空格、"->"等分隔），返回[(起点, 终点或None), ...]
+# errors不为None时，无法识别的行以(行号, 行内容)追加到errors中
+def parse_route_queries(lines, errors=None):
+    queries = []
+    for line_no, line in enumerate(lines, 1):
+        names = _NAME_PATTERN.findall(line)
+        if len(names) in (1, 2):
+            queries.append((names[0], names[1] if len(names) == 2 else None))
+        elif names and errors is not None:
+            errors.append((line_no, line.strip()))
+    return queries
+
+
+# 按起点分组：{起点: None（到全部顶点）或[终点, ...]}，起点按第一次出现的顺序排列
+# 有顶点不在图中时抛出ValueError
+def group_route_queries(queries, index):
+    missing = OrderedDict.fromkeys(name for query in queries for name in query if name is not None and name not in index)
+    if missing:
+        names = list(missing)
+        raise ValueError("以下顶点不在图中：{}{}".format(", ".join(names[:10]), "……" if len(names) > 10 else ""))
+    groups = OrderedDict()
+    for source, target in queries:
+        if target is None:
+            groups[source] = None
+        elif source not in groups:
+            groups[source] = [target]
+        elif groups[source] is not None:
+            groups[source].append(target)
+    return groups
+
+
+# 查询结果的总行数，到全部顶点的查询不包括起点本身
+def count_routes(groups, num_nodes):
+    return sum(num_nodes - 1 if targets is None else len(targets) for targets in groups.values())
+
+
+# 依次生成每个起点的(起点下标, 距离数组, 前驱数组)
+# 全源缓存按块取出矩阵的行；按起点查询时起点较多且workers不为1（None表示CPU核数）时使用进程池，顺序不变
+# graph_path为图所在的存储目录或快照文件，子进程由此重新映射图；为None时把整个图传给每个子进程
+def _iter_source_paths(cache, sources, workers, graph_path=None):
+    if isinstance(cache, DistanceCache):
+        for start in range(0, len(sources), ROUTE_MATRIX_ROWS):
+            block = sources[start:start + ROUTE_MATRIX_ROWS]
+            yield from zip(block, cache.distance_matrix[block], cache.predecessor_matrix[block])
+        return
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(sources) < PARALLEL_ROUTE_MIN_SOURCES:
+        for source in sources:
+            yield (source,) + tuple(cache.paths_from(cache.nodes[source]))
+        return
+
+    # 使用spawn方式启动子进程：界面程序是多线程的，fork可能复制到被其他线程持有的锁
+    pool = ProcessPoolExecutor(min(workers, len(sources)), mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_init_worker,
+                               initargs=(graph_path or cache.graph, (cache.order, cache.layers)))
+    pending = iter(sources)
+    queue = deque()
+    try:
+        for source in itertools.islice(pending, workers * ROUTE_INFLIGHT_PER_WORKER):
+            queue.append((source, pool.submit(_worker_paths_from, source)))
+        while queue:
+            source, future = queue.popleft()
+            distances, predecessors = future.result()
+            for next_source in itertools.islice(pending, 1):
+                queue.append((next_source, pool.submit(_worker_paths_from, next_source)))
+            yield source, distances, predecessors
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+# 由前驱数组还原起点到各终点的路径文字（a->b->c），不可达的终点为空字符串
+# 已经还原的路径记在known中，沿前驱向上只走到第一个已知的顶点，每个顶点只处理一次
+def _path_texts(names, source, distances, predecessors, targets):
+    known = {source: names[source]}
+    texts = []
+    for j in targets:
+        if distances[j] == np.inf:
+            texts.append("")
+            continue
+        chain = []
+        k = j
+        while k not in known:
+            chain.append(k)
+            k = int(predecessors[k])
+        text = known[k]
+        for k in reversed(chain):
+            text = known[k] = text + "->" + names[k]
+        texts.append(text)
+    return texts
+
+
+# 逐行生成查询结果(起点, 终点, 距离, 路径文字)，不可达时距离为inf、路径为空字符串
+# cache为DistanceCache或SourcePaths，groups为group_route_queries的结果；progress(已完成的起点数)在每个起点之后调用
+# cache.graph来自大图模式的存储或快照时，graph_path为存储目录或快照文件，多进程计算时子进程由此重新映射图
+def iter_routes(cache, groups, workers=1, progress=None, graph_path=None):
+    names = cache.nodes
+    index = cache.node_to_index
+    sources = np.array([index[source] for source in groups], dtype=np.int64)
+    all_targets = np.arange(len(names))
+    source_paths = _iter_source_paths(cache, sources, workers, graph_path)
+    for done, (source, distances, predecessors) in enumerate(source_paths, 1):
+        source = int(source)
+        targets = groups[names[source]]
+        if targets is None:
+            targets = all_targets[all_targets != source].tolist()
+        else:
+            targets = [index[target] for target in targets]
+        texts = _path_texts(names, source, distances, predecessors, targets)
+        for j, text in zip(targets, texts):
+            yield names[source], names[j], float(distances[j]), text
+        if progress is not None:
+            progress(done)
+
+
+# 一块查询结果格式化为文本：txt为制表符分隔，csv和jsonl的路径分别为"a->b->c"和数组
+def format_routes_chunk(chunk, fmt="txt"):
+    if fmt == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(chunk)
+        return buffer.getvalue()
+    if fmt == "jsonl":
+        return "".join(json.dumps({"source": source, "target": target,
+                                   "distance": distance if distance != np.inf else None,
+                                   "path": text.split("->") if text else []}, ensure_ascii=False) + "\n"
+                       for source, target, distance, text in chunk)
+    return "".join("{}\t{}\t{}\t{}\n".format(*row) for row in chunk)
+
+
+# 把查询结果按指定格式分块写入已打开的文件，返回写入的行数；csv格式先写入表头
+# progress(count)在每块写入后调用，可以在其中抛出异常来中止
+def write_routes(rows, file, fmt="txt", progress=None):
+    if fmt == "csv":
+        file.write("source,target,distance,path\n")
+    rows = iter(rows)
+    count = 0
+    while True:
+        chunk = list(itertools.islice(rows, ROUTE_CHUNK_ROWS))
+        if not chunk:
+            return count
+        file.write(format_routes_chunk(chunk, fmt))
+        count += len(chunk)
+        if progress is not None:
+            progress(count)
+
+
+# 把查询结果（iter_routes生成的行）导出到文件，格式按扩展名决定，返回写入的行数
+# 先写入临时文件，完成后再替换目标文件；中途出错或被取消时删除临时文件
+def export_routes(rows, path, progress=None):
+    with replacing_export_file(path) as file:
+        return write_routes(rows, file, export_format(path), progress)
+
+
+# 结果框中显示的表格：每行一条结果（制表符分隔），最多max_rows行，total为结果的总行数
+def format_route_table(rows, total, max_rows=ROUTE_DISPLAY_ROWS):
+    lines = ["起点\t终点\t距离\t路径"]
+    for source, target, distance, text in itertools.islice(rows, max_rows):
+        lines.append("{}\t{}\t{}\t{}".format(source, target, distance, text or "不可达"))
+    if total > max_rows:
+        lines.append("……共{}条结果，只显示前{}条，完整结果请保存到文件。".format(total, max_rows))
+    return "\n".join(lines) + "\n"
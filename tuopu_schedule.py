@@ -0,0 +1,118 @@
+# 带权有向无环图的关键路径分析（调度分析）
+# 边<a,b,w>表示b最早在a开始w个时间单位之后开始（w为a的工期或两者之间的间隔）；
+# 按拓扑序正向一遍求最早开始时间，逆向一遍求最迟开始时间，两者之差为时差，
+# 时差为0的顶点和边构成关键路径。全部计算为O(V+E)
+# 本模块不依赖PySide2和matplotlib
+import itertools
+
+import numpy as np
+
+from tuopu_core import topological_order
+
+# 结果框中最多列出的顶点时间数量
+SCHEDULE_DISPLAY_ROWS = 200
+# 导出时每次写入的顶点数量
+SCHEDULE_CHUNK_SIZE = 10000
+
+
+class Schedule:
+
+    def __init__(self, graph, order, earliest, latest):
+        self.graph = graph
+        self.order = order  # 计算时使用的拓扑序（顶点下标列表）
+        self.earliest = earliest  # 每个顶点的最早开始时间
+        self.latest = latest  # 每个顶点的最迟开始时间
+        self.slack = latest - earliest  # 每个顶点的时差
+        self.length = int(earliest.max()) if len(earliest) else 0  # 总工期
+
+    # 每条边的时差：终点的最迟开始时间 - 边的权重 - 起点的最早开始时间
+    def edge_slack(self):
+        return self.latest[self.graph.targets] - self.graph.weights - self.earliest[self.graph.sources()]
+
+    # 与顶点顺序一致的布尔数组，标记关键顶点（时差为0）
+    def critical_node_mask(self):
+        return self.slack == 0
+
+    # 与CSR边顺序一致的布尔数组，标记关键边（时差为0）
+    def critical_edge_mask(self):
+        return self.edge_slack() == 0
+
+    # 一条关键路径（顶点下标列表）：从时差为0的源点出发，沿关键边走到结束时间等于总工期的顶点
+    def critical_path(self):
+        if not len(self.slack):
+            return []
+        # 每个顶点的第一条关键出边的终点，没有时为-1；倒序赋值使CSR中靠前的边优先
+        critical_edges = np.flatnonzero(self.critical_edge_mask())[::-1]
+        following = np.full(len(self.slack), -1, dtype=np.int64)
+        following[self.graph.sources()[critical_edges]] = self.graph.targets[critical_edges]
+        following = following.tolist()
+
+        starts = np.flatnonzero((self.slack == 0) & (self.graph.in_degrees() == 0))
+        path = [int(starts[0])]
+        while following[path[-1]] >= 0:
+            path.append(following[path[-1]])
+        return path
+
+
+# 关键路径分析，图中有环时抛出ValueError
+def critical_path_analysis(graph):
+    order = topological_order(graph)
+    if order is None:
+        raise ValueError("输入的数据存在依赖关系（有环），无法进行关键路径分析")
+
+    # 边按起点在拓扑序中的位置排序后逐条处理：正向处理到某条边时，其起点的全部入边都已处理过
+    position = np.empty(graph.number_of_nodes(), dtype=np.int64)
+    position[order] = np.arange(len(order))
+    sources = graph.sources()
+    edge_order = np.argsort(position[sources], kind='stable')
+    sources = sources[edge_order].tolist()
+    targets = graph.targets[edge_order].tolist()
+    weights = graph.weights[edge_order].tolist()
+
+    # 正向：最早开始时间为所有前驱的最早开始时间加边权的最大值，源点为0
+    earliest = [0] * graph.number_of_nodes()
+    for i, j, weight in zip(sources, targets, weights):
+        if earliest[i] + weight > earliest[j]:
+            earliest[j] = earliest[i] + weight
+
+    # 逆向：最迟开始时间为所有后继的最迟开始时间减边权的最小值，汇点为总工期
+    latest = [max(earliest, default=0)] * graph.number_of_nodes()
+    for i, j, weight in zip(reversed(sources), reversed(targets), reversed(weights)):
+        if latest[j] - weight < latest[i]:
+            latest[i] = latest[j] - weight
+    return Schedule(graph, order, np.array(earliest), np.array(latest))
+
+
+# 把分析结果整理为可以直接显示的文字，顶点按最早开始时间排列，最多列出max_rows个
+def format_schedule(schedule, max_rows=SCHEDULE_DISPLAY_ROWS):
+    names = schedule.graph.names
+    path = schedule.critical_path()
+    critical = schedule.critical_node_mask()
+    lines = ["总工期：{}".format(schedule.length),
+             "关键路径：" + "->".join(names[v] for v in path),
+             "关键顶点共{}个，关键边共{}条。".format(int(critical.sum()), int(schedule.critical_edge_mask().sum())),
+             "顶点\t最早开始\t最迟开始\t时差"]
+    rows = np.argsort(schedule.earliest, kind='stable')
+    for v in rows[:max_rows].tolist():
+        lines.append("{}\t{}\t{}\t{}{}".format(names[v], schedule.earliest[v], schedule.latest[v], schedule.slack[v],
+                                               "\t关键" if critical[v] else ""))
+    if len(rows) > max_rows:
+        lines.append("……共{}个顶点，完整结果请导出到文件。".format(len(rows)))
+    return "\n".join(lines) + "\n"
+
+
+# 把每个顶点的时间按CSV格式写入已打开的文件（顶点按拓扑序排列），返回写入的顶点数量
+def write_schedule(schedule, file):
+    names = schedule.graph.names
+    critical = schedule.critical_node_mask().tolist()
+    earliest = schedule.earliest.tolist()
+    latest = schedule.latest.tolist()
+    slack = schedule.slack.tolist()
+    file.write("node,earliest,latest,slack,critical\n")
+    order = iter(schedule.order)
+    while True:
+        chunk = list(itertools.islice(order, SCHEDULE_CHUNK_SIZE))
+        if not chunk:
+            return len(schedule.order)
+        file.write("".join("{},{},{},{},{}\n".format(names[v], earliest[v], latest[v], slack[v], int(critical[v]))
+                           for v in chunk))
@@ -0,0 +1,133 @@
+# 图的二进制快照
+# 把解析好的图（顶点表、CSR数组、权重）连同布局坐标、拓扑序、拓扑排序总数和全源最短路径矩阵保存在一个文件中，
+# 重新打开时不需要解析文本、重新布局和重新计算最短路径
+# 文件格式（小端）：8字节标识SNAPSHOT_MAGIC，4字节版本号，4字节头部长度，UTF-8编码的JSON头部，
+# 之后是各个数组的原始数据，每个数组的起始位置按SNAPSHOT_ALIGN字节对齐；头部记录每个数组的类型、形状和位置
+# 读取时把整个文件映射到内存（写时复制），数组都是映射的视图，不复制数据，读取的时间与边数基本无关
+# 本模块不依赖PySide2和matplotlib
+import json
+import os
+import struct
+
+import numpy as np
+
+from tuopu_graph import CSRGraph
+from tuopu_paths import DistanceCache
+
+SNAPSHOT_MAGIC = b"TUOPUSNP"
+SNAPSHOT_VERSION = 1
+# 快照文件的扩展名
+SNAPSHOT_SUFFIX = ".tps"
+# 数组起始位置的对齐字节数
+SNAPSHOT_ALIGN = 64
+# 标识、版本号和头部长度
+_PREAMBLE = struct.Struct("<8sII")
+
+
+class Snapshot:
+
+    def __init__(self, graph, positions=None, order=None, count=None, layout=None, distance_matrix=None,
+                 predecessor_matrix=None, path=None):
+        self.graph = graph  # CSRGraph，带权图的weights不为None
+        self.positions = positions  # 布局坐标，(n, 2)数组，顺序与graph.names一致
+        self.order = order  # 一个拓扑序（顶点下标数组），有环时为None
+        self.count = count  # 拓扑排序总数（有环时为缩点后的图的），None表示未知或数量过多
+        self.layout = layout  # 布局选项的名称
+        self.distance_matrix = distance_matrix  # 全源最短路径矩阵，顶点顺序与graph.names一致
+        self.predecessor_matrix = predecessor_matrix
+        self.path = path  # 读取的快照文件，新建的快照为None
+
+    @property
+    def weighted(self):
+        return self.graph.weights is not None
+
+    # 由保存的矩阵恢复最短路径缓存，没有保存矩阵时返回None
+    def distance_cache(self):
+        if self.distance_matrix is None:
+            return None
+        return DistanceCache.from_matrices(self.graph, self.distance_matrix, self.predecessor_matrix)
+
+
+# 文件开头是否为快照的标识
+def is_snapshot(path):
+    try:
+        with open(path, 'rb') as file:
+            return file.read(len(SNAPSHOT_MAGIC)) == SNAPSHOT_MAGIC
+    except OSError:
+        return False
+
+
+# 写入快照，返回文件的字节数
+# 先写入临时文件，完成后再替换，写入中途出错时不会损坏原来的文件
+def write_snapshot(path, snapshot):
+    graph = snapshot.graph
+    names = "\n".join(graph.names).encode('utf-8')
+    if graph.names and names.count(b"\n") != len(graph.names) - 1:
+        raise ValueError("顶点名称中不能包含换行符")
+    arrays = [("names", np.frombuffer(names, dtype=np.uint8)), ("offsets", graph.offsets),
+              ("targets", graph.targets), ("weights", graph.weights), ("positions", snapshot.positions),
+              ("order", snapshot.order), ("distance_matrix", snapshot.distance_matrix),
+              ("predecessor_matrix", snapshot.predecessor_matrix)]
+    arrays = [(name, np.ascontiguousarray(array)) for name, array in arrays if array is not None]
+
+    header = {"nodes": graph.number_of_nodes(), "edges": graph.number_of_edges(), "layout": snapshot.layout,
+              "count": None if snapshot.count is None else str(snapshot.count), "arrays": {}}
+    # 数组的位置取决于头部的长度，头部又记录了数组的位置：从头部没有数组信息时的长度开始，预留的空间不够时加大再排
+    reserved = _PREAMBLE.size + len(json.dumps(header).encode('utf-8'))
+    while True:
+        reserved = _align(reserved)
+        offset = reserved
+        for name, array in arrays:
+            header["arrays"][name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+            offset = _align(offset + array.nbytes)
+        encoded = json.dumps(header).encode('utf-8')
+        if _PREAMBLE.size + len(encoded) <= reserved:
+            break
+        reserved = _PREAMBLE.size + len(encoded)
+
+    temporary = path + ".tmp"
+    try:
+        with open(temporary, 'wb') as file:
+            file.write(_PREAMBLE.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(encoded)))
+            file.write(encoded)
+            for name, array in arrays:
+                file.write(b"\0" * (header["arrays"][name]["offset"] - file.tell()))
+                file.write(memoryview(array).cast('B'))
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    return os.path.getsize(path)
+
+
+# 读取快照，数组为文件映射（默认写时复制，mode为'r'时只读）的视图，修改数组不会写回文件
+# 文件不是快照或版本不受支持时抛出ValueError
+def read_snapshot(path, mode='c'):
+    with open(path, 'rb') as file:
+        preamble = file.read(_PREAMBLE.size)
+        if len(preamble) < _PREAMBLE.size or preamble[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError("不是快照文件：{}".format(path))
+        _, version, header_length = _PREAMBLE.unpack(preamble)
+        if version != SNAPSHOT_VERSION:
+            raise ValueError("快照文件的版本{}不受支持：{}".format(version, path))
+        header = json.loads(file.read(header_length).decode('utf-8'))
+
+    mapped = np.memmap(path, dtype=np.uint8, mode=mode)
+    arrays = {}
+    for name, info in header["arrays"].items():
+        dtype = np.dtype(info["dtype"])
+        length = int(np.prod(info["shape"], dtype=np.int64)) * dtype.itemsize
+        if info["offset"] + length > len(mapped):
+            raise ValueError("快照文件不完整：{}".format(path))
+        arrays[name] = mapped[info["offset"]:info["offset"] + length].view(dtype).reshape(info["shape"])
+
+    names = bytes(arrays["names"]).decode('utf-8').split("\n") if header["nodes"] else []
+    graph = CSRGraph(names, arrays["offsets"], arrays["targets"], arrays.get("weights"))
+    count = header["count"]
+    return Snapshot(graph, arrays.get("positions"), arrays.get("order"), None if count is None else int(count),
+                    header["layout"], arrays.get("distance_matrix"), arrays.get("predecessor_matrix"), path)
+
+
+def _align(offset):
+    return -(-offset // SNAPSHOT_ALIGN) * SNAPSHOT_ALIGN
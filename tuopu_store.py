@@ -0,0 +1,304 @@
+# 大图模式：边保存在磁盘上的列式文件中，通过内存映射访问
+# 数千万条边的图在内存中只保留顶点表和O(V)的数组（偏移、入度、层号等），
+# 边的终点和权重各存为一个二进制文件，按起点排序后即为CSR格式，可以直接构成CSRGraph（数组为np.memmap）；
+# 拓扑排序、可达性和抽样都按批读取出边，每批最多STORE_CHUNK_EDGES条边，内存占用与边数无关
+# 重复的边不去除：入度按边数计算，对拓扑排序、可达性和最短路径的结果都没有影响
+# 本模块不依赖PySide2和matplotlib
+import os
+import shutil
+import tempfile
+from array import array
+
+import numpy as np
+
+from tuopu_graph import CSRGraph, NodeTable
+
+# 建立存储和批量计算时每批处理的边数，决定了除O(V)数组之外的内存占用
+STORE_CHUNK_EDGES = 1 << 22
+# 导入的文件超过该大小时界面自动使用大图模式
+LARGE_GRAPH_FILE_BYTES = 64 << 20
+# 抽样显示的最多顶点数
+SAMPLE_NODES = 2000
+# 摘要中列出的顶点数
+SUMMARY_ITEMS = 50
+
+
+class EdgeStore:
+
+    def __init__(self, directory, names, index, offsets, weighted, owns_directory=False):
+        self.directory = directory
+        self.names = names
+        self.index = index
+        self.offsets = offsets  # 每个顶点的出边在文件中的起始位置，常驻内存
+        self.weighted = weighted
+        self.owns_directory = owns_directory  # 为True时close删除整个目录
+        num_edges = int(offsets[-1])
+        self.targets = _open_column(os.path.join(directory, "targets.bin"), np.int64, num_edges)
+        self.weights = _open_column(os.path.join(directory, "weights.bin"), np.int64, num_edges) if weighted else None
+
+    # 由边的迭代器建立存储：第一遍逐条读入，把起点、终点和权重按块追加到文件末尾；
+    # 第二遍按起点计数排序（每块内稳定排序后写入各起点的区间），得到CSR格式的终点和权重文件
+    # directory为None时使用临时目录，close时删除；progress(已读入的边数)在第一遍每读入一块之后调用
+    @classmethod
+    def build(cls, edges, directory=None, weighted=False, chunk_edges=STORE_CHUNK_EDGES, progress=None):
+        owns_directory = directory is None
+        if owns_directory:
+            directory = tempfile.mkdtemp(prefix="tuopu_store_")
+        else:
+            os.makedirs(directory, exist_ok=True)
+        try:
+            table = NodeTable()
+            columns = ("sources", "unsorted_targets", "unsorted_weights") if weighted else \
+                ("sources", "unsorted_targets")
+            paths = {column: os.path.join(directory, column + ".bin") for column in columns}
+            files = {column: open(path, 'wb') for column, path in paths.items()}
+            num_edges = 0
+            try:
+                buffers = {column: array('q') for column in columns}
+                for edge in edges:
+                    buffers["sources"].append(table.intern(edge[0]))
+                    buffers["unsorted_targets"].append(table.intern(edge[1]))
+                    if weighted:
+                        buffers["unsorted_weights"].append(edge[2])
+                    if len(buffers["sources"]) >= chunk_edges:
+                        num_edges += _flush(buffers, files)
+                        if progress is not None:
+                            progress(num_edges)
+                num_edges += _flush(buffers, files)
+            finally:
+                for file in files.values():
+                    file.close()
+
+            num_nodes = len(table)
+            sources = _open_column(paths["sources"], np.int64, num_edges)
+            counts = np.zeros(num_nodes, dtype=np.int64)
+            for start in range(0, num_edges, chunk_edges):
+                counts += np.bincount(sources[start:start + chunk_edges], minlength=num_nodes)
+            offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+            np.cumsum(counts, out=offsets[1:])
+
+            # 计数排序：cursor[i]为起点i的下一条边应写入的位置
+            cursor = offsets[:-1].copy()
+            sorted_columns = [("unsorted_targets", "targets")] + ([("unsorted_weights", "weights")] if weighted else [])
+            inputs = [_open_column(paths[column], np.int64, num_edges) for column, _ in sorted_columns]
+            outputs = [_create_column(os.path.join(directory, name + ".bin"), np.int64, num_edges)
+                       for _, name in sorted_columns]
+            for start in range(0, num_edges, chunk_edges):
+                chunk = np.asarray(sources[start:start + chunk_edges])
+                order = np.argsort(chunk, kind='stable')
+                ordered = chunk[order]
+                # 同一起点的边在块内的序号
+                first = np.searchsorted(ordered, ordered, side='left')
+                positions = cursor[ordered] + np.arange(len(ordered)) - first
+                for column, output in zip(inputs, outputs):
+                    output[positions] = column[start:start + chunk_edges][order]
+                cursor += np.bincount(chunk, minlength=num_nodes)
+            for output in outputs:
+                output.flush()
+            del sources, inputs, outputs
+            for path in paths.values():
+                os.remove(path)
+            np.save(os.path.join(directory, "offsets.npy"), offsets)
+            with open(os.path.join(directory, "names.txt"), 'w', encoding='utf-8') as file:
+                file.writelines(name + "\n" for name in table.names)
+        except BaseException:
+            if owns_directory:
+                shutil.rmtree(directory, ignore_errors=True)
+            raise
+        return cls(directory, table.names, table.index, offsets, weighted, owns_directory)
+
+    # 打开已经建立的存储目录
+    @classmethod
+    def open(cls, directory):
+        with open(os.path.join(directory, "names.txt"), 'r', encoding='utf-8') as file:
+            names = [line.rstrip("\n") for line in file]
+        offsets = np.load(os.path.join(directory, "offsets.npy"))
+        weighted = os.path.exists(os.path.join(directory, "weights.bin"))
+        return cls(directory, names, {name: i for i, name in enumerate(names)}, offsets, weighted)
+
+    def number_of_nodes(self):
+        return len(self.names)
+
+    def number_of_edges(self):
+        return int(self.offsets[-1])
+
+    # 以存储中的数组构成的CSRGraph，终点和权重数组为内存映射
+    def graph(self):
+        return CSRGraph(self.names, self.offsets, self.targets, self.weights, self.index)
+
+    # 存储占用的磁盘空间（字节）
+    def disk_bytes(self):
+        return sum(os.path.getsize(os.path.join(self.directory, name)) for name in os.listdir(self.directory))
+
+    def close(self):
+        self.targets = self.weights = None
+        if self.owns_directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def _flush(buffers, files):
+    count = len(buffers["sources"])
+    for column, buffer in buffers.items():
+        buffer.tofile(files[column])
+        del buffer[:]
+    return count
+
+
+# 以只读方式映射一列数据，空文件不能映射，返回空数组
+def _open_column(path, dtype, length):
+    if length == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=(length,))
+
+
+def _create_column(path, dtype, length):
+    if length == 0:
+        open(path, 'wb').close()
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='w+', shape=(length,))
+
+
+# 每个顶点的入度，按块累加
+def in_degrees(graph, chunk_edges=STORE_CHUNK_EDGES):
+    num_nodes = graph.number_of_nodes()
+    degrees = np.zeros(num_nodes, dtype=np.int64)
+    for start in range(0, graph.number_of_edges(), chunk_edges):
+        degrees += np.bincount(graph.targets[start:start + chunk_edges], minlength=num_nodes)
+    return degrees
+
+
+# 按块取出一组顶点的全部出边，每块生成(起点下标数组, 终点下标数组, 边的位置数组)
+# 每块最多约chunk_edges条边（出边超过chunk_edges条的单个顶点自成一块）
+def iter_out_edges(graph, vertices, chunk_edges=STORE_CHUNK_EDGES):
+    vertices = np.asarray(vertices, dtype=np.int64)
+    starts = graph.offsets[vertices]
+    counts = graph.offsets[vertices + 1] - starts
+    ends = np.cumsum(counts)
+    begin = 0
+    while begin < len(vertices):
+        limit = (ends[begin] - counts[begin]) + chunk_edges
+        end = max(int(np.searchsorted(ends, limit, side='right')), begin + 1)
+        piece_counts = counts[begin:end]
+        total = int(piece_counts.sum())
+        if total:
+            first = np.cumsum(piece_counts) - piece_counts
+            positions = np.repeat(starts[begin:end] - first, piece_counts) + np.arange(total)
+            yield np.repeat(vertices[begin:end], piece_counts), np.asarray(graph.targets[positions]), positions
+        begin = end
+
+
+# 按层批量执行Kahn算法，返回(拓扑序, 层号数组)：拓扑序为各层顶点依次排列的下标数组，
+# 层号为从源点出发的最长路径的顶点数减1；图中有环时环上及其后的顶点不在拓扑序中，层号为-1
+def streaming_levels(graph, chunk_edges=STORE_CHUNK_EDGES):
+    in_degree = in_degrees(graph, chunk_edges)
+    layers = np.full(graph.number_of_nodes(), -1, dtype=np.int64)
+    frontier = np.flatnonzero(in_degree == 0)
+    levels = []
+    depth = 0
+    while len(frontier):
+        layers[frontier] = depth
+        levels.append(frontier)
+        following = []
+        for _, targets, _ in iter_out_edges(graph, frontier, chunk_edges):
+            np.subtract.at(in_degree, targets, 1)
+            targets = np.unique(targets)
+            following.append(targets[in_degree[targets] == 0])
+        frontier = np.unique(np.concatenate(following)) if following else frontier[:0]
+        depth += 1
+    order = np.concatenate(levels) if levels else np.zeros(0, dtype=np.int64)
+    return order, layers
+
+
+# 从sources（顶点下标列表）出发可以到达的顶点（包括sources本身），返回布尔数组；逐层广度优先搜索
+def reachable_mask(graph, sources, chunk_edges=STORE_CHUNK_EDGES):
+    reached = np.zeros(graph.number_of_nodes(), dtype=bool)
+    frontier = np.unique(np.asarray(sources, dtype=np.int64))
+    reached[frontier] = True
+    while len(frontier):
+        following = []
+        for _, targets, _ in iter_out_edges(graph, frontier, chunk_edges):
+            targets = np.unique(targets)
+            targets = targets[~reached[targets]]
+            reached[targets] = True
+            following.append(targets)
+        frontier = np.concatenate(following) if following else frontier[:0]
+    return reached
+
+
+# 抽样：从随机的起始顶点出发逐层向后扩展，直到取满max_nodes个顶点，得到彼此相连的局部结构；
+# starts为优先使用的起始顶点（例如用户指定的顶点），None表示从随机的源点开始
+# 返回(抽样的CSRGraph, 抽样顶点在原图中的下标数组)，抽样图包含两端都被抽中的全部边
+def sample_subgraph(graph, max_nodes=SAMPLE_NODES, starts=None, seed=0, in_degree=None,
+                    chunk_edges=STORE_CHUNK_EDGES):
+    num_nodes = graph.number_of_nodes()
+    rng = np.random.default_rng(seed)
+    if num_nodes <= max_nodes:
+        chosen = np.arange(num_nodes)
+    else:
+        if in_degree is None:
+            in_degree = in_degrees(graph, chunk_edges)
+        roots = np.flatnonzero(in_degree == 0)
+        if len(roots) == 0:
+            roots = np.arange(num_nodes)
+        roots = rng.permutation(roots)
+        if starts is not None:
+            roots = np.concatenate((np.asarray(starts, dtype=np.int64), roots))
+        selected = np.zeros(num_nodes, dtype=bool)
+        count = 0
+        for root in roots.tolist():
+            if count >= max_nodes:
+                break
+            if selected[root]:
+                continue
+            frontier = np.array([root])
+            while len(frontier) and count < max_nodes:
+                frontier = frontier[:max_nodes - count]
+                selected[frontier] = True
+                count += len(frontier)
+                following = []
+                for _, targets, _ in iter_out_edges(graph, frontier, chunk_edges):
+                    targets = np.unique(targets)
+                    following.append(targets[~selected[targets]])
+                frontier = np.unique(np.concatenate(following)) if following else frontier[:0]
+        chosen = np.flatnonzero(selected)
+
+    # 原图下标到抽样图下标的映射，-1表示未抽中
+    mapping = np.full(num_nodes, -1, dtype=np.int64)
+    mapping[chosen] = np.arange(len(chosen))
+    sources, targets = [], []
+    for edge_sources, edge_targets, _ in iter_out_edges(graph, chosen, chunk_edges):
+        kept = mapping[edge_targets] >= 0
+        sources.append(mapping[edge_sources[kept]])
+        targets.append(mapping[edge_targets[kept]])
+    sources = np.concatenate(sources) if sources else np.zeros(0, dtype=np.int64)
+    targets = np.concatenate(targets) if targets else np.zeros(0, dtype=np.int64)
+    names = [graph.names[i] for i in chosen.tolist()]
+    return CSRGraph.from_arrays(names, sources, targets), chosen
+
+
+# 大图的摘要文字：规模、源点和汇点数、是否有环、层数、最宽的层和拓扑序的开头
+# reached为从指定顶点可达的布尔数组（None表示没有指定顶点）
+def format_store_summary(store, order, layers, in_degree, start_vertex=None, reached=None,
+                         max_items=SUMMARY_ITEMS):
+    names = store.names
+    num_nodes = store.number_of_nodes()
+    out_degree = np.diff(store.offsets)
+    lines = ["大图模式：共{}个顶点，{}条边，边保存在磁盘上（{:.1f} MiB）。".format(
+                 num_nodes, store.number_of_edges(), store.disk_bytes() / 2 ** 20),
+             "源点{}个，汇点{}个。".format(int((in_degree == 0).sum()), int((out_degree == 0).sum()))]
+    if len(order) < num_nodes:
+        lines.append("输入的数据存在依赖关系（有环）：{}个顶点在环上或依赖环上的顶点，无法排序。".format(num_nodes - len(order)))
+    if len(order):
+        widths = np.bincount(layers[layers >= 0])
+        lines.append("共{}层（最长的依赖链有{}个顶点），最宽的一层有{}个顶点。".format(len(widths), len(widths),
+                                                                  int(widths.max())))
+        head = "->".join(names[i] for i in order[:max_items].tolist())
+        lines.append("拓扑排序（前{}个顶点）：{}{}".format(min(max_items, len(order)), head,
+                                                  "->……" if len(order) > max_items else ""))
+    if reached is not None:
+        targets = np.flatnonzero(reached)
+        targets = targets[targets != store.index[start_vertex]]
+        text = ", ".join(names[i] for i in targets[:max_items].tolist())
+        lines.append("从顶点 '{}' 可以到达{}个顶点：{}{}".format(start_vertex, len(targets), text,
+                                                       ", ……" if len(targets) > max_items else ""))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+# Form implementation generated from reading ui file 'tuopu.ui',
+# licensing of 'tuopu.ui' applies.
+#
+# Created: Sun Oct 18 02:50:25 2026
+#      by: pyside2-uic  running on PySide2 5.13.2
+#
+# WARNING! All changes made in this file will be lost!
+
+from PySide2 import QtCore, QtGui, QtWidgets
+
+class Ui_MainWindow(object):
+    def setupUi(self, MainWindow):
+        MainWindow.setObjectName("MainWindow")
+        MainWindow.resize(688, 559)
+        self.centralwidget = QtWidgets.QWidget(MainWindow)
+        self.centralwidget.setObjectName("centralwidget")
+        self.formLayout = QtWidgets.QFormLayout(self.centralwidget)
+        self.formLayout.setObjectName("formLayout")
+        self.horizontalLayout_2 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_2.setObjectName("horizontalLayout_2")
+        self.verticalLayout = QtWidgets.QVBoxLayout()
+        self.verticalLayout.setObjectName("verticalLayout")
+        self.plainTextEdit = QtWidgets.QPlainTextEdit(self.centralwidget)
+        self.plainTextEdit.setObjectName("plainTextEdit")
+        self.verticalLayout.addWidget(self.plainTextEdit)
+        self.comboBox = QtWidgets.QComboBox(self.centralwidget)
+        self.comboBox.setEditable(True)
+        self.comboBox.setObjectName("comboBox")
+        self.comboBox.addItem("")
+        self.comboBox.addItem("")
+        self.comboBox.addItem("")
+        self.comboBox.addItem("")
+        self.comboBox.addItem("")
+        self.verticalLayout.addWidget(self.comboBox)
+        self.horizontalLayout = QtWidgets.QHBoxLayout()
+        self.horizontalLayout.setObjectName("horizontalLayout")
+        self.pushButton = QtWidgets.QPushButton(self.centralwidget)
+        self.pushButton.setObjectName("pushButton")
+        self.horizontalLayout.addWidget(self.pushButton)
+        self.pushButton_2 = QtWidgets.QPushButton(self.centralwidget)
+        self.pushButton_2.setObjectName("pushButton_2")
+        self.horizontalLayout.addWidget(self.pushButton_2)
+        self.pushButton_3 = QtWidgets.QPushButton(self.centralwidget)
+        self.pushButton_3.setObjectName("pushButton_3")
+        self.horizontalLayout.addWidget(self.pushButton_3)
+        self.verticalLayout.addLayout(self.horizontalLayout)
+        self.textEdit = QtWidgets.QTextEdit(self.centralwidget)
+        self.textEdit.setObjectName("textEdit")
+        self.verticalLayout.addWidget(self.textEdit)
+        self.horizontalLayout_2.addLayout(self.verticalLayout)
+        self.widget = QtWidgets.QWidget(self.centralwidget)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Expanding)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.widget.sizePolicy().hasHeightForWidth())
+        self.widget.setSizePolicy(sizePolicy)
+        self.widget.setMinimumSize(QtCore.QSize(10, 10))
+        self.widget.setMaximumSize(QtCore.QSize(16777212, 16777214))
+        self.widget.setLayoutDirection(QtCore.Qt.RightToLeft)
+        self.widget.setObjectName("widget")
+        self.horizontalLayout_2.addWidget(self.widget)
+        self.formLayout.setLayout(0, QtWidgets.QFormLayout.LabelRole, self.horizontalLayout_2)
+        MainWindow.setCentralWidget(self.centralwidget)
+        self.menubar = QtWidgets.QMenuBar(MainWindow)
+        self.menubar.setGeometry(QtCore.QRect(0, 0, 688, 22))
+        self.menubar.setObjectName("menubar")
+        self.menuFile = QtWidgets.QMenu(self.menubar)
+        self.menuFile.setObjectName("menuFile")
+        self.menuSave_as = QtWidgets.QMenu(self.menuFile)
+        self.menuSave_as.setObjectName("menuSave_as")
+        self.menuGenerate = QtWidgets.QMenu(self.menubar)
+        self.menuGenerate.setObjectName("menuGenerate")
+        self.menuHelp = QtWidgets.QMenu(self.menubar)
+        self.menuHelp.setObjectName("menuHelp")
+        self.menuExit = QtWidgets.QMenu(self.menubar)
+        self.menuExit.setObjectName("menuExit")
+        MainWindow.setMenuBar(self.menubar)
+        self.actionOpen = QtWidgets.QAction(MainWindow)
+        self.actionOpen.setObjectName("actionOpen")
+        self.actionOpen_Snapshot = QtWidgets.QAction(MainWindow)
+        self.actionOpen_Snapshot.setObjectName("actionOpen_Snapshot")
+        self.actionSave_Snapshot = QtWidgets.QAction(MainWindow)
+        self.actionSave_Snapshot.setObjectName("actionSave_Snapshot")
+        self.actionfile = QtWidgets.QAction(MainWindow)
+        self.actionfile.setObjectName("actionfile")
+        self.actionUnauthorized_Graph = QtWidgets.QAction(MainWindow)
+        self.actionUnauthorized_Graph.setObjectName("actionUnauthorized_Graph")
+        self.actionAuthorized_Graph = QtWidgets.QAction(MainWindow)
+        self.actionAuthorized_Graph.setObjectName("actionAuthorized_Graph")
+        self.actionBatch_Routes = QtWidgets.QAction(MainWindow)
+        self.actionBatch_Routes.setObjectName("actionBatch_Routes")
+        self.actionCritical_Path = QtWidgets.QAction(MainWindow)
+        self.actionCritical_Path.setObjectName("actionCritical_Path")
+        self.actionLevels = QtWidgets.QAction(MainWindow)
+        self.actionLevels.setObjectName("actionLevels")
+        self.actionReachability = QtWidgets.QAction(MainWindow)
+        self.actionReachability.setObjectName("actionReachability")
+        self.actionTransitive_Reduction = QtWidgets.QAction(MainWindow)
+        self.actionTransitive_Reduction.setCheckable(True)
+        self.actionTransitive_Reduction.setObjectName("actionTransitive_Reduction")
+        self.actionLarge_Graph_Mode = QtWidgets.QAction(MainWindow)
+        self.actionLarge_Graph_Mode.setCheckable(True)
+        self.actionLarge_Graph_Mode.setObjectName("actionLarge_Graph_Mode")
+        self.actionSchedule = QtWidgets.QAction(MainWindow)
+        self.actionSchedule.setObjectName("actionSchedule")
+        self.actionGraph = QtWidgets.QAction(MainWindow)
+        self.actionGraph.setObjectName("actionGraph")
+        self.actionReadme = QtWidgets.QAction(MainWindow)
+        self.actionReadme.setObjectName("actionReadme")
+        self.actionDiagnostics = QtWidgets.QAction(MainWindow)
+        self.actionDiagnostics.setCheckable(True)
+        self.actionDiagnostics.setObjectName("actionDiagnostics")
+        self.actionProfile = QtWidgets.QAction(MainWindow)
+        self.actionProfile.setCheckable(True)
+        self.actionProfile.setObjectName("actionProfile")
+        self.actionTrace_Memory = QtWidgets.QAction(MainWindow)
+        self.actionTrace_Memory.setCheckable(True)
+        self.actionTrace_Memory.setObjectName("actionTrace_Memory")
+        self.actionProgram_Exit = QtWidgets.QAction(MainWindow)
+        self.actionProgram_Exit.setObjectName("actionProgram_Exit")
+        self.menuSave_as.addAction(self.actionfile)
+        self.menuSave_as.addAction(self.actionGraph)
+        self.menuSave_as.addAction(self.actionSchedule)
+        self.menuFile.addAction(self.actionOpen)
+        self.menuFile.addAction(self.menuSave_as.menuAction())
+        self.menuFile.addSeparator()
+        self.menuFile.addAction(self.actionOpen_Snapshot)
+        self.menuFile.addAction(self.actionSave_Snapshot)
+        self.menuGenerate.addSeparator()
+        self.menuGenerate.addAction(self.actionUnauthorized_Graph)
+        self.menuGenerate.addAction(self.actionAuthorized_Graph)
+        self.menuGenerate.addAction(self.actionBatch_Routes)
+        self.menuGenerate.addAction(self.actionCritical_Path)
+        self.menuGenerate.addAction(self.actionLevels)
+        self.menuGenerate.addAction(self.actionReachability)
+        self.menuGenerate.addSeparator()
+        self.menuGenerate.addAction(self.actionTransitive_Reduction)
+        self.menuGenerate.addAction(self.actionLarge_Graph_Mode)
+        self.menuHelp.addAction(self.actionReadme)
+        self.menuHelp.addSeparator()
+        self.menuHelp.addAction(self.actionDiagnostics)
+        self.menuHelp.addAction(self.actionProfile)
+        self.menuHelp.addAction(self.actionTrace_Memory)
+        self.menuExit.addAction(self.actionProgram_Exit)
+        self.menubar.addAction(self.menuFile.menuAction())
+        self.menubar.addAction(self.menuGenerate.menuAction())
+        self.menubar.addAction(self.menuHelp.menuAction())
+        self.menubar.addAction(self.menuExit.menuAction())
+
+        self.retranslateUi(MainWindow)
+        QtCore.QMetaObject.connectSlotsByName(MainWindow)
+
+    def retranslateUi(self, MainWindow):
+        MainWindow.setWindowTitle(QtWidgets.QApplication.translate("MainWindow", "MainWindow", None, -1))
+        self.plainTextEdit.setPlaceholderText(QtWidgets.QApplication.translate("MainWindow", "若生成无权图，请输入<a,b>,<c,d>类型的数据；若生成有权图，请输入<a,b,3>类型的数据，并在最下方框内输入起始点", None, -1))
+        self.comboBox.setItemText(0, QtWidgets.QApplication.translate("MainWindow", "Spectral Layout", None, -1))
+        self.comboBox.setItemText(1, QtWidgets.QApplication.translate("MainWindow", "Shell Layout", None, -1))
+        self.comboBox.setItemText(2, QtWidgets.QApplication.translate("MainWindow", "Circular Layout", None, -1))
+        self.comboBox.setItemText(3, QtWidgets.QApplication.translate("MainWindow", "Spring Layout", None, -1))
+        self.comboBox.setItemText(4, QtWidgets.QApplication.translate("MainWindow", "Layered Layout", None, -1))
+        self.pushButton.setText(QtWidgets.QApplication.translate("MainWindow", "生成有权图", None, -1))
+        self.pushButton_2.setText(QtWidgets.QApplication.translate("MainWindow", "生成无权图", None, -1))
+        self.pushButton_3.setText(QtWidgets.QApplication.translate("MainWindow", "下一批排序", None, -1))
+        self.menuFile.setTitle(QtWidgets.QApplication.translate("MainWindow", "File", None, -1))
+        self.menuSave_as.setTitle(QtWidgets.QApplication.translate("MainWindow", "Save as", None, -1))
+        self.menuGenerate.setTitle(QtWidgets.QApplication.translate("MainWindow", "Generate", None, -1))
+        self.menuHelp.setTitle(QtWidgets.QApplication.translate("MainWindow", "Help", None, -1))
+        self.menuExit.setTitle(QtWidgets.QApplication.translate("MainWindow", "Exit", None, -1))
+        self.actionOpen.setText(QtWidgets.QApplication.translate("MainWindow", "Open", None, -1))
+        self.actionOpen_Snapshot.setText(QtWidgets.QApplication.translate("MainWindow", "Open Snapshot", None, -1))
+        self.actionSave_Snapshot.setText(QtWidgets.QApplication.translate("MainWindow", "Save Snapshot", None, -1))
+        self.actionfile.setText(QtWidgets.QApplication.translate("MainWindow", "file", None, -1))
+        self.actionUnauthorized_Graph.setText(QtWidgets.QApplication.translate("MainWindow", "Unauthorized Graph", None, -1))
+        self.actionAuthorized_Graph.setText(QtWidgets.QApplication.translate("MainWindow", "Authorized Graph", None, -1))
+        self.actionBatch_Routes.setText(QtWidgets.QApplication.translate("MainWindow", "Batch Routes", None, -1))
+        self.actionCritical_Path.setText(QtWidgets.QApplication.translate("MainWindow", "Critical Path", None, -1))
+        self.actionLevels.setText(QtWidgets.QApplication.translate("MainWindow", "Levels", None, -1))
+        self.actionReachability.setText(QtWidgets.QApplication.translate("MainWindow", "Reachability", None, -1))
+        self.actionTransitive_Reduction.setText(QtWidgets.QApplication.translate("MainWindow", "Transitive Reduction", None, -1))
+        self.actionLarge_Graph_Mode.setText(QtWidgets.QApplication.translate("MainWindow", "Large Graph Mode", None, -1))
+        self.actionSchedule.setText(QtWidgets.QApplication.translate("MainWindow", "schedule", None, -1))
+        self.actionGraph.setText(QtWidgets.QApplication.translate("MainWindow", "Graph", None, -1))
+        self.actionReadme.setText(QtWidgets.QApplication.translate("MainWindow", "README", None, -1))
+        self.actionDiagnostics.setText(QtWidgets.QApplication.translate("MainWindow", "Diagnostics", None, -1))
+        self.actionProfile.setText(QtWidgets.QApplication.translate("MainWindow", "Profile Next Run", None, -1))
+        self.actionTrace_Memory.setText(QtWidgets.QApplication.translate("MainWindow", "Trace Memory of Next Run", None, -1))
+        self.actionProgram_Exit.setText(QtWidgets.QApplication.translate("MainWindow", "Program Exit", None, -1))
+
@@ -0,0 +1,124 @@
+# 后台任务调度
+# 解析、布局、拓扑排序、最短路径等耗时计算放到线程池中执行，避免阻塞Qt事件循环；
+# 计算进度和结果通过Qt信号送回主线程。同一类任务重新提交时取消旧任务，旧任务的结果不再回调
+import threading
+
+from PySide2.QtCore import QObject, QRunnable, QThreadPool, Signal, Slot
+
+
+# 任务被取消时在计算函数内部抛出，由Job捕获
+class JobCancelled(Exception):
+    pass
+
+
+# QRunnable不是QObject，信号放在单独的对象上
+class JobSignals(QObject):
+    progress = Signal(object, object)
+    finished = Signal(object, object)
+    failed = Signal(object, str)
+    done = Signal(object)
+
+
+# 一个后台任务，function(job)在线程池中执行，返回值作为计算结果
+# function中可以调用job.progress(value)汇报进度（通常为进度文字，也可以是已完成的数量），该调用同时检查任务是否已被取消
+class Job(QRunnable):
+
+    def __init__(self, key, function, on_finished, on_failed=None, on_progress=None):
+        super().__init__()
+        self.setAutoDelete(False)  # 由JobScheduler持有引用，任务结束后再释放
+        self.key = key
+        self.function = function
+        self.on_finished = on_finished
+        self.on_failed = on_failed
+        self.on_progress = on_progress
+        self.signals = JobSignals()
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    # 任务已被取消时抛出JobCancelled，结束计算
+    def check_cancelled(self):
+        if self._cancelled.is_set():
+            raise JobCancelled()
+
+    def progress(self, value):
+        self.check_cancelled()
+        self.signals.progress.emit(self, value)
+
+    def run(self):
+        try:
+            result = self.function(self)
+            if not self.is_cancelled():
+                self.signals.finished.emit(self, result)
+        except JobCancelled:
+            pass
+        except ValueError as e:
+            # 输入数据有误等可预期的错误，直接显示错误信息
+            self.signals.failed.emit(self, str(e))
+        except Exception as e:
+            self.signals.failed.emit(self, "计算时出现错误：" + str(e))
+        finally:
+            self.signals.done.emit(self)
+
+
+class JobScheduler(QObject):
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.current = {}  # 每一类任务当前有效的任务
+        self.jobs = set()  # 所有尚未结束的任务（包括已取消的）
+
+    # 提交任务，key相同的旧任务会被取消，其结果和进度都不再回调
+    # 回调函数都在主线程中执行：on_finished(result)、on_failed(message)、on_progress(value)
+    def submit(self, key, function, on_finished, on_failed=None, on_progress=None):
+        self.cancel(key)
+        job = Job(key, function, on_finished, on_failed, on_progress)
+        job.signals.progress.connect(self._onProgress)
+        job.signals.finished.connect(self._onFinished)
+        job.signals.failed.connect(self._onFailed)
+        job.signals.done.connect(self._onDone)
+        self.current[key] = job
+        self.jobs.add(job)
+        self.pool.start(job)
+        return job
+
+    # 取消某一类正在执行的任务
+    def cancel(self, key):
+        job = self.current.pop(key, None)
+        if job is not None:
+            job.cancel()
+
+    # 某一类任务是否正在执行
+    def is_running(self, key):
+        return key in self.current
+
+    # 只有仍然有效的任务才回调
+    def _isCurrent(self, job):
+        return self.current.get(job.key) is job and not job.is_cancelled()
+
+    @Slot(object, object)
+    def _onProgress(self, job, value):
+        if self._isCurrent(job) and job.on_progress is not None:
+            job.on_progress(value)
+
+    @Slot(object, object)
+    def _onFinished(self, job, result):
+        if self._isCurrent(job):
+            del self.current[job.key]
+            job.on_finished(result)
+
+    @Slot(object, str)
+    def _onFailed(self, job, message):
+        if self._isCurrent(job):
+            del self.current[job.key]
+            if job.on_failed is not None:
+                job.on_failed(message)
+
+    @Slot(object)
+    def _onDone(self, job):
+        self.jobs.discard(job)